@@ -1,8 +1,8 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import json
 from pathlib import Path
 import logging
+from src.utils.file_lock import FileLock, write_json_atomic
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,10 +18,9 @@ async def set_session(session: TwitterSession):
     """Set Twitter session cookies."""
     try:
         cookies_file = Path("data/cookies.json")
-        cookies_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(cookies_file, 'w') as f:
-            json.dump(session.cookies, f)
+        # The agent process reads this file; never let it see a partial write
+        with FileLock(cookies_file):
+            write_json_atomic(cookies_file, session.cookies)
             
         logger.info("Successfully saved Twitter session cookies")
         return {"status": "success", "message": "Session cookies saved"}
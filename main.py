@@ -13,6 +13,8 @@ from src.agent.mention_controller import MentionController
 import json
 from pathlib import Path
 from src.agent.conversation_memory import ConversationMemory
+from src.agent.sqlite_conversation_memory import SqliteConversationMemory
+from src.agent.latency_stats import LatencyTracker
 
 # Load environment variables
 load_dotenv()
@@ -32,17 +34,30 @@ logger = logging.getLogger(__name__)
 class BobController:
     def __init__(self):
         # Initialize shared memory
-        self.memory = ConversationMemory()
+        storage_mode = os.getenv('MEMORY_STORAGE_MODE', 'json')
+        if storage_mode == 'sqlite':
+            self.memory = SqliteConversationMemory()
+        else:
+            self.memory = ConversationMemory(storage_mode=storage_mode, flush_interval=1.0,
+                                             archive_after_days=180, archive_keep_messages=500,
+                                             index_dir="data/retrieval",
+                                             snapshot_path="data/agent_state.snapshot", snapshot_interval=600,
+                                             shared=os.getenv('MEMORY_SHARED', 'false').lower() == 'true')
         
         # Initialize action handler first
         self.action_handler = ActionHandler()
         
+        # Response latency per handle and channel, shared by the reply controllers
+        self.latency = LatencyTracker()
+        
         # Initialize Bob with memory
         self.bob = BobTheBuilder(os.getenv('OPENAI_API_KEY'), memory=self.memory)
         
         # Initialize controllers with action handler, memory, and Bob
-        self.message_controller = MessageController(self.action_handler, memory=self.memory, bob=self.bob)
-        self.mention_controller = MentionController(self.action_handler, memory=self.memory, bob=self.bob)
+        self.message_controller = MessageController(self.action_handler, memory=self.memory, bob=self.bob,
+                                                    latency=self.latency)
+        self.mention_controller = MentionController(self.action_handler, memory=self.memory, bob=self.bob,
+                                                    latency=self.latency)
         
         # Control flags
         self.running = False
@@ -76,8 +91,14 @@ class BobController:
                     logger.info("\nProcessing mentions...")
                     await self.mention_controller.process_mentions()
                     
-                    # Save memory state after each cycle
-                    self.memory.save_all_conversations()
+                    # Save memory state after each cycle; snapshots, compaction and the latency
+                    # stats are locked, fsynced file updates, so keep them off the event loop
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.memory.save_all_conversations)
+                    await loop.run_in_executor(None, self.latency.save)
+                    self.latency.log_summary()
+                    self.bob.llm.limiter.log_summary()
+                    self.bob.llm.router.log_summary()
                     logger.info("\nCompleted processing cycle")
                     logger.info("=" * 50)
                     
@@ -95,7 +116,9 @@ class BobController:
             logger.error(f"Fatal error: {e}")
         finally:
             # Save final memory state
-            self.memory.save_all_conversations()
+            self.memory.close()
+            self.latency.close()
+            await self.bob.llm.close()
             self.cleanup()
             
     def cleanup(self):
@@ -12,6 +12,8 @@ from src.agent.message_controller import MessageController
 from src.agent.mention_controller import MentionController
 from src.agent.tweet_controller import TweetController
 from src.agent.conversation_memory import ConversationMemory
+from src.agent.sqlite_conversation_memory import SqliteConversationMemory
+from src.agent.latency_stats import LatencyTracker
 import json
 from pathlib import Path
 from datetime import datetime
@@ -34,11 +36,22 @@ logger = logging.getLogger(__name__)
 class BobController:
     def __init__(self, tweet_interval_minutes=20):
         # Initialize shared memory
-        self.memory = ConversationMemory()
+        storage_mode = os.getenv('MEMORY_STORAGE_MODE', 'json')
+        if storage_mode == 'sqlite':
+            self.memory = SqliteConversationMemory()
+        else:
+            self.memory = ConversationMemory(storage_mode=storage_mode, flush_interval=1.0,
+                                             archive_after_days=180, archive_keep_messages=500,
+                                             index_dir="data/retrieval",
+                                             snapshot_path="data/agent_state.snapshot", snapshot_interval=600,
+                                             shared=os.getenv('MEMORY_SHARED', 'false').lower() == 'true')
         
         # Initialize action handler first
         self.action_handler = ActionHandler()
         
+        # Response latency per handle and channel, shared by the reply controllers
+        self.latency = LatencyTracker()
+        
         # Initialize Bob with memory
         self.bob = BobTheBuilder(os.getenv('OPENAI_API_KEY'), memory=self.memory)
         
@@ -48,8 +61,10 @@ class BobController:
             bob=self.bob,  # Pass Bob instance which has the memory
             tweet_interval_minutes=tweet_interval_minutes
         )
-        self.message_controller = MessageController(self.action_handler, memory=self.memory, bob=self.bob)
-        self.mention_controller = MentionController(self.action_handler, memory=self.memory, bob=self.bob)
+        self.message_controller = MessageController(self.action_handler, memory=self.memory, bob=self.bob,
+                                                    latency=self.latency)
+        self.mention_controller = MentionController(self.action_handler, memory=self.memory, bob=self.bob,
+                                                    latency=self.latency)
         
         # Control flags
         self.running = False
@@ -86,8 +101,14 @@ class BobController:
                     logger.info("\nProcessing mentions...")
                     await self.mention_controller.process_mentions()
                     
-                    # Save memory state
-                    self.memory.save_all_conversations()
+                    # Save memory state; snapshots, compaction and the latency
+                    # stats are locked, fsynced file updates, so keep them off the event loop
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(None, self.memory.save_all_conversations)
+                    await loop.run_in_executor(None, self.latency.save)
+                    self.latency.log_summary()
+                    self.bob.llm.limiter.log_summary()
+                    self.bob.llm.router.log_summary()
                     logger.info("\nCompleted processing cycle")
                     logger.info("=" * 50)
                     
@@ -104,7 +125,9 @@ class BobController:
         except Exception as e:
             logger.error(f"Fatal error: {e}")
         finally:
-            self.memory.save_all_conversations()
+            self.memory.close()
+            self.latency.close()
+            await self.bob.llm.close()
             self.cleanup()
             
     def cleanup(self):
@@ -39,6 +39,7 @@ async def run_tweet_pipeline():
     
     # Generate a tweet from Bob
     tweet_content = await bob.generate_tweet()  # Assuming this method generates a tweet
+    await bob.llm.close()
     if tweet_content:
         logger.info(f"Generated tweet content: {tweet_content}")
         success = await tweet_controller.post_tweet(tweet_content)
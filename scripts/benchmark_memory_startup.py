@@ -0,0 +1,94 @@
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def generate_handles(data_dir: Path, count: int, messages_per_handle: int):
+    """Write synthetic per-handle conversation files"""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    for i in range(count):
+        dms = [
+            {
+                'text': f"synthetic message {j} about building a workbench",
+                'timestamp': now - random.randint(0, 86400 * 90),
+                'from_us': j % 2 == 1,
+                'type': 'dm'
+            } for j in range(messages_per_handle)
+        ]
+        with open(data_dir / f"@user{i}.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'dms': dms,
+                'mentions': [],
+                'last_interaction': None,
+                'metadata': {'first_seen': None, 'total_interactions': len(dms)}
+            }, f, indent=2)
+
+def run_startup(mode: str, data_dir: str):
+    """Construct the memory the way the agent does and report the cost"""
+    # Keep per-handle load logging out of the measurement
+    logging.getLogger('src.agent.conversation_memory').setLevel(logging.WARNING)
+    start = time.perf_counter()
+    if mode == "eager":
+        memory = ConversationMemory(data_dir=data_dir, max_resident=None)
+        memory.load_all_conversations()
+    else:
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.get_dms("@user0")  # First touch of a single handle
+    elapsed = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'mode': mode, 'seconds': elapsed, 'max_rss_mb': rss_mb,
+                      'resident': len(memory.memory)}))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ConversationMemory startup")
+    parser.add_argument("--handles", type=int, default=50000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--run", choices=["eager", "lazy", "prepare"], help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run == "prepare":
+        # Shard the flat files and build the manifest outside the measurement
+        ConversationMemory(data_dir=args.data_dir)
+        sys.exit(0)
+    if args.run:
+        run_startup(args.run, args.data_dir)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "conversations"
+        logger.info(f"Generating {args.handles} synthetic handles...")
+        generate_handles(data_dir, args.handles, args.messages)
+
+        # Each mode runs in a fresh process so RSS numbers are independent
+        for mode in ("prepare", "eager", "lazy"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", mode, "--data-dir", str(data_dir)],
+                capture_output=True, text=True, check=True, cwd=tmp
+            ).stdout
+            if mode == "prepare":
+                continue
+            result = json.loads(output.strip().splitlines()[-1])
+            logger.info(f"{mode:>5}: {result['seconds']:.2f}s startup, "
+                        f"{result['max_rss_mb']:.0f} MB max RSS, {result['resident']} resident")
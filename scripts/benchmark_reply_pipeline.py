@@ -0,0 +1,102 @@
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.reply_pipeline import ReplyJob, ReplyPipeline
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class SimulatedSession:
+    """Stand-in for the browser and LLM with randomized latencies.
+
+    The browser is a single resource: extraction and sending hold a lock,
+    like the one Selenium driver the controllers share. LLM calls do not.
+    """
+
+    def __init__(self, llm_seconds: float, extract_seconds: float, send_seconds: float, seed: int):
+        self.llm_seconds = llm_seconds
+        self.extract_seconds = extract_seconds
+        self.send_seconds = send_seconds
+        self.random = random.Random(seed)
+        self.browser = asyncio.Lock()
+
+    def _jitter(self, seconds: float) -> float:
+        return seconds * self.random.uniform(0.5, 1.5)
+
+    async def extract(self, i: int) -> ReplyJob:
+        async with self.browser:
+            await asyncio.sleep(self._jitter(self.extract_seconds))
+        return ReplyJob('mention', f"@user{i}", str(i), f"question {i}")
+
+    async def generate(self, job: ReplyJob) -> str:
+        await asyncio.sleep(self._jitter(self.llm_seconds))
+        return f"answer to {job.text}"
+
+    async def send(self, job: ReplyJob) -> bool:
+        async with self.browser:
+            await asyncio.sleep(self._jitter(self.send_seconds))
+        return True
+
+async def run_sequential(session: SimulatedSession, count: int) -> float:
+    """The previous loop: extract, generate, send, one message at a time"""
+    start = time.perf_counter()
+    for i in range(count):
+        job = await session.extract(i)
+        job.reply = await session.generate(job)
+        await session.send(job)
+    return time.perf_counter() - start
+
+async def run_pipelined(session: SimulatedSession, count: int, concurrency: int) -> float:
+    """Extract everything in one pass, generating concurrently, then send as replies are ready"""
+    start = time.perf_counter()
+    pipeline = ReplyPipeline(session.generate, concurrency=concurrency)
+    for i in range(count):
+        pipeline.submit(await session.extract(i))
+    await pipeline.drain(session.send)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and pipelined reply throughput")
+    parser.add_argument("--replies", type=int, default=20, help="Unreplied messages per run")
+    parser.add_argument("--llm", type=float, default=2.0, help="Mean LLM latency in seconds")
+    parser.add_argument("--extract", type=float, default=0.3, help="Mean browser seconds to read a message")
+    parser.add_argument("--send", type=float, default=1.5, help="Mean browser seconds to type and post a reply")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Generation concurrency levels to try")
+    parser.add_argument("--scale", type=float, default=0.1,
+                        help="Multiply all latencies by this to shorten the run")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.getLogger('src.agent').setLevel(logging.WARNING)
+
+    def session():
+        return SimulatedSession(args.llm * args.scale, args.extract * args.scale,
+                                args.send * args.scale, args.seed)
+
+    def per_minute(seconds: float) -> float:
+        # Report throughput at real (unscaled) latencies
+        return args.replies * 60 / (seconds / args.scale)
+
+    baseline = asyncio.run(run_sequential(session(), args.replies))
+    logger.info(f"sequential: {per_minute(baseline):.1f} replies/min")
+    for concurrency in args.concurrency:
+        seconds = asyncio.run(run_pipelined(session(), args.replies, concurrency))
+        logger.info(f"pipelined x{concurrency}: {per_minute(seconds):.1f} replies/min "
+                    f"({baseline / seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
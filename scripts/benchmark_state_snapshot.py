@@ -0,0 +1,115 @@
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = "data/agent_state.snapshot"
+
+def generate_state(root: Path, handles: int, messages: int, replied: int):
+    """Write synthetic conversations, replied tweet log and tweet history"""
+    data_dir = root / "data" / "conversations"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    for i in range(handles):
+        dms = [
+            {
+                'text': f"synthetic message {j} about building a workbench",
+                'timestamp': now - random.randint(0, 86400 * 90),
+                'from_us': j % 2 == 1,
+                'type': 'dm'
+            } for j in range(messages)
+        ]
+        with open(data_dir / f"@user{i}.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'dms': dms,
+                'mentions': [],
+                'last_interaction': None,
+                'metadata': {'first_seen': None, 'total_interactions': len(dms)}
+            }, f, indent=2)
+
+    base_id = 1800000000000000000
+    with open(root / "data" / "replied_mentions.jsonl", 'w', encoding='utf-8') as f:
+        for i in range(replied):
+            f.write(json.dumps({'id': str(base_id + i * 4194304), 't': now}) + "\n")
+    with open(root / "data" / "tweet_ledger.jsonl", 'w', encoding='utf-8') as f:
+        for i in range(500):
+            f.write(json.dumps({'text': f"tweet {i}", 'timestamp': now - (500 - i) * 1200,
+                                'source': 'auto', 'id': f"bench{i}"}) + "\n")
+
+def run_startup(mode: str, working_set: int):
+    """Start memory the given way, then touch the working set of handles"""
+    # Keep per-handle load logging out of the measurement
+    logging.getLogger('src.agent').setLevel(logging.WARNING)
+    start = time.perf_counter()
+    if mode == "eager":
+        memory = ConversationMemory(max_resident=None, replied_retention_days=None)
+        memory.load_all_conversations()
+    elif mode == "lazy":
+        memory = ConversationMemory(replied_retention_days=None)
+    else:
+        memory = ConversationMemory(replied_retention_days=None, snapshot_path=SNAPSHOT_PATH)
+    ready = time.perf_counter() - start
+    for i in range(working_set):
+        memory.get_dms(f"@user{i}")
+    warm = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'mode': mode, 'ready': ready, 'warm': warm, 'max_rss_mb': rss_mb}))
+
+def write_initial_snapshot(working_set: int):
+    """Simulate the clean shutdown that leaves a snapshot behind"""
+    memory = ConversationMemory(replied_retention_days=None, snapshot_path=SNAPSHOT_PATH)
+    for i in range(working_set):
+        memory.get_dms(f"@user{i}")
+    memory.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold start from JSON files vs the state snapshot")
+    parser.add_argument("--handles", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=10)
+    parser.add_argument("--replied", type=int, default=200000)
+    parser.add_argument("--working-set", type=int, default=1000)
+    parser.add_argument("--run", choices=["eager", "lazy", "snapshot", "prepare"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run == "prepare":
+        write_initial_snapshot(args.working_set)
+        sys.exit(0)
+    if args.run:
+        run_startup(args.run, args.working_set)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logger.info(f"Generating {args.handles} handles and {args.replied} replied tweet IDs...")
+        generate_state(Path(tmp), args.handles, args.messages, args.replied)
+
+        # Each mode runs in a fresh process so timings and RSS are independent
+        for mode in ("prepare", "eager", "lazy", "snapshot"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", mode, "--working-set", str(args.working_set)],
+                capture_output=True, text=True, check=True, cwd=tmp
+            ).stdout
+            if mode == "prepare":
+                continue
+            result = json.loads(output.strip().splitlines()[-1])
+            logger.info(f"{mode:>8}: ready in {result['ready']:.3f}s, {args.working_set} handles warm in "
+                        f"{result['warm']:.3f}s, {result['max_rss_mb']:.0f} MB max RSS")
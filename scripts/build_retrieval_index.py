@@ -0,0 +1,55 @@
+import sys
+import shutil
+import logging
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory, normalize_timestamp
+from src.agent.retrieval_index import RetrievalIndex
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def build_index(data_dir: str, index_dir: str, storage_mode: str) -> int:
+    """Index every stored DM and mention, archived history included"""
+    memory = ConversationMemory(data_dir=data_dir, storage_mode=storage_mode, compact_interval=None)
+    index = RetrievalIndex(index_dir)
+    indexed = 0
+    for handle in memory.get_all_handles():
+        messages = list(memory.iter_archived(handle))
+        conversation = memory.get_all_conversations(handle)
+        messages += conversation.get('dms', []) + conversation.get('mentions', [])
+        for message in messages:
+            if index.add(handle, message, normalize_timestamp(message.get('timestamp'))):
+                indexed += 1
+        # Keep only a bounded working set resident while walking every handle
+        memory.memory.pop(handle, None)
+    index.flush()
+    return indexed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the conversation retrieval index from stored history")
+    parser.add_argument("--data-dir", default="data/conversations")
+    parser.add_argument("--index-dir", default="data/retrieval")
+    parser.add_argument("--storage-mode", default="json", choices=ConversationMemory.STORAGE_MODES)
+    parser.add_argument("--force", action="store_true", help="Replace an existing index")
+    args = parser.parse_args()
+
+    index_dir = Path(args.index_dir)
+    if index_dir.exists() and any(index_dir.iterdir()):
+        if not args.force:
+            logger.error(f"{index_dir} already exists; pass --force to rebuild it")
+            sys.exit(1)
+        shutil.rmtree(index_dir)
+
+    count = build_index(args.data_dir, args.index_dir, args.storage_mode)
+    logger.info(f"Indexed {count} messages into {args.index_dir}")
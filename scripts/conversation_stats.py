@@ -0,0 +1,61 @@
+import sys
+import logging
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+from src.agent.conversation_export import ColumnarExport
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def report(export: ColumnarExport, top: int):
+    """Log messages per hour, busiest correspondents and reply rates"""
+    timestamps = export['timestamp']
+    dated = timestamps[~np.isnan(timestamps)]
+    logger.info(f"{len(export)} messages from {len(export.handles)} handles ({len(dated)} dated)")
+
+    hours = np.bincount((dated // 3600 % 24).astype(np.int64), minlength=24)
+    logger.info("Messages per hour of day (UTC):")
+    for hour, count in enumerate(hours):
+        logger.info(f"  {hour:02d}:00  {count}")
+
+    handles = export['handle']
+    from_us = export['from_us']
+    totals = np.bincount(handles, minlength=len(export.handles))
+    sent = np.bincount(handles, weights=from_us == 1, minlength=len(export.handles))
+    received = totals - sent
+    logger.info(f"Busiest {top} correspondents (messages, our replies per received message):")
+    for handle_id in np.argsort(-totals, kind='stable')[:top]:
+        rate = sent[handle_id] / received[handle_id] if received[handle_id] else float('nan')
+        logger.info(f"  {export.handles[handle_id]}: {totals[handle_id]}, reply rate {rate:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export conversations to NumPy columns and summarize them")
+    parser.add_argument("--data-dir", default="data/conversations")
+    parser.add_argument("--storage-mode", default="json", choices=ConversationMemory.STORAGE_MODES)
+    parser.add_argument("--out", default="data/export", help="Directory for the columnar export")
+    parser.add_argument("--kind", choices=["dms", "mentions"])
+    parser.add_argument("--since", help="Earliest timestamp (epoch or ISO-8601)")
+    parser.add_argument("--until", help="Timestamp to stop before (epoch or ISO-8601)")
+    parser.add_argument("--direction", choices=["sent", "received"])
+    parser.add_argument("--reuse", action="store_true", help="Summarize an existing export without re-exporting")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    if not args.reuse:
+        memory = ConversationMemory(data_dir=args.data_dir, storage_mode=args.storage_mode,
+                                    compact_interval=None, replied_retention_days=None)
+        from_us = None if args.direction is None else args.direction == "sent"
+        memory.export_columns(args.out, kind=args.kind, since=args.since, until=args.until, from_us=from_us)
+    report(ColumnarExport(args.out), args.top)
@@ -40,7 +40,7 @@ logger = logging.getLogger(__name__)
 
 async def debug_conversations():
     """Orchestrate our existing scripts to get complete DM details"""
-    memory = ConversationMemory()
+    memory = ConversationMemory(shared=True)
     handler = None
     
     try:
@@ -27,26 +27,14 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from src.agent.action_handler import ActionHandler
-
-def load_replied_mentions():
-    """Load previously replied mentions"""
-    try:
-        with open('data/replied_mentions.json', 'r') as f:
-            return set(json.load(f))
-    except:
-        return set()
-
-def save_replied_mentions(mentions):
-    """Save replied mentions"""
-    with open('data/replied_mentions.json', 'w') as f:
-        json.dump(list(mentions), f)
+from src.agent.replied_tweets import RepliedTweetStore
 
 async def debug_mentions():
     """Debug script to test mention handling with detailed logging"""
     handler = None
     try:
         handler = ActionHandler(headless=False)
-        replied_mentions = load_replied_mentions()
+        replied_mentions = RepliedTweetStore()
         
         # Login check
         logger.info("Checking login state...")
@@ -256,7 +244,6 @@ async def debug_mentions():
                     
                     # Save mention right after clicking post button
                     replied_mentions.add(tweet_id)
-                    save_replied_mentions(replied_mentions)
                     logger.info(f"Added tweet {tweet_id} to replied mentions")
                     logger.info(f"Total replied mentions: {len(replied_mentions)}")
                     
@@ -45,7 +45,7 @@ async def get_handle_from_conversation(conv, selectors):
 async def list_dm_previews(memory: ConversationMemory = None, existing_handler: ActionHandler = None):
     """List all DM conversations and match them with memory handles"""
     if memory is None:
-        memory = ConversationMemory()
+        memory = ConversationMemory(shared=True)
         
     handler = existing_handler
     cleanup_needed = False
@@ -104,7 +104,7 @@ async def list_dm_previews(memory: ConversationMemory = None, existing_handler:
 
 if __name__ == "__main__":
     try:
-        memory = ConversationMemory()
+        memory = ConversationMemory(shared=True)
         handle_map = asyncio.run(list_dm_previews(memory))
         
         if handle_map:
@@ -0,0 +1,29 @@
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.sqlite_conversation_memory import migrate_json_to_sqlite
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate JSON conversation memory to SQLite")
+    parser.add_argument("--json-dir", default="data/conversations")
+    parser.add_argument("--db-path", default="data/conversations.db")
+    parser.add_argument("--replied-file", default="data/replied_mentions.json")
+    parser.add_argument("--replied-log", default="data/replied_mentions.jsonl")
+    args = parser.parse_args()
+
+    counts = migrate_json_to_sqlite(args.json_dir, args.db_path, args.replied_file, args.replied_log)
+    logger.info(f"Migration complete: {counts}")
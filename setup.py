@@ -17,6 +17,7 @@ setup(
         'requests>=2.31.0',
         'websockets>=11.0.3',
         'aiohttp>=3.9.1',
+        'tiktoken>=0.7.0',
         'pytest-mock>=3.11.1',
         'pytest-cov>=4.1.0',
         'torch>=2.0.1',
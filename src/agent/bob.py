@@ -1,7 +1,7 @@
-from typing import Dict, List
-import openai
+from typing import Dict, List, Optional
 from datetime import datetime
 from .memory import Memory
+from .conversation_memory import ConversationMemory
 from .personality import BobPersonality
 from .confidence_manager import ConfidenceManager
 from .action_handler import ActionHandler
@@ -10,18 +10,28 @@ import asyncio
 import numpy as np
 from .conversation_manager import ConversationManager
 from .cognitive_streams import CognitiveStreams
+from .llm_gateway import get_gateway
+from .speculative import SpeculativeChain
 
 class BobTheBuilder:
-    def __init__(self, api_key: str, hf_token: str):
+    REPLY_PARAMS = {"temperature": 0.7, "max_tokens": 150, "presence_penalty": 0.6, "frequency_penalty": 0.3}
+    RELEVANT_MESSAGES = 3  # Older relevant messages added to the recent history
+
+    def __init__(self, api_key: str, hf_token: str, speculative: bool = True,
+                 history: Optional[ConversationMemory] = None):
         self.memory = Memory()
+        # Stored DMs and mentions searched for relevant earlier messages
+        self.history = history
         self.personality = BobPersonality()
         self.confidence_manager = ConfidenceManager()
         self.action_handler = ActionHandler()
         
-        # Initialize OpenAI clients for dual processing
+        # Models for dual processing, served through the shared LLM gateway
         self.large_model = "gpt-4o"  # For deep thinking
         self.small_model = "gpt-4o-mini"  # For quick responses
-        openai.api_key = api_key
+        self.llm = get_gateway(api_key)
+        # Draft with the small model while the large model analyzes
+        self.speculative = SpeculativeChain(enabled=speculative)
         
         self.audio_processor = AudioProcessor(hf_token)
         self.current_speakers = set()
@@ -59,15 +69,16 @@ class BobTheBuilder:
         """
         
         # Use GPT-4 for deep analysis
-        response = await openai.ChatCompletion.create(
+        response = await self.llm.chat(
             model=self.large_model,
+            channel="space",
             messages=[
                 {"role": "system", "content": self.personality.get_persona_prompt()},
                 {"role": "user", "content": prompt}
             ]
         )
         
-        return response.choices[0].message.content
+        return response
             
     def _log_action(self, action: str):
         """Log actions to log.txt"""
@@ -86,12 +97,34 @@ class BobTheBuilder:
         recent_messages = self._get_recent_context(context)
         current_topic = self._extract_topic(recent_messages)
         
-        # First use GPT-4 to analyze the conversation deeply
-        analysis = await openai.ChatCompletion.create(
-            model=self.large_model,
-            messages=[
-                {"role": "system", "content": self.personality.get_persona_prompt()},
-                {"role": "user", "content": f"""
+        # Draft a contribution with the small model straight away
+        async def draft() -> str:
+            return await self.llm.chat(
+                model=self.small_model,
+                channel="space",
+                messages=[
+                    {"role": "system", "content": self.personality.get_persona_prompt()},
+                    {"role": "user", "content": f"""
+                Topic: {current_topic}
+                Recent messages: {recent_messages}
+                
+                Craft a helpful, humble response to this conversation that:
+                - Acknowledges others' contributions
+                - Shares relevant building/construction expertise
+                - Asks thoughtful questions when uncertain
+                - Keeps the response concise and focused
+                """}
+                ]
+            )
+
+        # Meanwhile use the large model to analyze the conversation deeply
+        async def analyze() -> str:
+            return await self.llm.chat(
+                model=self.large_model,
+                channel="space",
+                messages=[
+                    {"role": "system", "content": self.personality.get_persona_prompt()},
+                    {"role": "user", "content": f"""
                 Analyze this conversation context as Bob the Builder:
                 Topic: {current_topic}
                 Recent messages: {recent_messages}
@@ -102,16 +135,18 @@ class BobTheBuilder:
                 3. Potential concerns or corrections needed
                 4. Suggested approach for contribution
                 """}
-            ]
-        )
+                ]
+            )
         
-        # Then use GPT-3.5 to quickly formulate the response
-        response = await openai.ChatCompletion.create(
-            model=self.small_model,
-            messages=[
-                {"role": "system", "content": self.personality.get_persona_prompt()},
-                {"role": "user", "content": f"""
-                Based on this analysis: {analysis.choices[0].message.content}
+        # Drafts that miss the analysis's points are rewritten from it
+        async def revise(analysis: str) -> str:
+            return await self.llm.chat(
+                model=self.small_model,
+                channel="space",
+                messages=[
+                    {"role": "system", "content": self.personality.get_persona_prompt()},
+                    {"role": "user", "content": f"""
+                Based on this analysis: {analysis}
                 
                 Craft a helpful, humble response that:
                 - Acknowledges others' contributions
@@ -119,10 +154,11 @@ class BobTheBuilder:
                 - Asks thoughtful questions when uncertain
                 - Keeps the response concise and focused
                 """}
-            ]
-        )
+                ]
+            )
         
-        return response.choices[0].message.content
+        text = " ".join(message.get('text', '') for message in recent_messages)
+        return await self.speculative.run(draft, analyze, revise, text=text)
     
     def _get_recent_context(self, context: Dict, window: int = 5) -> List[Dict]:
         """Get recent messages for context"""
@@ -143,7 +179,8 @@ class BobTheBuilder:
         try:
             self.cognitive_streams.is_processing = False
             self.audio_processor.stop_listening()
-            await self.memory.save_state()  # New method needed in Memory class
+            await self.memory.save_state()
+            self.speculative.log_summary()
             self._log_action("Bot shutting down gracefully")
         except Exception as e:
             self._log_action(f"Error during shutdown: {e}") 
@@ -183,6 +220,12 @@ class BobTheBuilder:
                 
             # Get relevant context from memory
             history = self.memory.get_recent_context(handle, limit=5)
+            if self.history is not None:
+                # Older messages that match this one come before the recent window
+                seen = {msg.get('text') for msg in history} | {message}
+                relevant = [msg for msg in self.history.search_history(handle, message, k=self.RELEVANT_MESSAGES)
+                            if msg.get('text') not in seen]
+                history = relevant[::-1] + history
             
             # Format conversation history for RAG
             conversation_context = []
@@ -193,37 +236,58 @@ class BobTheBuilder:
                     "content": msg.get('text', '')
                 })
             
-            # First use large model for deep analysis
-            analysis = await openai.ChatCompletion.create(
-                model=self.large_model,
-                messages=[
-                    {"role": "system", "content": self.personality.get_persona_prompt()},
-                    *conversation_context,
-                    {"role": "user", "content": f"Analyze this conversation with {handle} and provide key points to address in our response."}
-                ]
-            )
+            # Draft a reply with the small model straight away
+            async def draft() -> str:
+                return await self.llm.chat(
+                    model=self.small_model,
+                    channel=context_type,
+                    messages=[
+                        {"role": "system", "content": self.personality.get_persona_prompt()},
+                        *conversation_context,
+                        {"role": "user", "content": message}
+                    ],
+                    hedge=True,
+                    **self.REPLY_PARAMS
+                )
+
+            # Meanwhile use the large model for deep analysis
+            async def analyze() -> str:
+                return await self.llm.chat(
+                    model=self.large_model,
+                    channel=context_type,
+                    messages=[
+                        {"role": "system", "content": self.personality.get_persona_prompt()},
+                        *conversation_context,
+                        {"role": "user", "content": f"Analyze this conversation with {handle} and provide key points to address in our response."}
+                    ]
+                )
             
-            # Then use small model for quick response generation
-            messages = [
-                {"role": "system", "content": f"""You are {self.personality.name}. Use this analysis to craft a response: {analysis.choices[0].message.content}"""},
-                *conversation_context,
-                {"role": "user", "content": message}
-            ]
+            # Drafts that miss the analysis's points are rewritten from it
+            async def revise(analysis: str) -> str:
+                return await self.llm.chat(
+                    model=self.small_model,
+                    channel=context_type,
+                    messages=[
+                        {"role": "system", "content": f"""You are {self.personality.name}. Use this analysis to craft a response: {analysis}"""},
+                        *conversation_context,
+                        {"role": "user", "content": message}
+                    ],
+                    hedge=True,
+                    **self.REPLY_PARAMS
+                )
             
-            response = await openai.ChatCompletion.create(
-                model=self.small_model,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=150,
-                presence_penalty=0.6,
-                frequency_penalty=0.3
-            )
+            response = await self.speculative.run(draft, analyze, revise, text=message)
             
-            reply = response.choices[0].message.content.strip()
+            reply = response.strip()
             
             # Store interaction in memory
-            current_time = datetime.now().isoformat()
-            self.memory.add_interaction(handle, message, reply, current_time, context_type)
+            self.memory.add_interaction({
+                'handle': handle,
+                'message': message,
+                'reply': reply,
+                'timestamp': datetime.now().isoformat(),
+                'context_type': context_type
+            })
             
             return reply
             
@@ -1,20 +1,133 @@
 import logging
 import asyncio
 from typing import List, Dict, Optional
-import openai
 from datetime import datetime, timedelta
 import os
 from .conversation_memory import ConversationMemory
+from .response_cache import ResponseCache
+from .llm_gateway import LLMGateway, get_gateway
+from .reply_stream import StreamedReply
+from .prompt_builder import PromptBuilder, count_tokens
+from .model_router import REPLY_TIERS, TWEET_TIERS
 import random
 
 logger = logging.getLogger(__name__)
 
+# Prompt templates; the persona parts are filled once per agent in __init__
+PERSONA_TEMPLATE = """You are {name}, a friendly and knowledgeable {role}. Your personality traits:
+
+1. Helpful and encouraging - You love helping others build and create
+2. Practical and experienced - You provide realistic, actionable advice
+3. Safety-conscious - You always emphasize proper safety measures
+4. Community-minded - You value collaboration and sharing knowledge
+5. Humble - You're confident in your expertise but never boastful
+6. Patient - You understand that learning and building take time
+7. Environmentally conscious - You promote sustainable building practices
+
+Your interests include: {interests}
+
+When speaking:
+- Use clear, practical language
+- Share specific examples and tips
+- Encourage safe practices
+- Be positive and supportive
+- Ask questions to better understand needs
+- Share relevant personal experiences
+- Promote sustainable solutions
+
+Remember: You're here to help people build and create, not to dominate the conversation."""
+
+PERSONA_HEADER_TEMPLATE = """You are {name}, {role}.
+Your traits: {traits}
+Your interests: {interests}"""
+
+REPLY_TEMPLATE = """Current confidence level with {handle}: {confidence:.2f}
+
+Relevant earlier messages:
+{relevant}
+
+Recent conversation history:
+{history}
+
+Current message from {handle} ({context_type}): {message}
+
+Based on your personality and the conversation history, craft a response that:
+1. Maintains your builder/helper personality
+2. Shows appropriate confidence level ({confidence:.2f})
+3. References relevant context from history if available
+4. Focuses on helping them build or create something
+
+Response:"""
+
+REPLY_SYSTEM_PROMPT = "You are Bob the Builder, an AI who loves to help people build things. Keep responses friendly and focused on building/making things."
+
+SPACE_ANALYSIS_PROMPT = "Analyze the space conversation and determine:\n1. The main topics being discussed\n2. The expertise level of participants\n3. Whether Bob's expertise would be valuable\n4. A confidence score (0-1) for Bob to speak\n5. Potential contributions Bob could make"
+SPACE_ANALYSIS_TEMPLATE = "Space Context:\n{context}\n\nTime spent listening: {minutes} minutes"
+SPACE_RESPONSE_PROMPT = "Generate a thoughtful contribution to the space conversation that:\n1. Adds value to the discussion\n2. Demonstrates expertise without being overbearing\n3. Encourages further discussion\n4. Maintains Bob's friendly and helpful personality"
+SPACE_RESPONSE_TEMPLATE = "Space Context:\n{context}"
+
+TWEET_SYSTEM_PROMPT = "You are Bob the Builder, an AI who loves to help people build things. Generate a tweet that's helpful and focused on building/making things. Ensure the content is fresh and different from recent tweets."
+TWEET_TEMPLATE = """As Bob the Builder, create an engaging tweet about {topic}.
+Keep it helpful and positive, focusing on building and creating things.
+Make it sound natural and conversational, like I'm sharing my expertise with friends.
+Keep it under 280 characters."""
+TWEET_AVOID_TEMPLATE = """
+
+Generate a tweet that's different from these previous tweets in terms of:
+1. Topic and focus
+2. Tone and style
+3. Specific advice or insights shared
+4. Call to action or engagement approach
+{avoid}"""
+
+# Topics Bob likes to tweet about
+TWEET_TOPICS = [
+    "AI generations in modeling and simulation",
+    "creating datasets for machine learning applications",
+    "agentic applications of AI in various contexts",
+    "AI-driven innovations in technology and design",
+    "data modeling techniques for efficiency",
+    "AI applications in predictive analytics",
+    "using AI for optimizing workflows and processes",
+    "ethical considerations in AI development",
+    "AI's role in enhancing collaborative efforts",
+    "advancements in AI for smart solutions",
+    "sustainable practices in AI development",
+    "the impact of AI on overall project efficiency",
+    "collaborative tools powered by AI",
+    "AI's influence on design thinking and creativity",
+    "the future of AI in smart cities and integration",
+    "using AI for risk management in various scenarios",
+    "the role of AI in enhancing user experience across platforms",
+    "AI's impact on societal change and adaptation",
+    "the intersection of AI and human creativity",
+    "AI in enhancing educational methodologies and resources",
+    "the role of AI in global communication and connectivity",
+    "AI's contribution to environmental sustainability efforts",
+    "using AI for improving decision-making processes",
+    "AI in enhancing data security and privacy measures",
+    "the future of AI in shaping cultural narratives",
+    "AI's role in fostering innovation and creativity",
+    "the ethical implications of AI in everyday life",
+    "AI's influence on public policy and governance",
+    "the potential of AI in addressing global challenges",
+    "AI in enhancing accessibility and inclusivity in technology",
+    "the role of AI in shaping future job markets",
+    "AI's impact on personal and collective identity",
+    "using AI for enhancing community engagement and participation"
+]
+
 class BobTheBuilder:
-    def __init__(self, api_key: str, memory: Optional[ConversationMemory] = None):
+    RELEVANT_CANDIDATES = 8  # Retrieval hits considered before the token budget is applied
+    REPLY_PARAMS = {"model": "gpt-3.5-turbo", "temperature": 0.7, "max_tokens": 150}  # Model is routed per reply
+
+    def __init__(self, api_key: str, memory: Optional[ConversationMemory] = None,
+                 response_cache: Optional[ResponseCache] = None, llm: Optional[LLMGateway] = None):
         """Initialize Bob with his personality and memory"""
         self.api_key = api_key
-        self.client = openai.AsyncOpenAI(api_key=api_key)  # Create AsyncOpenAI client
+        self.llm = llm if llm is not None else get_gateway(api_key)  # Shared pooled LLM client
         self.memory = memory if memory else ConversationMemory()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
         self.personality = {
             "name": "Bob the Builder",
             "role": "AI assistant who loves to help people build things",
@@ -33,6 +146,16 @@ class BobTheBuilder:
                 "problem-solving"
             ]
         }
+        # Static prompt prefixes are built once so their token counts stay cached
+        persona = {
+            "name": self.personality["name"],
+            "role": self.personality["role"],
+            "traits": ", ".join(self.personality["traits"]),
+            "interests": ", ".join(self.personality["interests"]),
+        }
+        self.persona_prompt = PERSONA_TEMPLATE.format(**persona)
+        header = PERSONA_HEADER_TEMPLATE.format(**persona).replace("{", "{{").replace("}", "}}")
+        self.reply_template = f"{header}\n\n{REPLY_TEMPLATE}"
         self.confidence = {}  # Track confidence per conversation
         
     def _get_confidence(self, handle: str) -> float:
@@ -44,43 +167,72 @@ class BobTheBuilder:
         current = self._get_confidence(handle)
         self.confidence[handle] = max(0.0, min(1.0, current + delta))
         
-    def _format_conversation_history(self, handle: str, limit: int = 5) -> str:
-        """Format recent conversation history for context"""
-        history = self.memory.get_recent_context(handle, limit)
-        if not history:
-            return "No previous conversation history."
-            
-        formatted = "Recent conversation history:\n"
-        for msg in history:
-            speaker = "Bob" if msg.get('is_from_us') else handle
-            formatted += f"{speaker}: {msg.get('text', 'No text')}\n"
-        return formatted
-        
-    def _create_prompt(self, handle: str, current_message: str, context_type: str) -> str:
-        """Create a prompt with personality and context"""
-        confidence = self._get_confidence(handle)
-        history = self._format_conversation_history(handle)
-        
-        prompt = f"""You are {self.personality['name']}, {self.personality['role']}.
-Your traits: {', '.join(self.personality['traits'])}
-Your interests: {', '.join(self.personality['interests'])}
-
-Current confidence level with {handle}: {confidence:.2f}
+    def _relevant_history(self, handle: str, query: str, exclude: List[Dict],
+                          budget_tokens: int) -> List[Dict]:
+        """Get older messages relevant to the query that fit in the token budget"""
+        if not query or not hasattr(self.memory, 'search_history'):
+            return []
+        seen = {msg.get('text') for msg in exclude}
+        seen.add(query)
+        relevant = []
+        for msg in self.memory.search_history(handle, query, k=self.RELEVANT_CANDIDATES):
+            text = msg.get('text', '')
+            if text in seen:
+                continue
+            cost = count_tokens(text, self.REPLY_PARAMS["model"])
+            if cost > budget_tokens:
+                continue
+            budget_tokens -= cost
+            seen.add(text)
+            relevant.append(msg)
+        return relevant
 
-{history}
+    def _history_lines(self, handle: str, messages: List[Dict]) -> List[str]:
+        """Format messages as speaker-prefixed lines"""
+        return [f"{'Bob' if msg.get('is_from_us') else handle}: {msg.get('text', 'No text')}"
+                for msg in messages]
 
-Current message from {handle} ({context_type}): {current_message}
+    def _recent_history(self, handle: str, current_message: str, limit: int = 5) -> List[Dict]:
+        """A handle's recent messages, without the one being answered"""
+        # The message being answered may already be stored; it is quoted on its own line
+        return [msg for msg in self.memory.get_recent_context(handle, limit)
+                if msg.get('text') != current_message]
 
-Based on your personality and the conversation history, craft a response that:
-1. Maintains your builder/helper personality
-2. Shows appropriate confidence level ({confidence:.2f})
-3. References relevant context from history if available
-4. Focuses on helping them build or create something
+    def _create_prompt(self, handle: str, current_message: str, context_type: str,
+                       model: Optional[str] = None, limit: int = 5, budget_tokens: int = 300) -> List[Dict]:
+        """Create the reply messages with personality and as much context as the model's budget allows"""
+        history = self._recent_history(handle, current_message, limit)
+        relevant = self._relevant_history(handle, current_message, history, budget_tokens)
+        return PromptBuilder(model or self.REPLY_PARAMS["model"]).messages(
+            REPLY_SYSTEM_PROMPT,
+            self.reply_template,
+            # Recent messages take the budget first, then older relevant ones
+            lists={
+                "history": self._history_lines(handle, history) or ["No previous conversation history."],
+                "relevant": self._history_lines(handle, relevant) or ["None"],
+            },
+            handle=handle,
+            confidence=self._get_confidence(handle),
+            context_type=context_type,
+            message=current_message
+        )
+        
+    def _note_interaction(self, handle: str, context_type: str):
+        """Update confidence based on interaction"""
+        if context_type == "space":
+            self._update_confidence(handle, 0.05)
+        elif context_type == "mention":
+            self._update_confidence(handle, 0.1)
+        elif context_type == "dm":
+            self._update_confidence(handle, 0.15)
+        
+        logger.info(f"Current confidence with {handle}: {self._get_confidence(handle):.2f}")
 
-Response:"""
+    def _reply_params(self, handle: str, message: str) -> Dict:
+        """Reply parameters with the model routed for this message and conversation"""
+        depth = len(self.memory.get_recent_context(handle, 10))
+        return {**self.REPLY_PARAMS, "model": self.llm.router.choose(message, REPLY_TIERS, depth=depth)}
 
-        return prompt
-        
     async def generate_response(self, handle: str, message: str, context_type: str = "dm") -> str:
         """Generate a contextual response using ChatGPT with RAG"""
         try:
@@ -91,43 +243,30 @@ Response:"""
             logger.info(f"\nGenerating response for {context_type} from {handle}")
             logger.info(f"Input message: {message}")
             
-            # Update confidence based on interaction
-            if context_type == "space":
-                self._update_confidence(handle, 0.05)
-            elif context_type == "mention":
-                self._update_confidence(handle, 0.1)
-            elif context_type == "dm":
-                self._update_confidence(handle, 0.15)
-            
-            logger.info(f"Current confidence with {handle}: {self._get_confidence(handle):.2f}")
+            self._note_interaction(handle, context_type)
+
+            cached = self.response_cache.get(message, context_type, handle)
+            if cached is not None:
+                logger.info(f"Serving cached response (hit rate {self.response_cache.hit_rate:.0%}): {cached[:100]}...")
+                return cached
             
             try:
-                # Generate response with ChatGPT
-                response = await self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",  # Use standard model name
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": f"You are Bob the Builder, an AI who loves to help people build things. Keep responses friendly and focused on building/making things."
-                        },
-                        {
-                            "role": "user",
-                            "content": message
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=150
+                # Generate response with ChatGPT, within the routed model's prompt budget
+                params = self._reply_params(handle, message)
+                reply = await self.llm.chat(
+                    self._create_prompt(handle, message, context_type, params["model"]),
+                    channel=context_type,
+                    deadline=20.0,
+                    hedge=True,  # Someone is waiting on this reply
+                    **params
                 )
                 
-                logger.debug(f"Raw OpenAI response: {response}")
-                
-                if response and response.choices:
-                    reply = response.choices[0].message.content.strip()
-                    logger.info(f"Generated response: {reply[:100]}...")
-                    return reply
-                else:
-                    logger.error("No choices in OpenAI response")
-                    return None
+                reply = reply.strip()
+                logger.info(f"Generated response: {reply[:100]}...")
+                # A reply shaped by the asker's history is only ever served back to them
+                self.response_cache.put(message, context_type, reply, handle,
+                                        private=bool(self._recent_history(handle, message)))
+                return reply
                     
             except Exception as e:
                 logger.error(f"OpenAI API error: {str(e)}")
@@ -138,6 +277,63 @@ Response:"""
             logger.error(f"Error in generate_response: {str(e)}")
             logger.exception("Full traceback:")
             return None
+
+    async def stream_response(self, handle: str, message: str, context_type: str = "dm") -> Optional[StreamedReply]:
+        """Start a response that can be typed while it is still being generated.
+
+        Returns once the first text has arrived, or None if no reply could be
+        generated. Cached replies come back as an already complete stream. If
+        the stream breaks, its fallback generates the reply without streaming.
+        """
+        try:
+            if not message:
+                logger.error("Empty message received")
+                return None
+
+            logger.info(f"\nStreaming response for {context_type} from {handle}")
+            logger.info(f"Input message: {message}")
+
+            self._note_interaction(handle, context_type)
+
+            cached = self.response_cache.get(message, context_type, handle)
+            if cached is not None:
+                logger.info(f"Serving cached response (hit rate {self.response_cache.hit_rate:.0%}): {cached[:100]}...")
+                return StreamedReply.from_text(cached)
+
+            private = bool(self._recent_history(handle, message))
+
+            def remember(reply: str):
+                # A reply shaped by the asker's history is only ever served back to them
+                self.response_cache.put(message, context_type, reply, handle, private=private)
+
+            params = self._reply_params(handle, message)
+            messages = self._create_prompt(handle, message, context_type, params["model"])
+
+            async def fallback() -> str:
+                # The stream's model just failed, so let the router reconsider
+                retry = self._reply_params(handle, message)
+                return await self.llm.chat(self._create_prompt(handle, message, context_type, retry["model"]),
+                                           channel=context_type, deadline=20.0, **retry)
+
+            reply = StreamedReply(
+                self.llm.stream_chat(messages, channel=context_type,
+                                     deadline=30.0, **params),
+                fallback=fallback,
+                on_complete=remember
+            )
+            if await reply.wait_started():
+                return reply
+
+            logger.error(f"Reply stream produced no text ({reply.error}), generating without streaming")
+            text = await reply.recover()
+            if not text:
+                return None
+            remember(text)
+            return StreamedReply.from_text(text)
+
+        except Exception as e:
+            logger.error(f"Error in stream_response: {str(e)}")
+            return None
             
     def should_speak_in_space(self, handle: str, context: str) -> bool:
         """Determine if Bob should speak in a space based on confidence"""
@@ -174,17 +370,18 @@ Response:"""
     async def process_message(self, message: str, context: Dict) -> str:
         """Process a direct message using the fast model for quick responses."""
         try:
-            response = await openai.chat.completions.create(
+            return await self.llm.chat(
                 model="gpt-4o-mini",
+                channel="dm",
                 messages=[
                     {"role": "system", "content": self._get_personality_prompt()},
                     {"role": "system", "content": f"Context: {context}"},
                     {"role": "user", "content": message}
                 ],
                 temperature=0.7,
-                max_tokens=100
+                max_tokens=100,
+                hedge=True
             )
-            return response.choices[0].message.content
             
         except Exception as e:
             logger.error(f"Error processing message with fast model: {e}")
@@ -204,19 +401,18 @@ Response:"""
             time_spent = (datetime.now() - self.space_join_time).total_seconds() / 60
             
             # Analyze space context
-            response = await openai.chat.completions.create(
+            analysis = await self.llm.chat(
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self._get_personality_prompt()},
-                    {"role": "system", "content": "Analyze the space conversation and determine:\n1. The main topics being discussed\n2. The expertise level of participants\n3. Whether Bob's expertise would be valuable\n4. A confidence score (0-1) for Bob to speak\n5. Potential contributions Bob could make"},
-                    {"role": "user", "content": f"Space Context:\n{self.space_context}\n\nTime spent listening: {time_spent} minutes"}
-                ],
+                channel="space",
+                messages=PromptBuilder("gpt-4o-mini").messages(
+                    f"{self.persona_prompt}\n\n{SPACE_ANALYSIS_PROMPT}",
+                    SPACE_ANALYSIS_TEMPLATE,
+                    lists={"context": self.space_context},
+                    minutes=f"{time_spent:.1f}"
+                ),
                 temperature=0.7
             )
             
-            # Parse response
-            analysis = response.choices[0].message.content
-            
             # Update confidence based on time spent and analysis
             base_confidence = min(time_spent / 30, 0.5)  # Max 0.5 from time alone
             self.space_confidence = base_confidence + (float(analysis.split("confidence score: ")[1].split()[0]) * 0.5)
@@ -241,18 +437,17 @@ Response:"""
             return None
             
         try:
-            response = await openai.chat.completions.create(
+            return await self.llm.chat(
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self._get_personality_prompt()},
-                    {"role": "system", "content": "Generate a thoughtful contribution to the space conversation that:\n1. Adds value to the discussion\n2. Demonstrates expertise without being overbearing\n3. Encourages further discussion\n4. Maintains Bob's friendly and helpful personality"},
-                    {"role": "user", "content": f"Space Context:\n{self.space_context}"}
-                ],
+                channel="space",
+                messages=PromptBuilder("gpt-4o-mini").messages(
+                    f"{self.persona_prompt}\n\n{SPACE_RESPONSE_PROMPT}",
+                    SPACE_RESPONSE_TEMPLATE,
+                    lists={"context": self.space_context}
+                ),
                 temperature=0.7
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             logger.error(f"Error generating space response: {e}")
             return None
@@ -265,111 +460,34 @@ Response:"""
         
     def _get_personality_prompt(self) -> str:
         """Get Bob's personality prompt for the LLM."""
-        return f"""You are {self.name}, a friendly and knowledgeable {self.role}. Your personality traits:
+        return self.persona_prompt
 
-1. Helpful and encouraging - You love helping others build and create
-2. Practical and experienced - You provide realistic, actionable advice
-3. Safety-conscious - You always emphasize proper safety measures
-4. Community-minded - You value collaboration and sharing knowledge
-5. Humble - You're confident in your expertise but never boastful
-6. Patient - You understand that learning and building take time
-7. Environmentally conscious - You promote sustainable building practices
-
-Your interests include: {', '.join(self.interests)}
-
-When speaking:
-- Use clear, practical language
-- Share specific examples and tips
-- Encourage safe practices
-- Be positive and supportive
-- Ask questions to better understand needs
-- Share relevant personal experiences
-- Promote sustainable solutions
-
-Remember: You're here to help people build and create, not to dominate the conversation."""
-
-    async def generate_tweet(self, prompt: str = None) -> str:
-        """Generate a tweet using Bob's personality"""
+    async def generate_tweet(self, prompt: str = None, avoid: Optional[List[str]] = None) -> str:
+        """Generate a tweet using Bob's personality, steering away from the tweets in avoid"""
         try:
-            # Get recent tweets from tweet controller's history if available
-            recent_tweets = self.memory.get_recent_context('tweets', limit=5) if hasattr(self.memory, 'get_recent_context') else []
-            recent_tweets_str = "\n".join([f"Previous tweet: {tweet}" for tweet in recent_tweets]) if recent_tweets else "No recent tweets."
-
-            if not prompt:
-                # Topics Bob likes to tweet about
-                topics = [
-                    "AI generations in modeling and simulation",
-                    "creating datasets for machine learning applications",
-                    "agentic applications of AI in various contexts",
-                    "AI-driven innovations in technology and design",
-                    "data modeling techniques for efficiency",
-                    "AI applications in predictive analytics",
-                    "using AI for optimizing workflows and processes",
-                    "ethical considerations in AI development",
-                    "AI's role in enhancing collaborative efforts",
-                    "advancements in AI for smart solutions",
-                    "sustainable practices in AI development",
-                    "the impact of AI on overall project efficiency",
-                    "collaborative tools powered by AI",
-                    "AI's influence on design thinking and creativity",
-                    "the future of AI in smart cities and integration",
-                    "using AI for risk management in various scenarios",
-                    "the role of AI in enhancing user experience across platforms",
-                    "AI's impact on societal change and adaptation",
-                    "the intersection of AI and human creativity",
-                    "AI in enhancing educational methodologies and resources",
-                    "the role of AI in global communication and connectivity",
-                    "AI's contribution to environmental sustainability efforts",
-                    "using AI for improving decision-making processes",
-                    "AI in enhancing data security and privacy measures",
-                    "the future of AI in shaping cultural narratives",
-                    "AI's role in fostering innovation and creativity",
-                    "the ethical implications of AI in everyday life",
-                    "AI's influence on public policy and governance",
-                    "the potential of AI in addressing global challenges",
-                    "AI in enhancing accessibility and inclusivity in technology",
-                    "the role of AI in shaping future job markets",
-                    "AI's impact on personal and collective identity",
-                    "using AI for enhancing community engagement and participation"
-                ]
-                
-                prompt = f"""As Bob the Builder, create an engaging tweet about {random.choice(topics)}. 
-                Keep it helpful and positive, focusing on building and creating things.
-                Make it sound natural and conversational, like I'm sharing my expertise with friends.
-                Keep it under 280 characters.
-                
-                Recent tweet history to avoid repetition:
-                {recent_tweets_str}
-                
-                Generate a tweet that's different from these previous tweets in terms of:
-                1. Topic and focus
-                2. Tone and style
-                3. Specific advice or insights shared
-                4. Call to action or engagement approach"""
-
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are Bob the Builder, an AI who loves to help people build things. Generate a tweet that's helpful and focused on building/making things. Ensure the content is fresh and different from recent tweets."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+            # Repeats are caught after generation, so history is only sent when a draft collided
+            if prompt:
+                template, values = "{prompt}", {"prompt": prompt}
+            else:
+                template, values = TWEET_TEMPLATE, {"topic": random.choice(TWEET_TOPICS)}
+            # Tweets have no one waiting on them, so they allow a slower model than replies
+            model = self.llm.router.choose(prompt or values["topic"], TWEET_TIERS, slo=20.0)
+            lists = None
+            if avoid:
+                template += TWEET_AVOID_TEMPLATE
+                lists = {"avoid": [f"Previous tweet: {tweet}" for tweet in avoid]}
+
+            tweet = await self.llm.chat(
+                model=model,
+                channel="tweet",
+                messages=PromptBuilder(model).messages(TWEET_SYSTEM_PROMPT, template, lists, **values),
                 temperature=0.8,  # Slightly increased for more variety
                 max_tokens=80
             )
 
-            if response and response.choices:
-                tweet = response.choices[0].message.content.strip()
-                logger.info(f"Generated tweet: {tweet[:100]}...")
-                return tweet
-            else:
-                logger.error("No choices in OpenAI response")
-                return None
+            tweet = tweet.strip()
+            logger.info(f"Generated tweet: {tweet[:100]}...")
+            return tweet
 
         except Exception as e:
             logger.error(f"Error generating tweet: {e}")
@@ -1,7 +1,6 @@
 from typing import Dict, List, Optional
 import asyncio
 from datetime import datetime
-import openai
 from collections import deque
 import numpy as np
 
@@ -132,25 +131,27 @@ class CognitiveStreams:
     
     async def _analyze_content(self, segment: Dict) -> Dict:
         """Analyze technical content of speech"""
-        response = await openai.ChatCompletion.create(
+        response = await self.bob.llm.chat(
             model=self.bob.large_model,
+            channel="space",
             messages=[
                 {"role": "system", "content": self.bob.personality.get_persona_prompt()},
                 {"role": "user", "content": f"Analyze technical content: {segment['text']}"}
             ]
         )
-        return {"technical_analysis": response.choices[0].message.content}
+        return {"technical_analysis": response}
     
     async def _analyze_social_context(self, segment: Dict) -> Dict:
         """Analyze social context and dynamics"""
-        response = await openai.ChatCompletion.create(
+        response = await self.bob.llm.chat(
             model=self.bob.small_model,
+            channel="space",
             messages=[
                 {"role": "system", "content": self.bob.personality.get_persona_prompt()},
                 {"role": "user", "content": f"Analyze social dynamics: {segment['text']}"}
             ]
         )
-        return {"social_analysis": response.choices[0].message.content}
+        return {"social_analysis": response}
     
     async def _analyze_relevance(self, segment: Dict) -> float:
         """Calculate relevance score for the segment"""
@@ -176,8 +177,9 @@ class CognitiveStreams:
                 for mem in memories
             ])
             
-            response = await openai.ChatCompletion.create(
+            response = await self.bob.llm.chat(
                 model=self.bob.large_model,
+                channel="space",
                 messages=[
                     {"role": "system", "content": "Summarize these conversation memories"},
                     {"role": "user", "content": memory_text}
@@ -185,7 +187,7 @@ class CognitiveStreams:
             )
             
             return {
-                "summary": response.choices[0].message.content,
+                "summary": response,
                 "period": {
                     "start": memories[0]["timestamp"],
                     "end": memories[-1]["timestamp"]
@@ -233,15 +235,16 @@ class CognitiveStreams:
             4. Remains humble and helpful
             """
             
-            response = await openai.ChatCompletion.create(
+            response = await self.bob.llm.chat(
                 model=self.bob.small_model,
+                channel="space",
                 messages=[
                     {"role": "system", "content": self.bob.personality.get_persona_prompt()},
                     {"role": "user", "content": prompt}
                 ]
             )
             
-            return response.choices[0].message.content
+            return response
         except Exception as e:
             print(f"Error generating response: {e}")
             return ""
@@ -0,0 +1,155 @@
+import os
+import gzip
+import json
+import shutil
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from .conversation_manifest import shard_path
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+UNDATED_SEGMENT = "undated"
+
+def segment_month(ts: Optional[float]) -> str:
+    """Get the archive segment name (YYYY-MM, UTC) for a normalized timestamp"""
+    if ts is None:
+        return UNDATED_SEGMENT
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m")
+
+
+class ConversationArchive:
+    """Compressed cold storage for old conversation messages.
+
+    Each handle gets a directory of per-month segments
+    (``<shard>/<handle>/<YYYY-MM>.jsonl.gz``). Archiving appends a new compressed
+    member to a segment, which gzip and zstd readers both treat as one
+    continuous stream, so segments are never rewritten. Every line carries
+    the message kind and its ordinal in that kind's full history; readers
+    use the ordinals to drop lines from an archival that was never committed
+    to the hot conversation, and duplicates written by a retried one.
+    """
+
+    COMPRESSIONS = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+    def __init__(self, archive_dir: Path, compression: str = "gzip"):
+        """Initialize the archive.
+
+        Args:
+            archive_dir: Directory holding one sharded subdirectory per handle
+            compression: "gzip", or "zstd" when the zstandard package is installed
+        """
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd archive compression requires the zstandard package")
+        self.archive_dir = Path(archive_dir)
+        self.compression = compression
+
+    def handle_dir(self, handle: str) -> Path:
+        """Get the segment directory for a handle"""
+        return shard_path(self.archive_dir, handle)
+
+    def segments(self, handle: str) -> List[Path]:
+        """Get a handle's segments, oldest month first (undated first)"""
+        handle_dir = self.handle_dir(handle)
+        if not handle_dir.exists():
+            return []
+        paths = [
+            path for path in handle_dir.iterdir()
+            if any(path.name.endswith(suffix) for suffix in self.COMPRESSIONS.values())
+        ]
+
+        def order(path: Path):
+            month = self.segment_name(path)
+            return (month != UNDATED_SEGMENT, month, path.name)
+
+        return sorted(paths, key=order)
+
+    def append(self, handle: str, entries: List[Tuple[str, int, Optional[float], Dict]]):
+        """Append (kind, ordinal, normalized timestamp, message) entries to their month segments"""
+        by_month: Dict[str, List[str]] = {}
+        for kind, ordinal, ts, message in entries:
+            line = json.dumps({'kind': kind, 'n': ordinal, 'message': message})
+            by_month.setdefault(segment_month(ts), []).append(line + "\n")
+        if not by_month:
+            return
+
+        handle_dir = self.handle_dir(handle)
+        handle_dir.mkdir(parents=True, exist_ok=True)
+        suffix = self.COMPRESSIONS[self.compression]
+        for month, lines in by_month.items():
+            data = "".join(lines).encode('utf-8')
+            if self.compression == "zstd":
+                data = zstandard.ZstdCompressor().compress(data)
+            else:
+                data = gzip.compress(data)
+            with open(handle_dir / f"{month}{suffix}", 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _open(self, path: Path):
+        """Open a segment for streaming decompression"""
+        if path.name.endswith(self.COMPRESSIONS["zstd"]):
+            if zstandard is None:
+                raise ValueError(f"Cannot read {path} without the zstandard package")
+            raw = open(path, 'rb')
+            return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return gzip.open(path, 'rb')
+
+    @staticmethod
+    def segment_name(path: Path) -> str:
+        """Get the month (or "undated") a segment file holds"""
+        return path.name.split(".", 1)[0]
+
+    def read_segment(self, path: Path, committed: Dict[str, int],
+                     kind: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Stream a segment's committed (kind, message) pairs, dropping duplicates"""
+        seen = set()
+        try:
+            with self._open(path) as f:
+                for raw in f:
+                    try:
+                        entry = json.loads(raw)
+                    except ValueError:
+                        # A crash mid-append leaves a torn final member
+                        logger.warning(f"Stopping at damaged data in {path}")
+                        break
+                    key = (entry['kind'], entry['n'])
+                    if kind and entry['kind'] != kind:
+                        continue
+                    if entry['n'] >= committed.get(entry['kind'], 0) or key in seen:
+                        continue
+                    seen.add(key)
+                    yield entry['kind'], entry['message']
+        except (OSError, EOFError) as e:
+            logger.error(f"Error reading archive segment {path}: {e}")
+
+    def iter_messages(self, handle: str, committed: Dict[str, int],
+                      kind: Optional[str] = None) -> Iterator[Dict]:
+        """Stream archived messages, oldest segment first.
+
+        Args:
+            handle: Handle to read
+            committed: Number of archived messages per kind the conversation
+                has committed to; lines beyond that are ignored
+            kind: Only yield messages of this kind ("dms" or "mentions")
+        """
+        for path in self.segments(handle):
+            for _, message in self.read_segment(path, committed, kind):
+                yield message
+
+    def remove(self, handle: str):
+        """Delete all archived history for a handle"""
+        shutil.rmtree(self.handle_dir(handle), ignore_errors=True)
+
+    def clear(self):
+        """Delete all archived history"""
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
@@ -0,0 +1,155 @@
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class ExportedMessage(NamedTuple):
+    """A stored message with the conversation it belongs to"""
+    timestamp: Optional[float]  # Normalized epoch seconds, None if undated
+    handle: str
+    kind: str  # "dms" or "mentions"
+    message: Dict
+
+KINDS = ('dms', 'mentions')
+# Column name -> dtype; text lives in texts.bin, addressed by offset and length
+COLUMNS = {
+    'timestamp': np.dtype('<f8'),  # NaN if undated
+    'handle': np.dtype('<i4'),  # Index into handles.json
+    'kind': np.dtype('u1'),  # Index into KINDS
+    'from_us': np.dtype('i1'),  # 1, 0, or -1 if unknown
+    'is_reply': np.dtype('i1'),
+    'text_offset': np.dtype('<i8'),
+    'text_length': np.dtype('<i4'),
+}
+
+def _flag(value) -> int:
+    return -1 if value is None else int(bool(value))
+
+
+class ColumnarWriter:
+    """Stream messages into one raw little-endian file per column.
+
+    Rows are buffered in fixed-size NumPy chunks and appended, so memory
+    stays bounded however many messages are written. meta.json is written
+    last and records the row count; readers map exactly that many rows.
+    """
+
+    def __init__(self, out_dir, chunk_rows: int = 65536):
+        """Create (or empty) the export directory.
+
+        Args:
+            out_dir: Directory to write the columns into
+            chunk_rows: Rows buffered before each append
+        """
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.out_dir.glob("*.bin"):
+            path.unlink()
+        meta_path = self.out_dir / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+        self.chunk_rows = chunk_rows
+        self._chunk = {name: np.empty(chunk_rows, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._files = {name: open(self.out_dir / f"{name}.bin", 'wb') for name in COLUMNS}
+        self._texts = open(self.out_dir / "texts.bin", 'wb')
+        self._handle_ids: Dict[str, int] = {}
+        self._rows = 0
+        self._pending = 0
+        self._text_offset = 0
+
+    def add(self, exported: ExportedMessage):
+        """Append one message"""
+        message = exported.message
+        text = (message.get('text') or '').encode('utf-8')
+        row = self._pending
+        chunk = self._chunk
+        chunk['timestamp'][row] = np.nan if exported.timestamp is None else exported.timestamp
+        chunk['handle'][row] = self._handle_ids.setdefault(exported.handle, len(self._handle_ids))
+        chunk['kind'][row] = KINDS.index(exported.kind)
+        from_us = message.get('from_us')
+        chunk['from_us'][row] = _flag(message.get('is_from_us') if from_us is None else from_us)
+        chunk['is_reply'][row] = _flag(message.get('is_reply'))
+        chunk['text_offset'][row] = self._text_offset
+        chunk['text_length'][row] = len(text)
+        self._texts.write(text)
+        self._text_offset += len(text)
+        self._pending += 1
+        if self._pending == self.chunk_rows:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        for name, column in self._chunk.items():
+            self._files[name].write(column[:self._pending].tobytes())
+        self._rows += self._pending
+        self._pending = 0
+
+    def close(self) -> int:
+        """Finish the export and return the number of rows written"""
+        self._flush_chunk()
+        for f in list(self._files.values()) + [self._texts]:
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        handles = sorted(self._handle_ids, key=self._handle_ids.get)
+        with open(self.out_dir / "handles.json", 'w', encoding='utf-8') as f:
+            json.dump(handles, f)
+        with open(self.out_dir / "meta.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                'rows': self._rows,
+                'kinds': list(KINDS),
+                'columns': {name: dtype.str for name, dtype in COLUMNS.items()},
+            }, f, indent=2)
+        return self._rows
+
+
+def write_columns(messages: Iterable[ExportedMessage], out_dir, chunk_rows: int = 65536) -> int:
+    """Write a message stream as a columnar export and return the row count"""
+    writer = ColumnarWriter(out_dir, chunk_rows)
+    try:
+        for exported in messages:
+            writer.add(exported)
+    finally:
+        rows = writer.close()
+    logger.info(f"Exported {rows} messages to {out_dir}")
+    return rows
+
+
+class ColumnarExport:
+    """Read-only, memory-mapped view of a columnar export"""
+
+    def __init__(self, out_dir):
+        """Map the columns of an export written by write_columns"""
+        self.out_dir = Path(out_dir)
+        with open(self.out_dir / "meta.json", 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(self.out_dir / "handles.json", 'r', encoding='utf-8') as f:
+            self.handles: List[str] = json.load(f)
+        self.kinds = self.meta['kinds']
+        rows = self.meta['rows']
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in self.meta['columns'].items():
+            if rows:
+                self.columns[name] = np.memmap(self.out_dir / f"{name}.bin", dtype=np.dtype(dtype),
+                                               mode='r', shape=(rows,))
+            else:
+                self.columns[name] = np.zeros(0, dtype=np.dtype(dtype))
+        texts_path = self.out_dir / "texts.bin"
+        self._texts = np.memmap(texts_path, dtype=np.uint8, mode='r') if texts_path.stat().st_size else None
+
+    def __len__(self) -> int:
+        return self.meta['rows']
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def text(self, row: int) -> str:
+        """Get the text of a row"""
+        length = int(self.columns['text_length'][row])
+        if not length:
+            return ''
+        offset = int(self.columns['text_offset'][row])
+        return bytes(self._texts[offset:offset + length]).decode('utf-8')
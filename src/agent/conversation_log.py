@@ -0,0 +1,170 @@
+import os
+import threading
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List
+from .conversation_manifest import shard_path
+
+logger = logging.getLogger(__name__)
+
+class ConversationLog:
+    """Append-only JSONL write-ahead log for conversation memory.
+
+    Every update to a handle's conversation is appended as a single JSON line
+    to ``<shard>/<handle>.jsonl`` next to the handle's JSON snapshot. Each record
+    carries a per-handle sequence number so replay can skip records that were
+    already folded into the snapshot by a compaction.
+    """
+
+    SUFFIX = ".jsonl"
+
+    def __init__(self, data_dir: Path, fsync: bool = False):
+        """Initialize the log.
+
+        Args:
+            data_dir: Directory holding the snapshots and logs
+            fsync: Whether to fsync after every append
+        """
+        self.data_dir = Path(data_dir)
+        self.fsync = fsync
+        self._seq = {}  # handle -> last sequence number written
+        self._pending = {}  # handle -> records appended since last compaction
+
+    def log_path(self, handle: str) -> Path:
+        """Get the log file path for a handle"""
+        return shard_path(self.data_dir, handle, self.SUFFIX)
+
+    def last_seq(self, handle: str) -> int:
+        """Get the last sequence number written for a handle"""
+        return self._seq.get(handle, 0)
+
+    def pending(self, handle: str) -> int:
+        """Get the number of records not yet folded into a snapshot"""
+        return self._pending.get(handle, 0)
+
+    def restore(self, handle: str, seq: int, pending: int):
+        """Restore a handle's sequence bookkeeping without replaying its log"""
+        self._seq[handle] = seq
+        self._pending[handle] = pending
+
+    def append(self, handle: str, record: Dict) -> int:
+        """Append a record to the handle's log and return its sequence number"""
+        seq = self.last_seq(handle) + 1
+        line = json.dumps({**record, 'seq': seq}) + "\n"
+        path = self.log_path(handle)
+        try:
+            f = open(path, 'a', encoding='utf-8')
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = open(path, 'a', encoding='utf-8')
+        with f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._seq[handle] = seq
+        self._pending[handle] = self.pending(handle) + 1
+        return seq
+
+    def replay(self, handle: str, snapshot_seq: int = 0) -> List[Dict]:
+        """Read the records of a handle's log that are newer than the snapshot.
+
+        A torn final line (crash mid-append) is discarded and truncated away
+        so subsequent appends start on a clean line.
+        """
+        path = self.log_path(handle)
+        self._seq[handle] = snapshot_seq
+        self._pending[handle] = 0
+        if not path.exists():
+            return []
+
+        records = []
+        valid_end = 0
+        with open(path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    break
+                valid_end += len(raw)
+                seq = record.pop('seq', 0)
+                if seq <= snapshot_seq:
+                    continue
+                records.append(record)
+                self._seq[handle] = seq
+                self._pending[handle] += 1
+
+        if valid_end < path.stat().st_size:
+            logger.warning(f"Discarding torn tail of conversation log for {handle}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        return records
+
+    def read_new(self, handle: str, offset: int) -> List[Dict]:
+        """Read records another writer appended after the given byte offset"""
+        records = []
+        with open(self.log_path(handle), 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                record = json.loads(raw)
+                seq = record.pop('seq', 0)
+                if seq <= self.last_seq(handle):
+                    continue
+                records.append(record)
+                self._seq[handle] = seq
+                self._pending[handle] = self.pending(handle) + 1
+        return records
+
+    def truncate(self, handle: str, snapshot_seq: int):
+        """Drop log records that have been folded into a snapshot at snapshot_seq"""
+        path = self.log_path(handle)
+        if not path.exists():
+            return
+        if self.last_seq(handle) <= snapshot_seq:
+            path.unlink()
+            self._pending[handle] = 0
+            return
+
+        # Records were appended while the snapshot was written; keep them
+        kept = []
+        with open(path, 'rb') as f:
+            for raw in f:
+                try:
+                    if json.loads(raw).get('seq', 0) > snapshot_seq:
+                        kept.append(raw)
+                except ValueError:
+                    break
+        write_atomic(path, b"".join(kept))
+        self._pending[handle] = len(kept)
+
+    def remove(self, handle: str):
+        """Delete a handle's log"""
+        path = self.log_path(handle)
+        if path.exists():
+            path.unlink()
+        self._seq.pop(handle, None)
+        self._pending.pop(handle, None)
+
+
+def write_atomic(path: Path, data: bytes, fsync: bool = True):
+    """Write a file atomically via a temp file and rename"""
+    path = Path(path)
+    # Unique per writer, so concurrent writers never share a temp file
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        f = open(tmp_path, 'wb')
+    except FileNotFoundError:
+        # First file in its shard directory
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(tmp_path, 'wb')
+    with f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
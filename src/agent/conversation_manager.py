@@ -1,10 +1,21 @@
 import asyncio
-from typing import Dict, List
-import openai
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
+from .llm_gateway import LLMGateway, get_gateway
+from .prompt_builder import PromptBuilder
+from .model_router import SPACE_TIERS
+
+TOPIC_ANALYSIS_PROMPT = "Analyze the conversation and identify the main topic and subtopics."
+KEY_POINTS_PROMPT = "Extract the main points from this conversation."
+SHOULD_SPEAK_PROMPT = "You are Bob the Builder, deciding whether to speak in a conversation about building things. Consider the context and your confidence level."
+SHOULD_SPEAK_TEMPLATE = """Topic: {topic}
+Participants: {participants}
+Confidence level: {confidence:.2f}
+Recent conversation:
+{history}"""
 
 class ConversationManager:
-    def __init__(self):
+    def __init__(self, llm: Optional[LLMGateway] = None):
         self.context = {
             "topic": None,
             "participants": {},
@@ -13,8 +24,8 @@ class ConversationManager:
             "start_time": None,
             "last_update": None
         }
-        self.gpt4_client = openai.Client()  # Large model for deep understanding
-        self.gpt35_client = openai.Client()  # Small model for quick responses
+        # gpt-4 for deep understanding, gpt-3.5-turbo for quick responses
+        self.llm = llm if llm is not None else get_gateway()
 
     async def update_context(self, message: Dict):
         """Update conversation context with new message"""
@@ -28,6 +39,14 @@ class ConversationManager:
         time_factor = min((datetime.now() - self.context["start_time"]).seconds / 300, 1.0)  # Max after 5 minutes
         self.context["confidence_level"] = min(0.3 + (time_factor * 0.7), 1.0)
 
+    def _history_lines(self, limit: int = None) -> List[str]:
+        """Format the latest messages as speaker-prefixed lines"""
+        history = self.context["conversation_history"]
+        if limit is not None:
+            history = history[-limit:]
+        return [f"{msg.get('speaker', 'Unknown')}: {msg['text']}" if isinstance(msg, dict) and 'text' in msg
+                else str(msg) for msg in history]
+
     async def get_context(self) -> Dict:
         """Get current conversation context"""
         return self.context
@@ -38,14 +57,14 @@ class ConversationManager:
             if not self.context["conversation_history"]:
                 return {"main_topic": None, "subtopics": []}
             
-            response = await self.gpt4_client.chat.completions.create(
+            response = await self.llm.chat(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Analyze the conversation and identify the main topic and subtopics."},
-                    {"role": "user", "content": str(self.context["conversation_history"][-10:])}  # Last 10 messages
-                ]
+                channel="space",
+                messages=PromptBuilder("gpt-4").messages(
+                    TOPIC_ANALYSIS_PROMPT, "{history}", lists={"history": self._history_lines(10)}
+                )
             )
-            return response.choices[0].message.content
+            return response
         except Exception as e:
             print(f"Error in topic analysis: {e}")
             return {"main_topic": None, "subtopics": []}
@@ -56,14 +75,14 @@ class ConversationManager:
             if not self.context["conversation_history"]:
                 return []
             
-            response = await self.gpt35_client.chat.completions.create(
+            response = await self.llm.chat(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Extract the main points from this conversation."},
-                    {"role": "user", "content": str(self.context["conversation_history"][-5:])}  # Last 5 messages
-                ]
+                channel="space",
+                messages=PromptBuilder("gpt-3.5-turbo").messages(
+                    KEY_POINTS_PROMPT, "{history}", lists={"history": self._history_lines(5)}
+                )
             )
-            return response.choices[0].message.content.split("\n")
+            return response.split("\n")
         except Exception as e:
             print(f"Error getting key points: {e}")
             return []
@@ -93,40 +112,38 @@ class ConversationManager:
             return False
             
         try:
-            response = await self.gpt35_client.chat.completions.create(
+            response = await self.llm.chat(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are Bob the Builder, deciding whether to speak in a conversation about building things. Consider the context and your confidence level."},
-                    {"role": "user", "content": f"Context: {str(self.context)}"}
-                ]
+                channel="space",
+                # A compact summary plus as much recent history as fits, not the whole context
+                messages=PromptBuilder("gpt-3.5-turbo").messages(
+                    SHOULD_SPEAK_PROMPT,
+                    SHOULD_SPEAK_TEMPLATE,
+                    lists={"history": self._history_lines()},
+                    topic=self.context["topic"] or "unknown",
+                    participants=len(self.context["participants"]),
+                    confidence=self.context["confidence_level"]
+                )
             )
-            return "yes" in response.choices[0].message.content.lower()
+            return "yes" in response.lower()
         except Exception as e:
             print(f"Error in should_speak decision: {e}")
             return False
 
     async def generate_response(self, prompt: str) -> str:
-        """Generate a response using the appropriate model based on complexity"""
+        """Generate a response using the model routed for the prompt's complexity"""
         try:
-            # Use GPT-4 for complex topics or when deep understanding is needed
-            if self.context["confidence_level"] > 0.8 or "technical" in prompt.lower():
-                response = await self.gpt4_client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are Bob the Builder, an enthusiastic expert in building and construction. Keep responses helpful and construction-focused."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-            else:
-                # Use GPT-3.5 for quicker, simpler responses
-                response = await self.gpt35_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are Bob the Builder, an enthusiastic expert in building and construction. Keep responses helpful and construction-focused."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-            return response.choices[0].message.content
+            # Complex prompts in a long conversation get GPT-4 unless it is running slow
+            model = self.llm.router.choose(prompt, SPACE_TIERS, depth=len(self.context["conversation_history"]))
+            response = await self.llm.chat(
+                model=model,
+                channel="space",
+                messages=[
+                    {"role": "system", "content": "You are Bob the Builder, an enthusiastic expert in building and construction. Keep responses helpful and construction-focused."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            return response
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "" 
\ No newline at end of file
+            return ""
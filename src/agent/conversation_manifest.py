@@ -0,0 +1,197 @@
+import os
+import json
+import heapq
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+from ..utils.file_lock import FileLock, file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Characters kept as-is in file names; everything else is percent-encoded
+SAFE_CHARS = "@_-"
+
+def shard_name(handle: str) -> str:
+    """Get the file name stem for a handle, safe on any filesystem"""
+    return quote(handle, safe=SAFE_CHARS) or "%"
+
+def handle_from_name(name: str) -> str:
+    """Invert shard_name"""
+    return "" if name == "%" else unquote(name)
+
+def shard_dir(handle: str) -> str:
+    """Get the hashed subdirectory (one of 256) a handle's files live in"""
+    return hashlib.blake2b(handle.encode('utf-8'), digest_size=1).hexdigest()
+
+def shard_path(root, handle: str, suffix: str = "") -> Path:
+    """Get the sharded path of a handle's file or directory under root"""
+    return Path(root) / shard_dir(handle) / f"{shard_name(handle)}{suffix}"
+
+
+class ConversationManifest:
+    """Index of every stored conversation, kept next to the shards.
+
+    One JSONL line per update maps a handle to its shard path, approximate
+    size, last interaction (epoch seconds) and message count; the latest
+    line for a handle wins, and a line with "removed" forgets it. The whole
+    manifest is held in memory, so existence checks, handle listings and
+    "recently active" queries never walk the directory tree. Appends hold
+    an inter-process lock, and other processes pick them up by reading only
+    the lines added since they last looked. Once superseded lines outnumber
+    live ones the file is rewritten with one line per handle.
+    """
+
+    COMPACT_MIN_LINES = 1000
+
+    def __init__(self, path):
+        """Load the manifest.
+
+        Args:
+            path: Manifest JSONL file
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self._ino = None
+        self._offset = 0  # End of the last complete line read
+        self._lines = 0  # Lines in the file, live or superseded
+        if self.path.exists():
+            self._read(0)
+
+    def exists(self) -> bool:
+        """Check whether the manifest file has been written"""
+        return self.path.exists()
+
+    def _apply(self, entry: Dict):
+        handle = entry.pop('handle')
+        if entry.pop('removed', False):
+            self.entries.pop(handle, None)
+        else:
+            self.entries[handle] = entry
+
+    def _read(self, offset: int):
+        """Apply complete lines from an offset and remember where they end"""
+        with open(self.path, 'rb') as f:
+            self._ino = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Torn by a crash; skipped by the next append
+                offset += len(raw)
+                self._lines += 1
+                try:
+                    self._apply(json.loads(raw))
+                except (ValueError, KeyError):
+                    logger.warning("Skipping torn line in conversation manifest")
+        self._offset = offset
+
+    def refresh(self) -> bool:
+        """Read updates other processes appended since this one last looked.
+
+        Returns:
+            bool: Whether anything was read
+        """
+        current = file_fingerprint(self.path)
+        if current is None:
+            if self._ino is None:
+                return False
+            # Cleared by another process
+            self.entries, self._ino, self._offset, self._lines = {}, None, 0, 0
+            return True
+        if current[0] != self._ino or current[1] < self._offset:
+            self.entries, self._offset, self._lines = {}, 0, 0
+            self._read(0)
+            return True
+        if current[1] > self._offset:
+            self._read(self._offset)
+            return True
+        return False
+
+    def _append(self, lines: List[Dict]):
+        """Append update lines and apply them; compacts when mostly superseded"""
+        with FileLock(self.path):
+            self.refresh()
+            data = "".join(json.dumps(line) + "\n" for line in lines)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if f.tell() > self._offset:
+                    data = "\n" + data  # Terminate a line torn by a crash
+                f.write(data)
+                f.flush()
+                self._offset = f.tell()
+                self._ino = os.fstat(f.fileno()).st_ino
+            self._lines += len(lines)
+            for line in lines:
+                self._apply(dict(line))
+            if self._lines > max(2 * len(self.entries), self.COMPACT_MIN_LINES):
+                self._rewrite()
+
+    def _rewrite(self):
+        """Replace the file with one line per live handle; the caller holds the lock"""
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for handle, entry in self.entries.items():
+                f.write(json.dumps({'handle': handle, **entry}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        current = file_fingerprint(self.path)
+        self._ino, self._offset, self._lines = current[0], current[1], len(self.entries)
+
+    def update(self, handle: str, **fields):
+        """Record a handle's current shard path, size, last interaction or message count"""
+        entry = self.entries.get(handle)
+        if entry is not None and all(entry.get(key) == value for key, value in fields.items()):
+            return
+        self._append([{'handle': handle, **(entry or {}), **fields}])
+
+    def update_many(self, entries: Dict[str, Dict]):
+        """Record several handles in one append"""
+        if entries:
+            self._append([{'handle': handle, **entry} for handle, entry in entries.items()])
+
+    def remove(self, handle: str):
+        """Forget a handle"""
+        if handle in self.entries:
+            self._append([{'handle': handle, 'removed': True}])
+
+    def clear(self):
+        """Forget every handle"""
+        with FileLock(self.path):
+            self.entries = {}
+            self._rewrite()
+
+    def __contains__(self, handle: str) -> bool:
+        if handle in self.entries:
+            return True
+        # Another process may have just added it
+        return self.refresh() and handle in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, handle: str) -> Optional[Dict]:
+        """Get a handle's entry, or None"""
+        return self.entries.get(handle)
+
+    def handles(self) -> List[str]:
+        """Get every handle, after picking up other processes' updates"""
+        self.refresh()
+        return list(self.entries)
+
+    def recent(self, since: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """Get handles by last interaction, most recent first.
+
+        Args:
+            since: Only handles that interacted at or after this epoch time
+            limit: Maximum number of handles
+        """
+        self.refresh()
+        active = [
+            (entry['last_interaction'], handle) for handle, entry in self.entries.items()
+            if entry.get('last_interaction') is not None
+            and (since is None or entry['last_interaction'] >= since)
+        ]
+        ranked = heapq.nlargest(limit, active) if limit is not None else sorted(active, reverse=True)
+        return [handle for _, handle in ranked]
@@ -1,127 +1,915 @@
 import os
 import json
+import time
+import heapq
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 import logging
+from .conversation_log import ConversationLog, write_atomic
+from .replied_tweets import RepliedTweetStore
+from .conversation_timeline import ConversationTimeline
+from .memory_flusher import MemoryFlusher
+from .conversation_archive import UNDATED_SEGMENT, ConversationArchive, segment_month
+from .retrieval_index import RetrievalIndex
+from .state_snapshot import read_snapshot, write_snapshot
+from .tweet_ledger import TweetLedger
+from .message_records import RECORD_TYPES, encode_record, normalize_timestamp, to_records
+from .conversation_export import ExportedMessage, write_columns
+from .conversation_manifest import ConversationManifest, handle_from_name, shard_dir, shard_name, shard_path
+from ..utils.file_lock import FileLock, StripedFileLock, file_fingerprint
 
 logger = logging.getLogger(__name__)
 
 class ConversationMemory:
-    def __init__(self):
-        self.data_dir = Path("data/conversations")
+    STORAGE_MODES = ("json", "wal")
+    MANIFEST_NAME = ".manifest.jsonl"
+    # Let handles grow this far past the archive limits before archiving
+    # again, so archival runs in batches rather than on every message
+    ARCHIVE_SLACK_MESSAGES = 50
+    ARCHIVE_SLACK_SECONDS = 86400
+    retrieval = None
+
+    def __init__(self, data_dir: str = "data/conversations", storage_mode: str = "json",
+                 compact_interval: Optional[float] = 300.0, compact_threshold: int = 50,
+                 max_resident: Optional[int] = 1000, max_resident_bytes: Optional[int] = None,
+                 replied_retention_days: Optional[float] = 90, replied_bloom_capacity: Optional[int] = None,
+                 flush_interval: Optional[float] = None, archive_after_days: Optional[float] = None,
+                 archive_keep_messages: Optional[int] = None, archive_compression: str = "gzip",
+                 index_dir: Optional[str] = None, snapshot_path: Optional[str] = None,
+                 snapshot_interval: Optional[float] = None, shared: bool = False):
+        """Initialize conversation memory.
+
+        Conversations are loaded lazily the first time a handle is touched and
+        kept in an LRU cache; nothing is read from disk at startup. Each
+        handle's files live in one of 256 hashed subdirectories, and a
+        manifest of every stored handle answers existence, listing and
+        recent-activity queries without walking the directory. A flat data
+        directory from before sharding is moved into shards on first open.
+
+        Args:
+            data_dir: Directory holding one sharded JSON file per handle
+            storage_mode: "json" rewrites a handle's file on every update,
+                "wal" appends each update to a per-handle JSONL log that is
+                periodically compacted into the JSON snapshot
+            compact_interval: Seconds between background compactions in wal mode,
+                or None to only compact on save_all_conversations/close
+            compact_threshold: Minimum pending log records before a handle is compacted
+            max_resident: Maximum number of conversations kept in memory, or None
+            max_resident_bytes: Approximate serialized size cap for resident
+                conversations, or None
+            replied_retention_days: Prune replied tweet IDs older than this
+            replied_bloom_capacity: Keep pruned replied IDs in a Bloom filter
+                of this capacity instead of forgetting them
+            flush_interval: In json mode, hand snapshot writes to a background
+                thread that coalesces updates within this many seconds, or
+                None to write synchronously on every update
+            archive_after_days: Move DMs and mentions older than this into
+                compressed per-month archive segments, or None
+            archive_keep_messages: Keep at most this many DMs and this many
+                mentions per handle resident, archiving the rest, or None
+            archive_compression: "gzip", or "zstd" if zstandard is installed
+            index_dir: Directory of a RetrievalIndex to index new DMs and
+                mentions into for search_history, or None
+            snapshot_path: Binary state snapshot to warm-start from and to
+                write on close, or None
+            snapshot_interval: Seconds between periodic snapshots, or None
+            shared: Other processes use the same data_dir. Every update then
+                holds a per-handle inter-process lock and first picks up
+                changes made elsewhere (only new log records in wal mode), and
+                json writes are never deferred to the background flusher
+        """
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
+        self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.memory = {}
-        self.tweets = []  # Add tweet storage
-        self.tweet_history_file = Path("data/tweet_history.json")  # Use existing tweet history file
-        self.replied_mentions = self.load_replied_mentions()
-        self.load_all_conversations()
-        self.load_tweets()  # Load tweet history
-        
+        self.storage_mode = storage_mode
+        self.compact_interval = compact_interval
+        self.compact_threshold = compact_threshold
+        self.max_resident = max_resident
+        self.max_resident_bytes = max_resident_bytes
+        self.replied_retention_days = replied_retention_days
+        self.replied_bloom_capacity = replied_bloom_capacity
+        self.archive_after_days = archive_after_days
+        self.archive_keep_messages = archive_keep_messages
+        self._archive = ConversationArchive(self.data_dir / "archive", compression=archive_compression)
+        if index_dir is not None:
+            self.retrieval = RetrievalIndex(index_dir)
+        self.manifest = ConversationManifest(self.data_dir / self.MANIFEST_NAME)
+        self.memory = OrderedDict()  # LRU of resident conversations, oldest first
+        self._lock = threading.RLock()
+        self._log = ConversationLog(self.data_dir) if storage_mode == "wal" else None
+        self._sizes = {}  # handle -> approximate serialized size
+        self._resident_bytes = 0
+        self._dirty = set()  # handles with updates not yet in their JSON snapshot
+        self._timelines = {}  # handle -> ConversationTimeline, built on first context lookup
+        self._versions = {}  # handle -> version of its latest update, for flush bookkeeping
+        self._version_counter = 0
+        self._workers = []
+        self._stop_workers = threading.Event()
+        self._compacting = set()  # handles whose snapshot is being written outside the lock
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._warm = {}  # handle -> snapshot entry, validated against disk on first touch
+        snapshot = self._read_snapshot()
+        self.replied_mentions = self.load_replied_mentions(snapshot.get('replied'))
+        self.tweet_ledger = self.load_tweets(snapshot.get('tweets'))
+        self._locks = StripedFileLock(self.data_dir / ".handles.lock") if shared else None
+        self._seen = {}  # handle -> on-disk fingerprint this process last read or wrote
+        self._flusher = None
+        if flush_interval is not None and not self._log:
+            if shared:
+                logger.info("Writing conversations synchronously because the data directory is shared")
+            else:
+                self._flusher = MemoryFlusher(self._serialize_dirty, self._mark_flushed, window=flush_interval)
+        if not self.manifest.exists():
+            self._build_manifest()
+        # Workers start last, once everything they touch exists
+        if self._log and self.compact_interval:
+            self._start_worker("conversation-compactor", self.compact_interval, self.compact)
+        if self.snapshot_path and snapshot_interval:
+            self._start_worker("state-snapshotter", snapshot_interval, self.write_snapshot)
+
+    def _conversation_path(self, handle: str) -> Path:
+        """Get the JSON snapshot path for a handle"""
+        return shard_path(self.data_dir, handle, ".json")
+
+    def _on_disk(self, handle: str) -> bool:
+        """Check whether a handle has stored history"""
+        if handle in self.manifest:
+            return True
+        return bool(self._flusher) and self._flusher.pending_payload(handle) is not None
+
+    def _stored_handles(self) -> set:
+        """Get every handle with stored history"""
+        handles = set(self.manifest.handles())
+        if self._flusher:
+            handles.update(self._flusher.submitted_keys())
+        return handles
+
+    def _manifest_entry(self, handle: str) -> Dict:
+        """Describe a resident conversation for the manifest"""
+        conv = self.memory[handle]
+        archive = conv.get('archive') or {}
+        return {
+            'path': f"{shard_dir(handle)}/{shard_name(handle)}.json",
+            'size': self._sizes.get(handle, 0),
+            'last_interaction': normalize_timestamp(conv.get('last_interaction')),
+            'messages': len(conv.get('dms', [])) + len(conv.get('mentions', []))
+                        + archive.get('dms', 0) + archive.get('mentions', 0),
+        }
+
+    def _build_manifest(self):
+        """Move a flat data directory into shards and index every stored handle.
+
+        Runs once per data directory, or again if the manifest is lost.
+        """
+        try:
+            # (Not the manifest's own lock, which appending takes)
+            with FileLock(self.data_dir / ".manifest-build"), self._lock:
+                if self.manifest.exists():
+                    self.manifest.refresh()  # Another process built it first
+                    return
+                suffixes = ('.json', ConversationLog.SUFFIX)
+                handles = set()
+                for path in list(self.data_dir.iterdir()):
+                    if path.name.startswith('.'):
+                        continue
+                    suffix = next((suffix for suffix in suffixes if path.name.endswith(suffix)), None)
+                    if path.is_file() and suffix:
+                        # Flat layout: the file name is the raw handle
+                        handle = path.name[:-len(suffix)]
+                        target = shard_path(self.data_dir, handle, suffix)
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(path, target)
+                        handles.add(handle)
+                    elif path.is_dir() and path != self._archive.archive_dir:
+                        for file in path.iterdir():
+                            suffix = next((suffix for suffix in suffixes if file.name.endswith(suffix)), None)
+                            if suffix and not file.name.startswith('.'):
+                                handles.add(handle_from_name(file.name[:-len(suffix)]))
+                self._shard_archive()
+
+                entries = {}
+                for handle in sorted(handles):
+                    if self._load_conversation(handle):
+                        entries[handle] = self._manifest_entry(handle)
+                        self._drop(handle)
+                self.manifest.update_many(entries)
+                if entries:
+                    logger.info(f"Indexed {len(entries)} conversations in the manifest")
+        except Exception as e:
+            logger.error(f"Error building conversation manifest: {e}")
+
+    def _shard_archive(self):
+        """Move flat per-handle archive directories into shards"""
+        archive_dir = self._archive.archive_dir
+        if not archive_dir.exists():
+            return
+        suffixes = tuple(self._archive.COMPRESSIONS.values())
+        for path in list(archive_dir.iterdir()):
+            # A flat handle directory holds segments; a shard holds handle directories
+            if path.is_dir() and any(child.name.endswith(suffixes) for child in path.iterdir()):
+                target = self._archive.handle_dir(path.name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+
     def load_all_conversations(self):
-        """Load all conversation files from disk"""
+        """Eagerly load conversation files from disk, up to the residency cap"""
         try:
-            for file in self.data_dir.glob("*.json"):
-                handle = file.stem  # filename without extension
-                with open(file, 'r', encoding='utf-8') as f:
-                    self.memory[handle] = json.load(f)
-                    logger.info(f"Loaded memory for {handle}")
+            for handle in sorted(self._stored_handles()):
+                self.get_conversation(handle)
+                logger.info(f"Loaded memory for {handle}")
         except Exception as e:
             logger.error(f"Error loading conversations: {e}")
 
+    def _load_conversation(self, handle: str) -> bool:
+        """Load a handle's snapshot and replay any logged updates on top of it.
+
+        Returns:
+            bool: Whether the handle had any stored history
+        """
+        file_path = self._conversation_path(handle)
+        snapshot_seq = 0
+        size = 0
+        found = False
+        pending = self._flusher.pending_payload(handle) if self._flusher else None
+        warm = self._warm.pop(handle, None)
+        if pending is not None:
+            # Evicted before its write landed; the queued payload is newest
+            self.memory[handle] = self._adopt(handle, json.loads(pending))
+            self._dirty.add(handle)
+            size += len(pending)
+            found = True
+        elif warm is not None and warm['fingerprint'] == self._fingerprint(handle):
+            # Nothing changed on disk since the snapshot; skip parsing and replay
+            self.memory[handle] = self._adopt(handle, warm['data'])
+            if self._log:
+                self._log.restore(handle, warm['seq'], warm['pending'])
+                if warm['pending']:
+                    self._dirty.add(handle)
+            self._track_size(handle, warm['size'])
+            self._mark_seen(handle)
+            return True
+        elif file_path.exists():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                self.memory[handle] = self._adopt(handle, json.load(f))
+            snapshot_seq = self.memory[handle].pop('_wal_seq', 0)
+            size += file_path.stat().st_size
+            found = True
+        if self._log and not self._log.log_path(handle).exists():
+            # Sequence numbers continue from the snapshot, even if this
+            # process had appended to a log another process since compacted
+            self._log.restore(handle, snapshot_seq, 0)
+        elif self._log:
+            records = self._log.replay(handle, snapshot_seq)
+            if not found:
+                self.memory[handle] = self._new_conversation()
+            for record in records:
+                self._apply(handle, record)
+            if records:
+                self._dirty.add(handle)
+            size += self._log.log_path(handle).stat().st_size
+            found = True
+        if found:
+            self._track_size(handle, size)
+        self._mark_seen(handle)
+        return found
+
+    @staticmethod
+    def _adopt(handle: str, conv: Dict) -> Dict:
+        """Hold a loaded conversation's messages as compact records"""
+        for kind in RECORD_TYPES:
+            if kind in conv:
+                conv[kind] = to_records(kind, conv[kind], handle)
+        return conv
+
+    def _track_size(self, handle: str, delta: int):
+        """Account for the approximate serialized size of a resident conversation"""
+        self._sizes[handle] = self._sizes.get(handle, 0) + delta
+        self._resident_bytes += delta
+
+    def _over_capacity(self) -> bool:
+        """Check whether the resident set exceeds its caps"""
+        if self.max_resident is not None and len(self.memory) > self.max_resident:
+            return True
+        if self.max_resident_bytes is not None and self._resident_bytes > self.max_resident_bytes:
+            return True
+        return False
+
+    def _evict(self, keep: str = None):
+        """Evict least recently used conversations, flushing dirty ones first"""
+        for handle in list(self.memory):
+            if not self._over_capacity() or len(self.memory) <= 1:
+                break
+            if handle == keep:
+                continue
+            if handle in self._dirty:
+                if self._flusher:
+                    self._flusher.submit(handle, *self._serialize_dirty(handle))
+                elif self._locks and self._log:
+                    # Its log is durable; it is compacted the next time it is loaded
+                    self._dirty.discard(handle)
+                elif self._locks:
+                    # Saving would take a second handle's lock while holding
+                    # this one; keep it until save_all_conversations retries
+                    continue
+                else:
+                    self.save_conversation(handle)
+            self._drop(handle)
+            logger.debug(f"Evicted memory for {handle}")
+
+    def _drop(self, handle: str):
+        """Forget a resident conversation without saving it"""
+        del self.memory[handle]
+        self._timelines.pop(handle, None)
+        self._resident_bytes -= self._sizes.pop(handle, 0)
+
     def save_conversation(self, handle: str):
         """Save a specific conversation to disk"""
         try:
-            if handle in self.memory:
-                file_path = self.data_dir / f"{handle}.json"
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.memory[handle], f, indent=2)
-                logger.info(f"Saved memory for {handle}")
+            with self._handle_lock(handle):
+                with self._lock:
+                    if handle not in self.memory:
+                        return
+                    if self._locks:
+                        self._refresh(handle)
+                    data = dict(self.memory[handle])
+                    if self._log:
+                        snapshot_seq = self._log.last_seq(handle)
+                        data['_wal_seq'] = snapshot_seq
+                    payload = json.dumps(data, indent=2, default=encode_record).encode('utf-8')
+                    if not self._log:
+                        write_atomic(self._conversation_path(handle), payload)
+                        self._dirty.discard(handle)
+                        self._mark_seen(handle)
+                        logger.info(f"Saved memory for {handle}")
+                        return
+                    if handle in self._compacting:
+                        # Another thread is mid-compaction; its snapshot must not be
+                        # overtaken, and the records it misses stay in the log
+                        return
+                    self._compacting.add(handle)
+
+                # Compaction: write the snapshot outside the lock, then drop the
+                # log records it covers
+                try:
+                    write_atomic(self._conversation_path(handle), payload)
+                    with self._lock:
+                        self._log.truncate(handle, snapshot_seq)
+                        if not self._log.pending(handle):
+                            self._dirty.discard(handle)
+                        self._mark_seen(handle)
+                finally:
+                    with self._lock:
+                        self._compacting.discard(handle)
+            logger.info(f"Compacted memory log for {handle}")
         except Exception as e:
             logger.error(f"Error saving conversation for {handle}: {e}")
 
+    def _serialize_dirty(self, handle: str):
+        """Serialize a dirty resident conversation for the background flusher"""
+        with self._lock:
+            if handle not in self.memory or handle not in self._dirty:
+                return None
+            payload = json.dumps(self.memory[handle], indent=2, default=encode_record).encode('utf-8')
+            return self._conversation_path(handle), payload, self._versions.get(handle, 0)
+
+    def _mark_flushed(self, handle: str, version: int):
+        """Clear a handle's dirty flag unless it changed after being serialized"""
+        with self._lock:
+            if self._versions.get(handle, 0) == version:
+                self._dirty.discard(handle)
+
     def save_all_conversations(self):
-        """Save all conversations to disk"""
-        for handle in self.memory:
+        """Save conversations that changed since they were last written"""
+        if self._log:
+            # Updates are already durable in the log; only fold big logs
+            self.compact()
+            return
+        with self._lock:
+            # Evicted dirty handles are already queued with their payload
+            dirty = [handle for handle in self._dirty if handle in self.memory]
+        for handle in dirty:
+            if self._flusher:
+                self._flusher.mark(handle)
+            else:
+                self.save_conversation(handle)
+
+    def flush(self):
+        """Block until every pending background write is on disk"""
+        if self._flusher:
+            self._flusher.drain()
+
+    def compact(self, threshold: Optional[int] = None):
+        """Fold pending log records into snapshots for handles above the threshold"""
+        if not self._log:
+            return
+        threshold = self.compact_threshold if threshold is None else threshold
+        with self._lock:
+            handles = [h for h in self._dirty if self._log.pending(h) >= max(threshold, 1)]
+        for handle in handles:
             self.save_conversation(handle)
 
+    def _start_worker(self, name: str, interval: float, work):
+        """Run work every interval seconds on a background thread until close()"""
+        def run():
+            while not self._stop_workers.wait(interval):
+                work()
+
+        worker = threading.Thread(target=run, name=name, daemon=True)
+        worker.start()
+        self._workers.append(worker)
+
+    def _fingerprint(self, handle: str):
+        """Identify the on-disk state a resident conversation was built from"""
+        log_fingerprint = file_fingerprint(self._log.log_path(handle)) if self._log else None
+        return (file_fingerprint(self._conversation_path(handle)), log_fingerprint)
+
+    def _handle_lock(self, handle: str):
+        """Hold a handle's lock when the data directory is shared.
+
+        Always taken before self._lock, and never while holding another
+        handle's lock. The stripes also exclude other threads of this
+        process.
+        """
+        return self._locks.hold(handle) if self._locks else nullcontext()
+
+    def _mark_seen(self, handle: str):
+        """Remember the on-disk state this process's copy of a handle matches"""
+        if self._locks:
+            self._seen[handle] = self._fingerprint(handle)
+
+    def _refresh(self, handle: str):
+        """Pick up changes another process made to a resident handle"""
+        seen = self._seen.get(handle)
+        current = self._fingerprint(handle)
+        if seen == current:
+            return
+        if self._log and seen and seen[0] == current[0] and seen[1] and current[1] \
+                and seen[1][0] == current[1][0] and current[1][1] > seen[1][1]:
+            # Only new records were appended to the log; apply just those
+            for record in self._log.read_new(handle, seen[1][1]):
+                self._apply(handle, record)
+            self._dirty.add(handle)
+        else:
+            logger.info(f"Reloading {handle} after a change by another process")
+            self._drop(handle)
+            if not self._load_conversation(handle):
+                self.memory[handle] = self._new_conversation()
+                self._track_size(handle, 0)
+        self._seen[handle] = current
+
+    def _read_snapshot(self) -> Dict:
+        """Load the state snapshot, keeping its conversations aside until they are touched"""
+        if not self.snapshot_path:
+            return {}
+        state = read_snapshot(self.snapshot_path)
+        if not state:
+            return {}
+        if state.get('storage_mode') != self.storage_mode or state.get('data_dir') != str(self.data_dir):
+            logger.info("Ignoring state snapshot written for a different memory configuration")
+            return {}
+        self._warm = state.get('conversations', {})
+        logger.info(f"Loaded state snapshot with {len(self._warm)} warm conversations")
+        return state
+
+    def write_snapshot(self):
+        """Write resident conversations, replied tweet IDs and tweet history to the state snapshot"""
+        if not self.snapshot_path:
+            return
+        try:
+            with self._lock:
+                conversations = {}
+                for handle, conv in self.memory.items():
+                    if not self._log and handle in self._dirty:
+                        continue  # Its file is behind; it will be read from disk instead
+                    conversations[handle] = {
+                        'data': conv,
+                        'fingerprint': self._fingerprint(handle),
+                        'size': self._sizes.get(handle, 0),
+                        'seq': self._log.last_seq(handle) if self._log else 0,
+                        'pending': self._log.pending(handle) if self._log else 0,
+                    }
+                write_snapshot(self.snapshot_path, {
+                    'storage_mode': self.storage_mode,
+                    'data_dir': str(self.data_dir),
+                    'created': time.time(),
+                    'conversations': conversations,
+                    'replied': self.replied_mentions.export_state(),
+                    'tweets': self.tweet_ledger.export_state(),
+                })
+            logger.info(f"Wrote state snapshot with {len(conversations)} conversations")
+        except Exception as e:
+            logger.error(f"Error writing state snapshot: {e}")
+
+    def close(self):
+        """Stop background work and persist everything"""
+        if self._flusher:
+            # Drains every pending write before returning
+            self._flusher.stop()
+            self._flusher = None
+        self._stop_workers.set()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        if self._log:
+            self.compact(threshold=1)
+        else:
+            self.save_all_conversations()
+        if self.retrieval is not None:
+            self.retrieval.flush()
+        self.write_snapshot()
+
+    def _new_conversation(self) -> Dict:
+        """Create an empty conversation record"""
+        return {
+            'dms': [],
+            'mentions': [],
+            'last_interaction': None,
+            'metadata': {
+                'first_seen': datetime.now().isoformat(),
+                'total_interactions': 0
+            }
+        }
+
+    def _apply(self, handle: str, record: Dict):
+        """Apply a single update record to the resident conversation"""
+        op = record['op']
+        if op == 'clear':
+            self.memory[handle] = self._new_conversation()
+            self._timelines.pop(handle, None)
+            return
+        conv = self.memory[handle]
+        if op in ('dm', 'mention'):
+            kind = 'dms' if op == 'dm' else 'mentions'
+            message = RECORD_TYPES[kind](record['data'], handle)
+            conv[kind].append(message)
+            if handle in self._timelines:
+                self._timelines[handle].add(message.timestamp, message)
+            conv['last_interaction'] = record['time']
+            conv['metadata']['total_interactions'] += 1
+        elif op == 'metadata':
+            conv['metadata'][record['key']] = record['value']
+        elif op == 'archive':
+            del conv['dms'][:record['dms']]
+            del conv['mentions'][:record['mentions']]
+            conv['archive'] = record['summary']
+            self._timelines.pop(handle, None)
+
+    def _record(self, handle: str, record: Dict):
+        """Apply an update and persist it according to the storage mode"""
+        with self._handle_lock(handle), self._lock:
+            self.get_conversation(handle)
+            self._apply(handle, record)
+            self._dirty.add(handle)
+            self._version_counter += 1
+            self._versions[handle] = self._version_counter
+            self._track_size(handle, len(json.dumps(record)))
+            if self._log:
+                self._log.append(handle, record)
+                self._mark_seen(handle)
+            elif self._flusher:
+                self._flusher.mark(handle)
+            else:
+                self.save_conversation(handle)
+            self.manifest.update(handle, **self._manifest_entry(handle))
+            if record['op'] in ('dm', 'mention') and self._needs_archive(self.memory[handle]):
+                self.archive_conversation(handle)
+            self._evict(keep=handle)
+
     def get_conversation(self, handle: str):
         """Get or create conversation memory for a handle"""
-        if handle not in self.memory:
-            self.memory[handle] = {
-                'dms': [],
-                'mentions': [],
-                'last_interaction': None,
-                'metadata': {
-                    'first_seen': datetime.now().isoformat(),
-                    'total_interactions': 0
-                }
-            }
-        return self.memory[handle]
+        with self._handle_lock(handle), self._lock:
+            if handle in self.memory:
+                if self._locks:
+                    try:
+                        self._refresh(handle)
+                    except Exception as e:
+                        logger.error(f"Error refreshing conversation for {handle}: {e}")
+                self.memory.move_to_end(handle)
+            else:
+                try:
+                    found = self._load_conversation(handle)
+                except Exception as e:
+                    logger.error(f"Error loading conversation for {handle}: {e}")
+                    found = False
+                if not found:
+                    self.memory[handle] = self._new_conversation()
+                    self._track_size(handle, 0)
+                elif self._needs_archive(self.memory[handle]):
+                    self.archive_conversation(handle)
+            self._evict(keep=handle)
+            return self.memory[handle]
+
+    def _existing_conversation(self, handle: str) -> Optional[Dict]:
+        """Get a handle's conversation without creating one"""
+        with self._handle_lock(handle), self._lock:
+            if handle in self.memory or self._on_disk(handle):
+                return self.get_conversation(handle)
+            return None
 
     def add_dm(self, handle: str, message: dict):
         """Add a DM to memory"""
-        conv = self.get_conversation(handle)
         message['type'] = 'dm'
-        conv['dms'].append(message)
-        conv['last_interaction'] = datetime.now().isoformat()
-        conv['metadata']['total_interactions'] += 1
-        self.save_conversation(handle)
+        self._record(handle, {'op': 'dm', 'data': message, 'time': datetime.now().isoformat()})
+        self._index(handle, message)
 
     def add_mention(self, handle: str, mention_data: dict):
         """Add a mention to the conversation memory"""
         try:
-            # Get or create conversation for this handle
-            conversation = self.get_conversation(handle)
-            if not conversation:
-                conversation = {
-                    'handle': handle,
-                    'dms': [],
-                    'mentions': [],
-                    'last_interaction': None,
-                    'total_interactions': 0
-                }
-                
-            # Add mention to mentions list
-            mentions = conversation.get('mentions', [])
-            mentions.append(mention_data)
-            conversation['mentions'] = mentions
-            
-            # Update interaction metadata
-            conversation['last_interaction'] = datetime.now().isoformat()
-            conversation['total_interactions'] += 1
-            
-            # Save conversation data
-            self.save_conversation(handle)
-            
+            self._record(handle, {'op': 'mention', 'data': mention_data, 'time': datetime.now().isoformat()})
+            self._index(handle, mention_data)
+            if mention_data.get('is_reply') and mention_data.get('tweet_id'):
+                self.add_tweet_reply(mention_data['tweet_id'])
         except Exception as e:
             logger.error(f"Error adding mention: {e}")
 
+    def _index(self, handle: str, message: Dict):
+        """Add a message to the retrieval index, if one is configured"""
+        if self.retrieval is None:
+            return
+        try:
+            self.retrieval.add(handle, message, normalize_timestamp(message.get('timestamp')))
+        except Exception as e:
+            logger.error(f"Error indexing message for {handle}: {e}")
+
+    def search_history(self, handle: Optional[str], query: str, k: int = 5,
+                       min_score: float = 0.1) -> List[Dict]:
+        """Get the stored messages most relevant to a query, best first.
+
+        Args:
+            handle: Only search this handle's history, or None for every handle
+            query: Text to match
+            k: Maximum number of messages
+            min_score: Minimum similarity of a returned message
+        """
+        if self.retrieval is None or not query:
+            return []
+        try:
+            return [hit['message'] for _, hit in self.retrieval.search(query, handle, k, min_score)]
+        except Exception as e:
+            logger.error(f"Error searching history for {handle}: {e}")
+            return []
+
     def get_recent_context(self, handle: str, limit: int = 5) -> List[Dict]:
-        """Get recent context for a handle."""
+        """Get the most recent DMs and mentions for a handle, oldest first."""
         if handle == 'tweets':
-            return [tweet['text'] for tweet in self.tweets[-limit:]]
+            return [tweet['text'] for tweet in self.tweet_ledger.last(limit)]
         
-        # Original conversation context logic
         try:
-            messages = self.memory.get(handle, [])
-            if not messages:
-                return []
-                
-            # Sort by timestamp, handling None values
-            def get_timestamp(msg):
-                ts = msg.get('timestamp')
-                if ts is None:
-                    return ''
-                return str(ts)
-                
-            messages.sort(key=get_timestamp)
-            return messages[-limit:]
-            
+            with self._handle_lock(handle), self._lock:
+                if self._existing_conversation(handle) is None:
+                    return []
+                return self._timeline(handle).recent(limit)
         except Exception as e:
             logger.error(f"Error getting context for {handle}: {e}")
             return []
 
+    def _timeline(self, handle: str) -> ConversationTimeline:
+        """Get the time-ordered index of a resident handle, building it on first use"""
+        timeline = self._timelines.get(handle)
+        if timeline is None:
+            conv = self.memory[handle]
+            timeline = ConversationTimeline(
+                (message.timestamp, message)
+                for message in conv.get('dms', []) + conv.get('mentions', [])
+            )
+            self._timelines[handle] = timeline
+        return timeline
+
+    def _archive_limits(self, max_age_days: Optional[float], max_messages: Optional[int]):
+        """Resolve archive limits to (cutoff epoch, messages to keep)"""
+        max_age_days = self.archive_after_days if max_age_days is None else max_age_days
+        max_messages = self.archive_keep_messages if max_messages is None else max_messages
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        return cutoff, max_messages
+
+    def _needs_archive(self, conv: Dict) -> bool:
+        """Check whether a conversation has outgrown the archive limits by the slack margin"""
+        cutoff, keep = self._archive_limits(None, None)
+        for kind in ('dms', 'mentions'):
+            messages = conv.get(kind, [])
+            if keep is not None and len(messages) > keep + self.ARCHIVE_SLACK_MESSAGES:
+                return True
+            if cutoff is not None and messages:
+                ts = messages[0].timestamp
+                if ts is not None and ts < cutoff - self.ARCHIVE_SLACK_SECONDS:
+                    return True
+        return False
+
+    @staticmethod
+    def _archivable(messages: List[Dict], cutoff: Optional[float], keep: Optional[int]) -> int:
+        """Count the leading messages that belong in the archive"""
+        count = max(len(messages) - keep, 0) if keep is not None else 0
+        if cutoff is not None:
+            # Undated messages stop the age scan; only the count limit moves past them
+            while count < len(messages):
+                ts = messages[count].timestamp
+                if ts is None or ts >= cutoff:
+                    break
+                count += 1
+        return count
+
+    def archive_conversation(self, handle: str, max_age_days: Optional[float] = None,
+                             max_messages: Optional[int] = None) -> int:
+        """Move a handle's old DMs and mentions into the compressed archive.
+
+        Args:
+            handle: Handle to archive
+            max_age_days: Archive messages older than this (defaults to archive_after_days)
+            max_messages: Keep at most this many messages of each kind
+                (defaults to archive_keep_messages)
+
+        Returns:
+            int: Number of messages archived
+        """
+        cutoff, keep = self._archive_limits(max_age_days, max_messages)
+        if cutoff is None and keep is None:
+            return 0
+        try:
+            with self._handle_lock(handle), self._lock:
+                conv = self._existing_conversation(handle)
+                if conv is None:
+                    return 0
+                summary = json.loads(json.dumps(conv.get('archive') or {
+                    'dms': 0, 'mentions': 0, 'oldest': None, 'newest': None, 'months': {}
+                }))
+                counts = {}
+                entries = []
+                for kind in ('dms', 'mentions'):
+                    counts[kind] = self._archivable(conv[kind], cutoff, keep)
+                    for i, message in enumerate(conv[kind][:counts[kind]]):
+                        entries.append((kind, summary[kind] + i, message.timestamp, message.to_dict()))
+                if not entries:
+                    return 0
+
+                # Segments are durable before the conversation drops the messages
+                self._archive.append(handle, entries)
+                for kind, _, ts, _ in entries:
+                    month = segment_month(ts)
+                    summary['months'][month] = summary['months'].get(month, 0) + 1
+                    if ts is not None:
+                        summary['oldest'] = ts if summary['oldest'] is None else min(summary['oldest'], ts)
+                        summary['newest'] = ts if summary['newest'] is None else max(summary['newest'], ts)
+                for kind in counts:
+                    summary[kind] += counts[kind]
+                summary['last_archived'] = datetime.now().isoformat()
+                self._track_size(handle, -len(json.dumps([entry[3] for entry in entries])))
+                self._record(handle, {'op': 'archive', 'dms': counts['dms'],
+                                      'mentions': counts['mentions'], 'summary': summary})
+                logger.info(f"Archived {len(entries)} messages for {handle}")
+                return len(entries)
+        except Exception as e:
+            logger.error(f"Error archiving conversation for {handle}: {e}")
+            return 0
+
+    def archive_old_messages(self, max_age_days: Optional[float] = None,
+                             max_messages: Optional[int] = None) -> int:
+        """Archive old messages for every stored handle.
+
+        Returns:
+            int: Number of messages archived
+        """
+        return sum(
+            self.archive_conversation(handle, max_age_days, max_messages)
+            for handle in self.get_all_handles()
+        )
+
+    def iter_archived(self, handle: str, kind: Optional[str] = None) -> Iterator[Dict]:
+        """Stream a handle's archived messages, oldest month first.
+
+        Args:
+            handle: Handle to read
+            kind: Only yield "dms" or "mentions"
+        """
+        with self._handle_lock(handle), self._lock:
+            conv = self._existing_conversation(handle)
+            summary = (conv or {}).get('archive') or {}
+            committed = {'dms': summary.get('dms', 0), 'mentions': summary.get('mentions', 0)}
+        if not any(committed.values()):
+            return
+        yield from self._archive.iter_messages(handle, committed, kind)
+
+    def _peek(self, handle: str) -> Optional[Dict]:
+        """Copy a handle's message lists without making it resident or evicting anything"""
+        with self._handle_lock(handle), self._lock:
+            if handle in self.memory:
+                conv = self.get_conversation(handle)
+                loaded = False
+            else:
+                if not self._load_conversation(handle):
+                    return None
+                conv = self.memory[handle]
+                loaded = True
+            view = {kind: list(conv.get(kind, [])) for kind in RECORD_TYPES}
+            view['archive'] = conv.get('archive') or {}
+            if loaded:
+                # Everything it holds came from disk (or a queued write), so
+                # dropping it loses nothing
+                self._drop(handle)
+            return view
+
+    def _stream_handle(self, handle: str, kinds, keep, since: Optional[float], until: Optional[float],
+                       include_archived: bool) -> Iterator[ExportedMessage]:
+        """Yield one handle's matching messages, archived and hot, in timestamp order"""
+        conv = self._peek(handle)
+        if conv is None:
+            return
+        hot = sorted(
+            (ExportedMessage(record.timestamp, handle, kind, record)
+             for kind in kinds for record in conv[kind] if keep(record)),
+            key=self._export_order
+        )
+        summary = conv['archive']
+        committed = {kind: summary.get(kind, 0) for kind in RECORD_TYPES}
+        if not include_archived or not any(committed[kind] for kind in kinds):
+            yield from hot
+            return
+
+        def archived():
+            low = segment_month(since) if since is not None else None
+            high = segment_month(until) if until is not None else None
+            only = kinds[0] if len(kinds) == 1 else None
+            for path in self._archive.segments(handle):
+                # Segments are split by month, so whole files fall outside a date range
+                month = self._archive.segment_name(path)
+                if (low or high) and month == UNDATED_SEGMENT:
+                    continue
+                if (low and month < low) or (high and month > high):
+                    continue
+                batch = []
+                for kind, message in self._archive.read_segment(path, committed, only):
+                    record = RECORD_TYPES[kind](message, handle)
+                    if keep(record):
+                        batch.append(ExportedMessage(record.timestamp, handle, kind, record))
+                batch.sort(key=self._export_order)
+                yield from batch
+
+        yield from heapq.merge(archived(), hot, key=self._export_order)
+
+    @staticmethod
+    def _export_order(exported: ExportedMessage) -> float:
+        return float('-inf') if exported.timestamp is None else exported.timestamp
+
+    def iter_messages(self, kind: Optional[str] = None, since=None, until=None,
+                      from_us: Optional[bool] = None, handles: Optional[List[str]] = None,
+                      include_archived: bool = True) -> Iterator[ExportedMessage]:
+        """Stream stored messages across handles in timestamp order.
+
+        Handles are merged lazily: each one is read from disk without being
+        cached (resident handles are copied), so a scan of the whole store
+        does not evict the working set, and archived history is read one
+        month segment at a time. Undated messages come first, and are
+        skipped when a date range is given.
+
+        Args:
+            kind: Only "dms" or only "mentions"
+            since: Earliest timestamp to include (epoch, ISO string or datetime)
+            until: Timestamp to stop before
+            from_us: Only messages we sent (True) or received (False)
+            handles: Handles to read, or None for every stored handle
+            include_archived: Also read the compressed archive
+
+        Yields:
+            ExportedMessage(timestamp, handle, kind, message) tuples
+        """
+        if kind is not None and kind not in RECORD_TYPES:
+            raise ValueError(f"Unknown message kind: {kind}")
+        since = normalize_timestamp(since.timestamp() if isinstance(since, datetime) else since)
+        until = normalize_timestamp(until.timestamp() if isinstance(until, datetime) else until)
+        kinds = (kind,) if kind else tuple(RECORD_TYPES)
+        dated_only = since is not None or until is not None
+
+        def keep(record) -> bool:
+            ts = record.timestamp
+            if ts is None:
+                if dated_only:
+                    return False
+            elif (since is not None and ts < since) or (until is not None and ts >= until):
+                return False
+            return from_us is None or bool(record.from_us) == from_us
+
+        streams = [
+            self._stream_handle(handle, kinds, keep, since, until, include_archived)
+            for handle in (handles if handles is not None else self.get_all_handles())
+        ]
+        yield from heapq.merge(*streams, key=self._export_order)
+
+    def export_columns(self, out_dir, **filters) -> int:
+        """Dump messages to memory-mappable NumPy column files for offline analysis.
+
+        Args:
+            out_dir: Directory to write the export into (read it back with ColumnarExport)
+            filters: Passed through to iter_messages
+
+        Returns:
+            int: Number of messages exported
+        """
+        return write_columns(self.iter_messages(**filters), out_dir)
+
     def get_dm_history(self, handle: str, limit: int = None):
         """Get DM history for a handle"""
         conv = self.get_conversation(handle)
@@ -135,8 +923,20 @@ class ConversationMemory:
         return mentions[-limit:] if limit else mentions
 
     def get_all_handles(self):
-        """Get list of all handles in memory"""
-        return list(self.memory.keys())
+        """Get list of all handles in memory or on disk"""
+        with self._lock:
+            return sorted(self._stored_handles().union(self.memory))
+
+    def recent_handles(self, since=None, limit: Optional[int] = None) -> List[str]:
+        """Get stored handles by last interaction, most recent first.
+
+        Args:
+            since: Only handles active at or after this time (epoch, ISO string or datetime)
+            limit: Maximum number of handles
+        """
+        since = normalize_timestamp(since.timestamp() if isinstance(since, datetime) else since)
+        with self._lock:
+            return self.manifest.recent(since, limit)
 
     def get_metadata(self, handle: str):
         """Get metadata for a handle"""
@@ -145,65 +945,70 @@ class ConversationMemory:
 
     def update_metadata(self, handle: str, key: str, value):
         """Update metadata for a handle"""
-        conv = self.get_conversation(handle)
-        conv['metadata'][key] = value
-        self.save_conversation(handle)
+        self._record(handle, {'op': 'metadata', 'key': key, 'value': value})
 
     def get_dms(self, handle: str, limit: Optional[int] = None) -> List[Dict]:
         """Get DMs for a handle, optionally limited to the most recent n messages"""
-        if handle not in self.memory:
+        conv = self._existing_conversation(handle)
+        if conv is None:
             return []
-        dms = self.memory[handle]["dms"]
+        dms = conv["dms"]
         if limit:
             return dms[-limit:]
         return dms
 
     def get_mentions(self, handle: str, limit: Optional[int] = None) -> List[Dict]:
         """Get mentions for a handle, optionally limited to the most recent n messages"""
-        if handle not in self.memory:
+        conv = self._existing_conversation(handle)
+        if conv is None:
             return []
-        mentions = self.memory[handle]["mentions"]
+        mentions = conv["mentions"]
         if limit:
             return mentions[-limit:]
         return mentions
 
     def get_all_conversations(self, handle: str) -> Dict[str, List[Dict]]:
         """Get all conversations (DMs and mentions) for a handle"""
-        if handle not in self.memory:
+        conv = self._existing_conversation(handle)
+        if conv is None:
             return {"dms": [], "mentions": []}
-        return self.memory[handle]
+        return conv
 
     def clear_memory(self, handle: str = None):
         """Clear memory for a specific handle or all handles"""
         if handle:
-            if handle in self.memory:
-                self.memory[handle] = {"dms": [], "mentions": []}
-                self.save_conversation(handle)
+            with self._handle_lock(handle), self._lock:
+                if self._existing_conversation(handle) is not None:
+                    # Drop the archive first so stale segments can never be
+                    # mistaken for the new conversation's archived history
+                    self._archive.remove(handle)
+                    self._record(handle, {'op': 'clear'})
+                    if self.retrieval is not None:
+                        self.retrieval.remove(handle)
         else:
-            self.memory = {}
-            # Remove all json files
-            for file in self.data_dir.glob("*.json"):
-                file.unlink()
+            # Queued writes would otherwise recreate files after the wipe
+            self.flush()
+            with self._lock:
+                self.memory.clear()
+                self._warm.clear()
+                self._timelines.clear()
+                self._sizes.clear()
+                self._resident_bytes = 0
+                self._dirty.clear()
+                # Remove every stored conversation the manifest knows about
+                for stored in self.manifest.handles():
+                    self._conversation_path(stored).unlink(missing_ok=True)
+                    if self._log:
+                        self._log.remove(stored)
+                self.manifest.clear()
+                self._archive.clear()
+                if self.retrieval is not None:
+                    for indexed in list(self.retrieval.meta['handles']):
+                        self.retrieval.remove(indexed)
 
     def has_replied_to_mention(self, handle: str, tweet_id: str) -> bool:
         """Check if we've already replied to a specific mention"""
-        try:
-            # Get conversation data for this handle
-            conversation = self.get_conversation(handle)
-            if not conversation:
-                return False
-                
-            # Check mentions for this tweet ID
-            mentions = conversation.get('mentions', [])
-            for mention in mentions:
-                if mention.get('tweet_id') == tweet_id and mention.get('is_reply', False):
-                    return True
-                    
-            return False
-            
-        except Exception as e:
-            logger.error(f"Error checking replied mentions: {e}")
-            return False
+        return tweet_id in self.replied_mentions
 
     def has_replied_to_tweet(self, tweet_id):
         """Check if we've already replied to a tweet"""
@@ -212,66 +1017,35 @@ class ConversationMemory:
     def add_tweet_reply(self, tweet_id):
         """Mark a tweet as replied to"""
         self.replied_mentions.add(tweet_id)
-        self.save_replied_mentions()
         
-    def load_replied_mentions(self):
+    def load_replied_mentions(self, snapshot: Optional[Dict] = None):
         """Load previously replied mentions"""
-        try:
-            with open('data/replied_mentions.json', 'r') as f:
-                return set(json.load(f))
-        except:
-            return set()
+        return RepliedTweetStore(
+            max_age_days=self.replied_retention_days,
+            bloom_capacity=self.replied_bloom_capacity,
+            snapshot=snapshot
+        )
             
     def save_replied_mentions(self):
-        """Save replied mentions"""
-        with open('data/replied_mentions.json', 'w') as f:
-            json.dump(list(self.replied_mentions), f)
+        """Replied mentions are persisted as they are added"""
+
+    def load_tweets(self, snapshot: Optional[Dict] = None) -> TweetLedger:
+        """Load the ledger of posted tweets"""
+        return TweetLedger(snapshot=snapshot)
+
+    @property
+    def tweets(self) -> List[Dict]:
+        """Get the most recent posted tweets, oldest first"""
+        return self.tweet_ledger.last(10)
 
-    def load_tweets(self):
-        """Load tweet history from file."""
-        try:
-            if self.tweet_history_file.exists():
-                with open(self.tweet_history_file, 'r') as f:
-                    data = json.load(f)
-                    # Convert the existing format to our memory format
-                    self.tweets = [
-                        {
-                            'text': tweet,
-                            'timestamp': data.get('last_tweet_time'),
-                            'is_from_us': True
-                        } for tweet in data.get('tweet_history', [])
-                    ]
-            else:
-                self.tweets = []
-        except Exception as e:
-            logger.error(f"Error loading tweets: {e}")
-            self.tweets = []
-            
     def save_tweets(self):
-        """Save tweet history to file."""
-        try:
-            self.tweet_history_file.parent.mkdir(parents=True, exist_ok=True)
-            # Convert our memory format back to the existing format
-            with open(self.tweet_history_file, 'r') as f:
-                existing_data = json.load(f)
-            
-            existing_data['tweet_history'] = [tweet['text'] for tweet in self.tweets]
-            if self.tweets:
-                existing_data['last_tweet_time'] = self.tweets[-1]['timestamp']
-            
-            with open(self.tweet_history_file, 'w') as f:
-                json.dump(existing_data, f)
-        except Exception as e:
-            logger.error(f"Error saving tweets: {e}")
+        """Tweets are persisted as they are added"""
 
     def add_message(self, handle: str, message: Dict):
         """Add a message to memory."""
         if handle == 'tweets':
-            # Handle tweets differently
-            self.tweets.append(message)
-            if len(self.tweets) > 10:  # Keep last 10 tweets
-                self.tweets = self.tweets[-10:]
-            self.save_tweets()
+            self.tweet_ledger.record(message['text'], message.get('timestamp'),
+                                     source=message.get('source'), tweet_id=message.get('id'))
         else:
             # Handle regular conversations as before
             conv = self.get_conversation(handle)
@@ -0,0 +1,53 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class ConversationTimeline:
+    """Time-ordered index over a handle's DMs and mentions.
+
+    Messages are keyed by their normalized epoch timestamp (messages without
+    one sort first, as before) and insertion order, and kept sorted on
+    insert, so the most recent k messages are a slice rather than a sort.
+    """
+
+    def __init__(self, messages: Iterable[Tuple[Optional[float], Dict]] = ()):
+        """Build the index from (normalized timestamp, message) pairs"""
+        entries = [
+            (self._sort_ts(ts), seq, message)
+            for seq, (ts, message) in enumerate(messages)
+        ]
+        entries.sort(key=lambda entry: entry[:2])
+        self._keys = [entry[:2] for entry in entries]
+        self._messages = [entry[2] for entry in entries]
+        self._next_seq = len(entries)
+
+    @staticmethod
+    def _sort_ts(ts: Optional[float]) -> float:
+        return float('-inf') if ts is None else ts
+
+    def add(self, ts: Optional[float], message: Dict):
+        """Insert a message at its position in time"""
+        key = (self._sort_ts(ts), self._next_seq)
+        self._next_seq += 1
+        if not self._keys or key >= self._keys[-1]:
+            # Messages almost always arrive in order
+            self._keys.append(key)
+            self._messages.append(message)
+            return
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._messages.insert(pos, message)
+
+    def recent(self, limit: int) -> List[Dict]:
+        """Get the last `limit` messages, oldest first"""
+        if limit <= 0:
+            return []
+        return self._messages[-limit:]
+
+    def latest_timestamp(self) -> Optional[float]:
+        """Get the newest normalized timestamp in the timeline"""
+        if not self._keys or self._keys[-1][0] == float('-inf'):
+            return None
+        return self._keys[-1][0]
+
+    def __len__(self) -> int:
+        return len(self._messages)
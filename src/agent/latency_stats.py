@@ -0,0 +1,303 @@
+import math
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from ..utils.file_lock import locked_json_update, read_json
+
+logger = logging.getLogger(__name__)
+
+class DDSketch:
+    """Mergeable streaming quantile sketch with relative error guarantees.
+
+    Values are counted in logarithmically sized buckets, so any quantile is
+    reported within relative_accuracy of a true value. Bucket count is
+    capped; past the cap the lowest buckets are folded together, which only
+    costs accuracy at the bottom of the distribution. Memory per sketch is
+    therefore bounded no matter how many values are added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 512, min_value: float = 1e-3):
+        """Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+            max_bins: Cap on the number of buckets kept
+            min_value: Values at or below this are counted as zero
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        """Add a value"""
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self):
+        """Fold the lowest buckets together until the cap holds"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins + 1
+        folded = sum(self.bins.pop(index) for index in indexes[:excess])
+        target = indexes[excess]
+        self.bins[target] = self.bins.get(target, 0) + folded
+
+    def _value(self, index: int) -> float:
+        """Get the representative value of a bucket"""
+        gamma = math.exp(self._log_gamma)
+        return 2 * math.exp(index * self._log_gamma) / (gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Get the estimated q-quantile (0 <= q <= 1), or None if empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def merge(self, other: 'DDSketch'):
+        """Add another sketch's values to this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> Dict:
+        """Serialize the sketch to JSON-compatible data"""
+        return {
+            'accuracy': self.relative_accuracy,
+            'bins': {str(index): count for index, count in self.bins.items()},
+            'zero': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_bins: int = 512) -> 'DDSketch':
+        """Deserialize a sketch written by to_dict"""
+        sketch = cls(data['accuracy'], max_bins)
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+class LatencyTracker:
+    """Response-latency statistics per handle and channel.
+
+    Controllers report when an inbound message was first seen and, once
+    they reply, how long the LLM and the browser took. Every measurement
+    updates a DDSketch for its handle and for the whole channel, so
+    p50/p95/p99 are available at any time in bounded memory per series.
+
+    Several processes may report into the same file: save() merges only
+    what this process measured since its last save into what is on disk,
+    under an inter-process lock. Recording never touches the file; callers
+    save once per processing cycle, off the event loop, and on close().
+    """
+
+    CHANNELS = ('dm', 'mention')
+    METRICS = ('response', 'llm', 'browser')
+    ALL = '*'
+
+    def __init__(self, path: Optional[str] = "data/latency_stats.json", relative_accuracy: float = 0.01,
+                 max_pending: int = 10000):
+        """Load saved statistics.
+
+        Args:
+            path: JSON file the statistics persist to, or None to keep them in memory
+            relative_accuracy: Relative error of reported quantiles
+            max_pending: Cap on inbound messages awaiting a reply; the oldest are forgotten
+        """
+        self.path = Path(path) if path else None
+        self.relative_accuracy = relative_accuracy
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._series: Dict[str, DDSketch] = {}  # "metric/channel/handle" -> all measurements
+        self._unsaved: Dict[str, DDSketch] = {}  # Measurements since the last save
+        self._pending: OrderedDict = OrderedDict()  # message key -> first seen, oldest first
+        self._resolved = set()  # Pending keys replied to since the last save
+        if self.path:
+            try:
+                self._adopt(read_json(self.path, {}))
+            except Exception as e:
+                logger.error(f"Error loading latency statistics: {e}")
+
+    def _sketch(self) -> DDSketch:
+        return DDSketch(self.relative_accuracy)
+
+    @staticmethod
+    def _series_key(metric: str, channel: str, handle: str) -> str:
+        return f"{metric}/{channel}/{handle}"
+
+    @staticmethod
+    def _pending_key(channel: str, handle: str, key) -> str:
+        # Hashed, since DMs are keyed by their (possibly long) text
+        return f"{channel}/{handle}/{zlib.crc32(str(key).encode('utf-8')):08x}"
+
+    def first_seen(self, channel: str, handle: str, key, ts: Optional[float] = None) -> float:
+        """Note an inbound message awaiting a reply.
+
+        Args:
+            channel: "dm" or "mention"
+            handle: Who sent it
+            key: Anything identifying the message within the handle (tweet ID, DM text)
+            ts: When it was seen, defaulting to now
+
+        Returns:
+            float: When the message was first seen, which may be an earlier pass
+        """
+        pending_key = self._pending_key(channel, handle, key)
+        with self._lock:
+            if pending_key not in self._pending:
+                self._pending[pending_key] = time.time() if ts is None else ts
+                self._resolved.discard(pending_key)
+                while len(self._pending) > self.max_pending:
+                    self._pending.popitem(last=False)
+            return self._pending[pending_key]
+
+    def record(self, metric: str, channel: str, handle: str, seconds: float):
+        """Add one measurement to the handle's and the channel's series"""
+        with self._lock:
+            for series_handle in (handle, self.ALL):
+                for series_channel in (channel, self.ALL):
+                    key = self._series_key(metric, series_channel, series_handle)
+                    for target in (self._series, self._unsaved):
+                        if key not in target:
+                            target[key] = self._sketch()
+                        target[key].add(seconds)
+
+    def replied(self, channel: str, handle: str, key, llm_seconds: Optional[float] = None,
+                browser_seconds: Optional[float] = None, sent_at: Optional[float] = None) -> Optional[float]:
+        """Record a reply to a message passed to first_seen.
+
+        Returns:
+            The first-seen to reply-sent latency in seconds, or None if the
+            message was never seen (or was forgotten)
+        """
+        pending_key = self._pending_key(channel, handle, key)
+        with self._lock:
+            seen = self._pending.pop(pending_key, None)
+            self._resolved.add(pending_key)
+        latency = None
+        if seen is not None:
+            latency = max((time.time() if sent_at is None else sent_at) - seen, 0.0)
+            self.record('response', channel, handle, latency)
+        if llm_seconds is not None:
+            self.record('llm', channel, handle, llm_seconds)
+        if browser_seconds is not None:
+            self.record('browser', channel, handle, browser_seconds)
+        return latency
+
+    def summary(self, metric: str = 'response', channel: Optional[str] = None,
+                handle: Optional[str] = None, quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict:
+        """Get count, mean, max and quantiles of a series.
+
+        Args:
+            metric: "response", "llm" or "browser"
+            channel: "dm" or "mention", or None for both
+            handle: One handle, or None for every handle
+        """
+        with self._lock:
+            sketch = self._series.get(self._series_key(metric, channel or self.ALL, handle or self.ALL))
+            if sketch is None or not sketch.count:
+                return {'count': 0}
+            result = {'count': sketch.count, 'mean': sketch.sum / sketch.count, 'max': sketch.max}
+            for q in quantiles:
+                result[f"p{round(q * 100):d}"] = sketch.quantile(q)
+            return result
+
+    def handles(self, channel: Optional[str] = None):
+        """Get handles with response measurements"""
+        prefix = f"response/{channel or self.ALL}/"
+        with self._lock:
+            return sorted(key[len(prefix):] for key in self._series
+                          if key.startswith(prefix) and key[len(prefix):] != self.ALL)
+
+    def _adopt(self, data: Dict):
+        """Replace in-memory state with saved state; the caller holds the lock or is initializing"""
+        self._series = {key: DDSketch.from_dict(value) for key, value in data.get('series', {}).items()}
+        self._pending = OrderedDict(sorted(data.get('pending', {}).items(), key=lambda item: item[1]))
+
+    def save(self):
+        """Merge measurements since the last save into the file"""
+        if not self.path:
+            return
+
+        def update(data):
+            series = data.setdefault('series', {})
+            for key, sketch in self._unsaved.items():
+                if key in series:
+                    merged = DDSketch.from_dict(series[key])
+                    merged.merge(sketch)
+                else:
+                    merged = sketch
+                series[key] = merged.to_dict()
+            pending = data.setdefault('pending', {})
+            for key in self._resolved:
+                pending.pop(key, None)
+            for key, seen in self._pending.items():
+                pending[key] = min(seen, pending.get(key, seen))
+            if len(pending) > self.max_pending:
+                data['pending'] = dict(sorted(pending.items(), key=lambda item: item[1])[-self.max_pending:])
+            return data
+
+        try:
+            with self._lock:
+                data = locked_json_update(self.path, update, default={})
+                # Pick up what other processes saved as well
+                self._adopt(data)
+                self._unsaved = {}
+                self._resolved = set()
+        except Exception as e:
+            logger.error(f"Error saving latency statistics: {e}")
+
+    def log_summary(self):
+        """Log p50/p95/p99 of each channel's latencies"""
+        for channel in self.CHANNELS:
+            for metric in self.METRICS:
+                stats = self.summary(metric, channel)
+                if stats['count']:
+                    logger.info(f"{channel} {metric} latency over {stats['count']}: "
+                                f"p50 {stats['p50']:.1f}s, p95 {stats['p95']:.1f}s, p99 {stats['p99']:.1f}s")
+
+    def close(self):
+        """Save everything not yet saved"""
+        self.save()
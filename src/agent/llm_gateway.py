@@ -0,0 +1,350 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+import aiohttp
+from .rate_limiter import RateLimiter, estimate_tokens
+from .model_router import ModelRouter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+class LLMError(Exception):
+    """An LLM call failed after its retries or ran out of time"""
+
+
+class LLMGateway:
+    """The one way the agent talks to the chat completions API.
+
+    All calls share a pooled aiohttp session. Each call has a deadline
+    covering every attempt; connection errors, timeouts, 429s and 5xx
+    responses are retried with full-jitter exponential backoff (or the
+    server's Retry-After) for as long as the deadline allows. Hedged calls
+    send a duplicate request if the first has not answered within
+    hedge_after seconds and take whichever finishes first, trimming the
+    latency tail for replies someone is waiting on. Every request, retries
+    included, waits its turn in the rate limiter under its channel's
+    priority and settles its token estimate once it is done; a hedge is
+    only sent if the limiter has capacity to spare right away. The latency
+    and outcome of every call is reported to the model router.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: float = 30.0, max_retries: int = 3, backoff: float = 0.5,
+                 max_backoff: float = 8.0, max_connections: int = 20, hedge_after: float = 2.0,
+                 limiter: Optional[RateLimiter] = None, router: Optional[ModelRouter] = None):
+        """Initialize the gateway; the HTTP session is opened on first use.
+
+        Args:
+            api_key: API key, defaults to OPENAI_API_KEY
+            base_url: API root, defaults to OPENAI_BASE_URL or the OpenAI API
+            timeout: Default deadline in seconds for a call, retries included
+            max_retries: Retries after the first attempt
+            backoff: Base delay in seconds for the first retry
+            max_backoff: Cap on a single retry delay
+            max_connections: Size of the connection pool
+            hedge_after: Seconds before a hedged call sends its duplicate
+            limiter: Request/token limits shared by all calls, defaults to a new RateLimiter
+            router: Picks models and tracks their health, defaults to a new ModelRouter
+        """
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = (base_url or os.getenv('OPENAI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_connections = max_connections
+        self.hedge_after = hedge_after
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.router = router if router is not None else ModelRouter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # A session belongs to the event loop it was created on
+        if self._session is not None and not self._session.closed and self._loop is not loop:
+            await self._close_stale_session()
+        if self._session is None or self._session.closed:
+            headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                headers=headers
+            )
+            self._loop = loop
+        return self._session
+
+    async def _close_stale_session(self):
+        """Close a session created on another event loop before replacing it"""
+        session, loop = self._session, self._loop
+        self._session = None
+        try:
+            if loop is not None and loop.is_running():
+                # Still serving another thread; close it there
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+            else:
+                # Its loop is gone; this releases the pool, the sockets went with the loop
+                await session.close()
+        except Exception as e:
+            logger.error(f"Error closing LLM session from a previous event loop: {e}")
+
+    async def chat(self, messages: List[Dict], model: str = "gpt-3.5-turbo", deadline: Optional[float] = None,
+                   hedge: bool = False, channel: str = "tweet", **params) -> str:
+        """Run a chat completion and return the reply text.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            deadline: Seconds the whole call may take, defaults to timeout
+            hedge: Send a duplicate request if the first one is slow
+            channel: Rate limiter priority class; unclassified calls go last
+            **params: Other request fields, e.g. temperature or max_tokens
+
+        Raises:
+            LLMError: The call failed or missed its deadline
+        """
+        payload = {'model': model, 'messages': messages, **params}
+        expires, tokens = await self._admit(payload, deadline, channel)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            if hedge and self.hedge_after is not None:
+                data = await self._hedged(payload, expires, channel, tokens)
+            else:
+                data = await self._post(payload, expires, channel, tokens)
+            try:
+                content = data['choices'][0]['message']['content']
+            except (KeyError, IndexError, TypeError):
+                raise LLMError(f"Malformed {model} response: {str(data)[:200]}")
+        except LLMError:
+            self.router.record(model, loop.time() - start, ok=False)
+            raise
+        self.router.record(model, loop.time() - start)
+        return content
+
+    async def stream_chat(self, messages: List[Dict], model: str = "gpt-3.5-turbo",
+                          deadline: Optional[float] = None, channel: str = "tweet", **params) -> AsyncIterator[str]:
+        """Run a streamed chat completion, yielding reply text as it arrives.
+
+        Attempts are retried like chat() until the first text has been
+        yielded, each retry waiting for rate limit capacity of its own.
+        After that a failure raises LLMError and whatever was yielded is
+        partial. Every attempt settles its token estimate against the usage
+        the API reports, or against what it streamed if none is reported.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            deadline: Seconds the whole stream may take, defaults to timeout
+            channel: Rate limiter priority class
+            **params: Other request fields, e.g. temperature or max_tokens
+
+        Raises:
+            LLMError: The call failed, broke off or missed its deadline
+        """
+        payload = {'model': model, 'messages': messages, **params, 'stream': True,
+                   'stream_options': {'include_usage': True}}
+        expires, tokens = await self._admit(payload, deadline, channel)
+        prompt_tokens = estimate_tokens(messages, 0)
+        loop = asyncio.get_running_loop()
+        session = await self._get_session()
+        start = loop.time()
+        try:
+            attempt = 0
+            yielded = False
+            while True:
+                if attempt:
+                    # A retry is another request against the rate limits
+                    await self._acquire(model, channel, tokens, expires - loop.time())
+                remaining = expires - loop.time()
+                if remaining <= 0:
+                    raise LLMError(f"{model} stream missed its deadline")
+                retry_after = None
+                status = usage = None
+                streamed = ""
+                self.requests += 1
+                try:
+                    async with session.post(f"{self.base_url}/chat/completions", json=payload,
+                                            timeout=aiohttp.ClientTimeout(total=remaining)) as response:
+                        status = response.status
+                        if response.status == 200:
+                            async for line in response.content:
+                                line = line.strip()
+                                if not line.startswith(b"data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == b"[DONE]":
+                                    self.router.record(model, loop.time() - start)
+                                    return
+                                chunk = json.loads(data)
+                                usage = chunk.get('usage') or usage
+                                choices = chunk.get('choices') or [{}]
+                                content = (choices[0].get('delta') or {}).get('content')
+                                if content:
+                                    yielded = True
+                                    streamed += content
+                                    yield content
+                            error = "stream ended before [DONE]"
+                        else:
+                            body = await response.text()
+                            error = f"HTTP {response.status}: {body[:200]}"
+                            if response.status not in RETRY_STATUSES:
+                                raise LLMError(error)
+                            retry_after = _retry_after(response.headers.get('Retry-After'))
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    error = f"{type(e).__name__}: {e}"
+                finally:
+                    if isinstance(usage, dict) and usage.get('total_tokens') is not None:
+                        actual = usage['total_tokens']
+                    elif status == 200:
+                        actual = prompt_tokens + len(streamed) // 4
+                    else:
+                        actual = 0  # Rejected before anything was generated
+                    self.limiter.settle(tokens, actual)
+
+                if yielded:
+                    raise LLMError(f"{model} stream broke off: {error}")
+                delay = self._retry_delay(model, attempt, error, retry_after, expires)
+                attempt += 1
+                await asyncio.sleep(delay)
+        except LLMError:
+            self.router.record(model, loop.time() - start, ok=False)
+            raise
+
+    async def _admit(self, payload: Dict, deadline: Optional[float], channel: str):
+        """Wait for rate limit capacity; returns the call's expiry time and token estimate"""
+        deadline = self.timeout if deadline is None else deadline
+        expires = asyncio.get_running_loop().time() + deadline
+        tokens = estimate_tokens(payload['messages'], payload.get('max_tokens'))
+        await self._acquire(payload['model'], channel, tokens, deadline)
+        return expires, tokens
+
+    async def _acquire(self, model: str, channel: str, tokens: int, timeout: float):
+        """Wait up to timeout seconds for rate limit capacity for one request"""
+        try:
+            await asyncio.wait_for(self.limiter.acquire(channel, tokens), timeout)
+        except asyncio.TimeoutError:
+            raise LLMError(f"{model} call missed its deadline waiting for rate limit capacity")
+
+    def _retry_delay(self, model: str, attempt: int, error: str, retry_after: Optional[float],
+                     expires: float) -> float:
+        """Get the delay before the next attempt, or raise if there should not be one"""
+        if attempt >= self.max_retries:
+            raise LLMError(f"{model} call failed after {attempt + 1} attempts: {error}")
+        delay = retry_after if retry_after is not None else \
+            random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if asyncio.get_running_loop().time() + delay >= expires:
+            raise LLMError(f"{model} call has no time left to retry: {error}")
+        self.retries += 1
+        logger.info(f"Retrying {model} call in {delay:.2f}s ({error})")
+        return delay
+
+    async def _post(self, payload: Dict, expires: float, channel: str, tokens: int) -> Dict:
+        """POST a completion request, retrying until it succeeds or time runs out.
+
+        The first attempt uses capacity the caller already took from the
+        rate limiter; each retry waits for its own. Every attempt settles
+        its token estimate: against the reported usage on success, to 0 if
+        the API rejected it, and left standing if the outcome is unknown.
+        """
+        loop = asyncio.get_running_loop()
+        session = await self._get_session()
+        attempt = 0
+        while True:
+            if attempt:
+                # A retry is another request against the rate limits
+                await self._acquire(payload['model'], channel, tokens, expires - loop.time())
+            remaining = expires - loop.time()
+            if remaining <= 0:
+                raise LLMError(f"{payload['model']} call missed its deadline")
+            retry_after = None
+            actual = None
+            self.requests += 1
+            try:
+                async with session.post(f"{self.base_url}/chat/completions", json=payload,
+                                        timeout=aiohttp.ClientTimeout(total=remaining)) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        usage = data.get('usage') if isinstance(data, dict) else None
+                        actual = usage.get('total_tokens') if isinstance(usage, dict) else None
+                        return data
+                    actual = 0  # Rejected before anything was generated
+                    body = await response.text()
+                    error = f"HTTP {response.status}: {body[:200]}"
+                    if response.status not in RETRY_STATUSES:
+                        raise LLMError(error)
+                    retry_after = _retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                self.limiter.settle(tokens, actual)
+
+            delay = self._retry_delay(payload['model'], attempt, error, retry_after, expires)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _hedged(self, payload: Dict, expires: float, channel: str, tokens: int) -> Dict:
+        """Race a duplicate request against a slow one, keeping the first success"""
+        tasks = [asyncio.ensure_future(self._post(payload, expires, channel, tokens))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done or not self.limiter.try_acquire(channel, tokens):
+                return await tasks[0]
+            self.hedges += 1
+            # The hedge took its own capacity above and settles it like any other request
+            tasks.append(asyncio.ensure_future(self._post(payload, expires, channel, tokens)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        """Get request, retry and hedging counters"""
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+        }
+
+    async def close(self):
+        """Close the pooled HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+_gateway: Optional[LLMGateway] = None
+
+def get_gateway(api_key: Optional[str] = None) -> LLMGateway:
+    """Get the process-wide gateway, creating it on first use"""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(api_key=api_key)
+    return _gateway
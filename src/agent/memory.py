@@ -1,25 +1,267 @@
-from typing import Dict, List
-import json
-from datetime import datetime
+import re
+import time
+import bisect
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from .message_records import normalize_timestamp
+from ..utils.file_lock import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset("""
+about after again also because been before being could does doing down from have having here into just
+like more most much only other over same should some such than that their them then there these they
+this those through under until very what when where which while will with would your yours you're
+i'm it's that's don't can't what's thanks thank please hello there's bob's really going want know
+""".split())
+WORD_RE = re.compile(r"[a-z][a-z']{3,}")
+
+def keywords(text: str) -> Counter:
+    """Count the content words of a text"""
+    return Counter(word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS)
+
+def extract_topic(text: str) -> str:
+    """Get the most frequent content word of a text, or "general\""""
+    counts = keywords(text)
+    return counts.most_common(1)[0][0] if counts else "general"
+
 
 class Memory:
-    def __init__(self):
-        self.short_term = []
-        self.long_term = {}
-        self.MAX_SHORT_TERM = 100
-        
+    """Short-term interaction buffer consolidated into long-term topic records.
+
+    New interactions are appended to short_term and nothing else happens on
+    the caller's path. Once short_term holds more than max_short_term
+    entries, a background thread folds the oldest ones, batch_size at a
+    time, into one long-term record per (handle, topic) holding counts,
+    first/last seen, top keywords and the last few exchanges. Records are
+    capped at max_records, dropping the least recently updated, and each
+    handle's records are kept sorted by last_seen so recency lookups bisect
+    instead of scanning. If consolidation falls behind by more than
+    max_pending interactions, add_interaction consolidates one batch itself.
+    """
+
+    MAX_SHORT_TERM = 100
+
+    def __init__(self, path: Optional[str] = "data/long_term_memory.json", max_short_term: int = MAX_SHORT_TERM,
+                 batch_size: int = 50, max_pending: int = 1000, max_records: int = 5000,
+                 max_keywords: int = 20, max_samples: int = 3):
+        """Load saved long-term memory and start the consolidation thread.
+
+        Args:
+            path: JSON file long-term memory persists to, or None to keep it in memory
+            max_short_term: Interactions kept in short-term memory before consolidation
+            batch_size: Interactions consolidated per batch
+            max_pending: Short-term interactions past which callers consolidate themselves
+            max_records: Cap on long-term records
+            max_keywords: Keywords kept per record
+            max_samples: Recent exchanges kept per record
+        """
+        self.path = Path(path) if path else None
+        self.MAX_SHORT_TERM = max_short_term
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_records = max_records
+        self.max_keywords = max_keywords
+        self.max_samples = max_samples
+        self.short_term = deque()
+        self.long_term: OrderedDict = OrderedDict()  # (handle, topic) -> record, least recently updated first
+        self._by_handle: Dict[str, List[Tuple[float, str]]] = {}  # handle -> sorted (last_seen, topic)
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.consolidated = 0
+        if self.path:
+            self._load()
+        self._thread = threading.Thread(target=self._run, name="memory-consolidator", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _normalize(interaction: Dict) -> Dict:
+        """Reduce an interaction to the fields long-term memory keeps"""
+        message = interaction.get('message') or interaction.get('text') or interaction.get('summary') or ''
+        reply = interaction.get('reply') or ''
+        timestamp = normalize_timestamp(interaction.get('timestamp'))
+        return {
+            'handle': interaction.get('handle') or interaction.get('speaker') or 'space',
+            'message': message,
+            'reply': reply,
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'context_type': interaction.get('context_type', 'space'),
+            'topic': interaction.get('topic') or extract_topic(f"{message} {reply}"),
+        }
+
     def add_interaction(self, interaction: Dict):
-        """Add new interaction to memory"""
-        self.short_term.append({
-            'timestamp': datetime.now().isoformat(),
-            'interaction': interaction
-        })
-        
-        if len(self.short_term) > self.MAX_SHORT_TERM:
+        """Add new interaction to memory.
+
+        Args:
+            interaction: Dict with handle, message, reply, timestamp,
+                context_type and optionally topic (space summaries with
+                summary/period are accepted too)
+        """
+        entry = self._normalize(interaction)
+        with self._lock:
+            self.short_term.append(entry)
+            backlog = len(self.short_term)
+        if backlog > self.MAX_SHORT_TERM:
+            self._wake.set()
+        if backlog > self.max_pending:
             self._consolidate_memory()
-            
-    def _consolidate_memory(self):
-        """Move short term memories to long term storage"""
-        # Process short term memories and create summaries
-        # Store in long term memory
-        pass 
\ No newline at end of file
+
+    def _run(self):
+        """Consolidation loop"""
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            while self._consolidate_memory():
+                pass
+
+    def _consolidate_memory(self) -> int:
+        """Move one batch of the oldest short-term memories into long-term records.
+
+        Returns:
+            int: Number of interactions consolidated
+        """
+        try:
+            with self._lock:
+                count = min(len(self.short_term) - self.MAX_SHORT_TERM, self.batch_size)
+                if count <= 0:
+                    return 0
+                batch = [self.short_term.popleft() for _ in range(count)]
+                self._fold(batch)
+                self.consolidated += count
+                return count
+        except Exception as e:
+            logger.error(f"Error consolidating memory: {e}")
+            return 0
+
+    def _fold(self, batch: Iterable[Dict]):
+        """Merge interactions into their long-term records; the caller holds the lock"""
+        for entry in batch:
+            key = (entry['handle'], entry['topic'])
+            record = self.long_term.get(key)
+            if record is None:
+                record = {
+                    'handle': entry['handle'], 'topic': entry['topic'], 'count': 0,
+                    'first_seen': entry['timestamp'], 'last_seen': entry['timestamp'],
+                    'context_types': [], 'keywords': {}, 'samples': [],
+                }
+                self.long_term[key] = record
+            else:
+                self._unindex(record)
+                self.long_term.move_to_end(key)
+            record['count'] += 1
+            record['first_seen'] = min(record['first_seen'], entry['timestamp'])
+            record['last_seen'] = max(record['last_seen'], entry['timestamp'])
+            if entry['context_type'] not in record['context_types']:
+                record['context_types'].append(entry['context_type'])
+            counts = Counter(record['keywords'])
+            counts.update(keywords(f"{entry['message']} {entry['reply']}"))
+            record['keywords'] = dict(counts.most_common(self.max_keywords))
+            record['samples'].append({'message': entry['message'], 'reply': entry['reply'],
+                                      'timestamp': entry['timestamp']})
+            del record['samples'][:-self.max_samples]
+            self._index(record)
+        while len(self.long_term) > self.max_records:
+            _, evicted = self.long_term.popitem(last=False)
+            self._unindex(evicted)
+
+    def _index(self, record: Dict):
+        bisect.insort(self._by_handle.setdefault(record['handle'], []), (record['last_seen'], record['topic']))
+
+    def _unindex(self, record: Dict):
+        index = self._by_handle[record['handle']]
+        position = bisect.bisect_left(index, (record['last_seen'], record['topic']))
+        del index[position]
+        if not index:
+            del self._by_handle[record['handle']]
+
+    def flush(self):
+        """Consolidate everything beyond the short-term limit now"""
+        while self._consolidate_memory():
+            pass
+
+    def recall(self, handle: str, since=None, limit: Optional[int] = None) -> List[Dict]:
+        """Get a handle's long-term records, most recently seen first.
+
+        Args:
+            handle: Handle to look up
+            since: Only records seen at or after this time (epoch or ISO string)
+            limit: Maximum number of records
+        """
+        since = normalize_timestamp(since)
+        with self._lock:
+            index = self._by_handle.get(handle, [])
+            start = bisect.bisect_left(index, (since,)) if since is not None else 0
+            if limit is not None:
+                start = max(start, len(index) - limit)
+            return [dict(self.long_term[(handle, topic)]) for _, topic in reversed(index[start:])]
+
+    def get_record(self, handle: str, topic: str) -> Optional[Dict]:
+        """Get the long-term record for one handle and topic"""
+        with self._lock:
+            record = self.long_term.get((handle, topic))
+            return dict(record) if record else None
+
+    def get_recent_context(self, handle: str, limit: int = 5) -> List[Dict]:
+        """Get a handle's recent exchanges as messages, oldest first.
+
+        Short-term interactions come first; older exchanges are filled in
+        from the samples of the handle's most recent long-term records.
+        """
+        with self._lock:
+            exchanges = [entry for entry in self.short_term if entry['handle'] == handle]
+            if len(exchanges) * 2 < limit:
+                for _, topic in reversed(self._by_handle.get(handle, [])):
+                    exchanges.extend(self.long_term[(handle, topic)]['samples'])
+        exchanges.sort(key=lambda exchange: exchange['timestamp'])
+        messages = []
+        for exchange in exchanges:
+            messages.append({'text': exchange['message'], 'timestamp': exchange['timestamp'], 'is_from_us': False})
+            if exchange['reply']:
+                messages.append({'text': exchange['reply'], 'timestamp': exchange['timestamp'], 'is_from_us': True})
+        return messages[-limit:] if limit else messages
+
+    def _load(self):
+        """Read saved short- and long-term memory"""
+        try:
+            state = read_json(self.path, {})
+            with self._lock:
+                self.short_term.extend(state.get('short_term', []))
+                self._restore_records(state.get('long_term', []))
+        except Exception as e:
+            logger.error(f"Error loading long-term memory: {e}")
+
+    def _restore_records(self, records: List[Dict]):
+        """Restore saved records, least recently updated first"""
+        for record in records:
+            self.long_term[(record['handle'], record['topic'])] = record
+            self._index(record)
+
+    def save(self):
+        """Write short- and long-term memory to disk"""
+        if not self.path:
+            return
+        try:
+            with self._lock:
+                state = {'short_term': list(self.short_term), 'long_term': list(self.long_term.values())}
+                write_json_atomic(self.path, state)
+        except Exception as e:
+            logger.error(f"Error saving long-term memory: {e}")
+
+    async def save_state(self):
+        """Save memory without blocking the event loop"""
+        await asyncio.get_running_loop().run_in_executor(None, self.save)
+
+    def close(self):
+        """Stop the consolidation thread, consolidate the backlog and save"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self.save()
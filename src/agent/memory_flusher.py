@@ -0,0 +1,190 @@
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# serialize(key) -> (path, payload, token) or None when there is nothing to write
+Serializer = Callable[[str], Optional[Tuple[Path, bytes, int]]]
+
+class MemoryFlusher:
+    """Background writer that coalesces conversation saves.
+
+    Callers mark keys dirty from any thread without touching the disk. The
+    writer thread waits `window` seconds after the first mark so repeated
+    updates to the same key collapse into one write, serializes each key via
+    the callback, writes every file to a temp file, fsyncs the batch, then
+    renames them into place and fsyncs the directories once. If a write or
+    fsync fails, the batch's temp files are removed and its entries go back
+    into the queue (unless a newer update superseded them) for the next
+    batch, so a payload submitted for an evicted key is never dropped.
+    """
+
+    def __init__(self, serialize: Serializer, on_written: Callable[[str, int], None] = None,
+                 window: float = 1.0):
+        """Start the writer thread.
+
+        Args:
+            serialize: Returns (path, payload, token) for a key, or None to skip it
+            on_written: Called with (key, token) after a key's file is durable
+            window: Seconds to coalesce updates before writing a batch
+        """
+        self.serialize = serialize
+        self.on_written = on_written
+        self.window = window
+        self._pending: Dict[str, Optional[Tuple[Path, bytes, int]]] = {}
+        self._in_flight: Dict[str, Tuple[Path, bytes, int]] = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._writing = False
+        self._flush_now = False
+        self.batches_written = 0
+        self.files_written = 0
+        self.write_errors = 0
+        self._thread = threading.Thread(target=self._run, name="memory-flusher", daemon=True)
+        self._thread.start()
+
+    def mark(self, key: str):
+        """Schedule a key to be serialized and written in the next batch"""
+        with self._cond:
+            # The resident copy supersedes any payload submitted earlier
+            self._pending[key] = None
+            self._cond.notify()
+
+    def submit(self, key: str, path: Path, payload: bytes, token: int = 0):
+        """Schedule an already serialized payload (e.g. for an evicted key)"""
+        with self._cond:
+            self._pending[key] = (Path(path), payload, token)
+            self._cond.notify()
+
+    def pending_payload(self, key: str) -> Optional[bytes]:
+        """Get a submitted payload that has not reached the disk yet"""
+        with self._cond:
+            entry = self._pending.get(key) or self._in_flight.get(key)
+            return entry[1] if entry else None
+
+    def submitted_keys(self) -> set:
+        """Get keys whose submitted payloads have not reached the disk yet"""
+        with self._cond:
+            keys = {key for key, entry in self._pending.items() if entry is not None}
+            return keys.union(self._in_flight)
+
+    def _run(self):
+        """Writer loop"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and self._stopping:
+                    return
+            with self._cond:
+                # Let further updates to the same keys pile up; drain() and
+                # stop() cut this short
+                deadline = time.monotonic() + self.window
+                while not (self._stopping or self._flush_now) and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                self._flush_now = False
+                batch, self._pending = self._pending, {}
+                self._in_flight = {key: entry for key, entry in batch.items() if entry is not None}
+                self._writing = True
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"Error flushing memory batch: {e}")
+                self._requeue(batch)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._in_flight = {}
+                    self._cond.notify_all()
+
+    def _requeue(self, batch: Dict[str, Optional[Tuple[Path, bytes, int]]]):
+        """Put the entries of a failed batch back for the next one"""
+        with self._cond:
+            self.write_errors += 1
+            if self._stopping:
+                logger.error(f"Dropping unwritten saves for {sorted(batch)} while stopping")
+                return
+            for key, entry in batch.items():
+                # A mark or payload that arrived meanwhile supersedes the failed entry
+                self._pending.setdefault(key, entry)
+
+    def _write_batch(self, batch: Dict[str, Optional[Tuple[Path, bytes, int]]]):
+        """Write a batch of files atomically with one round of fsyncs"""
+        files = {}
+        for key, entry in batch.items():
+            if entry is None:
+                try:
+                    entry = self.serialize(key)
+                except Exception as e:
+                    logger.error(f"Error serializing {key}: {e}")
+                    continue
+            if entry is not None:
+                files[key] = entry
+        if not files:
+            return
+
+        temps = []
+        try:
+            for key, (path, payload, token) in files.items():
+                tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                try:
+                    f = open(tmp_path, 'wb')
+                except FileNotFoundError:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    f = open(tmp_path, 'wb')
+                temps.append((key, tmp_path, path, token))
+                with f:
+                    f.write(payload)
+
+            for _, tmp_path, _, _ in temps:
+                fd = os.open(tmp_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            directories = set()
+            for _, tmp_path, path, _ in temps:
+                os.replace(tmp_path, path)
+                directories.add(path.parent)
+        except BaseException:
+            for _, tmp_path, _, _ in temps:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass  # Already renamed into place
+            raise
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue  # Directory fsync is not supported everywhere
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        self.batches_written += 1
+        self.files_written += len(temps)
+        if self.on_written:
+            for key, _, _, token in temps:
+                self.on_written(key, token)
+
+    def drain(self):
+        """Block until everything marked so far is on disk, or a batch fails to write"""
+        with self._cond:
+            errors = self.write_errors
+            while (self._pending or self._writing) and self.write_errors == errors:
+                self._flush_now = True
+                self._cond.notify_all()
+                self._cond.wait(0.05)
+
+    def stop(self):
+        """Write everything still pending and stop the thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
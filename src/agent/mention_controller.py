@@ -8,19 +8,29 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
-import json
+from .latency_stats import LatencyTracker
+from .reply_pipeline import ReplyJob, ReplyPipeline
+from .reply_stream import type_stream
 
 logger = logging.getLogger(__name__)
 
 class MentionController:
-    def __init__(self, handler, memory, bob):
+    def __init__(self, handler, memory, bob, latency=None, reply_concurrency: int = 4,
+                 stream_replies: bool = True):
         self.handler = handler
         self.memory = memory
         self.bob = bob
+        self.latency = latency if latency is not None else LatencyTracker(path=None)
+        self.reply_concurrency = reply_concurrency  # Replies generated at once
+        self.stream_replies = stream_replies  # Start typing at the first token
         self.logger = logging.getLogger(__name__)
 
     async def process_mentions(self):
-        """Process mentions using tweet IDs as unique identifiers"""
+        """Process mentions using tweet IDs as unique identifiers.
+
+        All unreplied mentions are extracted in one pass and their replies
+        generated concurrently while earlier ones are being typed.
+        """
         try:
             self.logger.info("\nProcessing mentions")
             
@@ -35,68 +45,82 @@ class MentionController:
                 
             self.logger.info(f"Found {len(mentions)} mentions")
             
-            # Process each mention
+            # Stage 1: extract every unreplied mention, starting its reply right away
+            pipeline = ReplyPipeline(self._generate_reply, concurrency=self.reply_concurrency)
             for mention in mentions:
                 try:
-                    # Get tweet ID and handle from the element
-                    tweet_id = await self.get_tweet_id(mention)
-                    handle = await self.get_handle_from_mention(mention)
-                    
-                    if not tweet_id or not handle:
-                        self.logger.debug("Could not get tweet ID or handle, skipping")
-                        continue
-                        
-                    # Skip if we already replied to this tweet
-                    if self.memory.has_replied_to_tweet(tweet_id):
-                        self.logger.info(f"Already replied to tweet {tweet_id} from {handle}")
-                        continue
-                        
-                    # Get tweet text
-                    tweet_text = await self.get_tweet_text(mention)
-                    if not tweet_text:
-                        continue
-                        
-                    self.logger.info(f"Processing mention from {handle}: {tweet_text[:50]}...")
-                    
-                    # Generate and send reply
-                    try:
-                        reply = await self.bob.generate_response(
-                            handle,
-                            tweet_text,
-                            context_type='mention'
-                        )
-                        
-                        if reply:
-                            self.logger.info(f"Generated reply: {reply[:50]}...")
-                            if await self.reply_to_tweet(mention, reply):
-                                self.logger.info("Successfully sent reply")
-                                self.memory.add_tweet_reply(tweet_id)
-                                # Store in memory
-                                self.memory.add_mention(handle, {
-                                    'tweet_id': tweet_id,
-                                    'text': tweet_text,
-                                    'reply': reply,
-                                    'timestamp': time.time(),
-                                    'is_from_us': False
-                                })
-                            else:
-                                self.logger.error("Failed to send reply")
-                        else:
-                            self.logger.error("No reply generated")
-                            
-                    except Exception as e:
-                        self.logger.error(f"Error generating/sending response: {str(e)}")
-                        
+                    job = await self._extract_mention(mention)
+                    if job:
+                        pipeline.submit(job)
                 except Exception as e:
                     self.logger.error(f"Error processing mention: {str(e)}")
                     continue
-                    
+
+            # Stage 2: type replies as they become ready
+            await pipeline.drain(self._send_reply)
             return True
             
         except Exception as e:
             self.logger.error(f"Error processing mentions: {str(e)}")
             return False
 
+    async def _extract_mention(self, mention):
+        """Get a reply job for a mention, or None if it needs no reply"""
+        # Get tweet ID and handle from the element
+        tweet_id = await self.get_tweet_id(mention)
+        handle = await self.get_handle_from_mention(mention)
+        
+        if not tweet_id or not handle:
+            self.logger.debug("Could not get tweet ID or handle, skipping")
+            return None
+            
+        # Skip if we already replied to this tweet
+        if self.memory.has_replied_to_tweet(tweet_id):
+            self.logger.info(f"Already replied to tweet {tweet_id} from {handle}")
+            return None
+            
+        self.latency.first_seen('mention', handle, tweet_id)
+        
+        # Get tweet text
+        browser_start = time.perf_counter()
+        tweet_text = await self.get_tweet_text(mention)
+        browser_seconds = time.perf_counter() - browser_start
+        if not tweet_text:
+            return None
+            
+        self.logger.info(f"Processing mention from {handle}: {tweet_text[:50]}...")
+        return ReplyJob('mention', handle, tweet_id, tweet_text, target=mention,
+                        browser_seconds=browser_seconds)
+
+    async def _generate_reply(self, job):
+        """Generate the reply for a mention, streamed if possible"""
+        if self.stream_replies and hasattr(self.bob, 'stream_response'):
+            return await self.bob.stream_response(job.handle, job.text, context_type='mention')
+        return await self.bob.generate_response(job.handle, job.text, context_type='mention')
+
+    async def _send_reply(self, job):
+        """Type a generated reply under its mention and record it"""
+        self.logger.info(f"Generated reply: {str(job.reply)[:50]}...")
+        reply_start = time.perf_counter()
+        if not await self.reply_to_tweet(job.target, job.reply):
+            self.logger.error("Failed to send reply")
+            return False
+        job.reply = str(job.reply)  # A streamed reply is complete once typed
+        self.logger.info("Successfully sent reply")
+        browser_seconds = job.browser_seconds + time.perf_counter() - reply_start
+        self.latency.replied('mention', job.handle, job.key,
+                             llm_seconds=job.llm_seconds, browser_seconds=browser_seconds)
+        self.memory.add_tweet_reply(job.key)
+        # Store in memory
+        self.memory.add_mention(job.handle, {
+            'tweet_id': job.key,
+            'text': job.text,
+            'reply': job.reply,
+            'timestamp': time.time(),
+            'is_from_us': False
+        })
+        return True
+
     async def get_tweet_id(self, mention):
         """Extract tweet ID from mention element"""
         try:
@@ -208,11 +232,9 @@ class MentionController:
                 await asyncio.sleep(1)
 
                 # Type out the reply character by character
-                for char in reply_text:
-                    actions = ActionChains(self.handler.browser.driver)
-                    actions.send_keys(char)
-                    actions.perform()
-                    await asyncio.sleep(random.uniform(0.03, 0.1))
+                if not await type_stream(self.handler.browser.driver, reply_text):
+                    self.logger.error("Nothing to type, abandoning reply")
+                    return False
 
                 await asyncio.sleep(1)  # Wait a moment after typing
 
@@ -323,16 +345,3 @@ class MentionController:
         except Exception as e:
             self.logger.error(f"Error finding element with selector {selector}: {e}")
             return None
-
-    async def load_replied_mentions(self):
-        """Load previously replied mentions"""
-        try:
-            with open('data/replied_mentions.json', 'r') as f:
-                return set(json.load(f))
-        except:
-            return set()
-
-    async def save_replied_mentions(self, mentions):
-        """Save replied mentions"""
-        with open('data/replied_mentions.json', 'w') as f:
-            json.dump(list(mentions), f) 
\ No newline at end of file
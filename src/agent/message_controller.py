@@ -10,14 +10,21 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from typing import List, Dict
 import time
 from .conversation_memory import ConversationMemory
+from .latency_stats import LatencyTracker
+from .reply_pipeline import ReplyJob, ReplyPipeline
+from .reply_stream import StreamedReply, type_stream
 
 logger = logging.getLogger(__name__)
 
 class MessageController:
-    def __init__(self, handler, memory, bob):
+    def __init__(self, handler, memory, bob, latency=None, reply_concurrency: int = 4,
+                 stream_replies: bool = True):
         self.handler = handler
         self.memory = memory
         self.bob = bob  # Store Bob instance for generating replies
+        self.latency = latency if latency is not None else LatencyTracker(path=None)
+        self.reply_concurrency = reply_concurrency  # Replies generated at once
+        self.stream_replies = stream_replies  # Start typing at the first token
         self.logger = logging.getLogger(__name__)
         self.current_handle = None  # Track current conversation handle
         
@@ -170,20 +177,19 @@ class MessageController:
             # Convert to list to avoid modification during iteration
             conversations = list(dm_previews.items())
             
-            # Step 3: Process each conversation
+            # Step 3: Read each conversation, starting replies to unreplied ones right away
+            pipeline = ReplyPipeline(self._generate_reply, concurrency=self.reply_concurrency)
             for i, (handle, conv_element) in enumerate(conversations, 1):
                 try:
                     self.logger.info(f"\nProcessing conversation {i}/{len(conversations)} with {handle}")
                     
                     # Open conversation using proven approach
-                    actions = ActionChains(self.handler.browser.driver)
-                    actions.move_to_element(conv_element)
-                    actions.click()
-                    actions.perform()
-                    await asyncio.sleep(2)
+                    browser_start = time.perf_counter()
+                    await self.open_conversation(conv_element)
                     
                     # Get conversation details using proven approach
                     messages = await self.get_current_conversation_details()
+                    browser_seconds = time.perf_counter() - browser_start
                     if not messages:
                         self.logger.info("No messages found")
                         continue
@@ -194,46 +200,79 @@ class MessageController:
                     last_message = messages[-1]
                     if not last_message.get('is_from_us', False):
                         self.logger.info(f"Found unreplied message: {last_message['text']}")
-                        
-                        try:
-                            # Generate and send reply
-                            reply = await self.bob.generate_response(
-                                handle,
-                                last_message['text'],
-                                context_type='dm'
-                            )
-                            
-                            if reply:
-                                self.logger.info(f"Generated reply: {reply[:50]}...")
-                                if await self.send_message(reply):
-                                    self.logger.info("Successfully sent reply")
-                                    if memory:
-                                        memory.add_dm(handle, {
-                                            'text': reply,
-                                            'timestamp': time.time(),
-                                            'from_us': True
-                                        })
-                                else:
-                                    self.logger.error("Failed to send reply")
-                            else:
-                                self.logger.error("No reply generated")
-                                
-                        except Exception as e:
-                            self.logger.error(f"Error generating/sending response: {str(e)}")
-                            
+                        self.latency.first_seen('dm', handle, last_message['text'])
+                        # No element is kept: the list re-renders before the reply is sent
+                        pipeline.submit(ReplyJob('dm', handle, last_message['text'], last_message['text'],
+                                                 browser_seconds=browser_seconds))
                     else:
                         self.logger.info("Last message was from us - no reply needed")
                 
                 except Exception as e:
                     self.logger.error(f"Error processing conversation: {str(e)}")
                     continue
-                
+
+            # Step 4: Send replies as they become ready
+            async def send(job):
+                return await self._send_reply(job, memory)
+
+            await pipeline.drain(send)
             return True
             
         except Exception as e:
             self.logger.error(f"Error in process_dms: {str(e)}")
             return False
 
+    async def open_conversation(self, conv_element):
+        """Open a conversation from the messages list"""
+        actions = ActionChains(self.handler.browser.driver)
+        actions.move_to_element(conv_element)
+        actions.click()
+        actions.perform()
+        await asyncio.sleep(2)
+
+    async def locate_conversation(self, handle):
+        """Find a conversation in the messages list by handle, reloading the list if needed"""
+        conversations = await self.get_conversations()
+        if handle not in conversations:
+            self.handler.browser.navigate("https://twitter.com/messages")
+            await asyncio.sleep(2)
+            conversations = await self.get_conversations()
+        return conversations.get(handle)
+
+    async def _generate_reply(self, job):
+        """Generate the reply for a DM, streamed if possible"""
+        if self.stream_replies and hasattr(self.bob, 'stream_response'):
+            return await self.bob.stream_response(job.handle, job.text, context_type='dm')
+        return await self.bob.generate_response(job.handle, job.text, context_type='dm')
+
+    async def _send_reply(self, job, memory=None):
+        """Reopen a conversation, send its generated reply and record it"""
+        self.logger.info(f"Generated reply for {job.handle}: {str(job.reply)[:50]}...")
+        send_start = time.perf_counter()
+        # Elements found while reading are stale by now; look the conversation up again
+        conv_element = await self.locate_conversation(job.handle)
+        if conv_element is None:
+            self.logger.error(f"Could not find the conversation with {job.handle}")
+            if isinstance(job.reply, StreamedReply):
+                job.reply.cancel()
+            return False
+        await self.open_conversation(conv_element)
+        if not await self.send_message(job.reply):
+            self.logger.error("Failed to send reply")
+            return False
+        job.reply = str(job.reply)  # A streamed reply is complete once typed
+        self.logger.info("Successfully sent reply")
+        browser_seconds = job.browser_seconds + time.perf_counter() - send_start
+        self.latency.replied('dm', job.handle, job.key,
+                             llm_seconds=job.llm_seconds, browser_seconds=browser_seconds)
+        if memory:
+            memory.add_dm(job.handle, {
+                'text': job.reply,
+                'timestamp': time.time(),
+                'from_us': True
+            })
+        return True
+
     async def get_current_conversation_details(self):
         """Get conversation details using proven approach from debug_conversations.py"""
         try:
@@ -400,12 +439,11 @@ class MessageController:
             actions.perform()
             await asyncio.sleep(1)
             
-            # Type message
-            for char in message:
-                actions = ActionChains(self.handler.browser.driver)
-                actions.send_keys(char)
-                actions.perform()
-                await asyncio.sleep(random.uniform(0.03, 0.1))
+            # Type message, as it streams in if it is still being generated
+            message = await type_stream(self.handler.browser.driver, message)
+            if not message:
+                self.logger.error("Nothing to type, abandoning message")
+                return False
                 
             # Find send button
             self.logger.info("Looking for send button...")
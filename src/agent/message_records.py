@@ -0,0 +1,154 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+def normalize_timestamp(ts) -> Optional[float]:
+    """Convert an epoch number, ISO-8601 string or datetime to epoch seconds"""
+    if ts is None or isinstance(ts, bool):
+        return None
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return float(ts)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(ts).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+def intern_str(value):
+    """Intern strings so repeated handles and types share one object"""
+    return sys.intern(value) if type(value) is str else value
+
+# Both spellings are in use; records read either and write back the one they were given
+FROM_US_KEYS = ('from_us', 'is_from_us')
+
+
+class MessageRecord(MutableMapping):
+    """Compact resident form of a stored DM.
+
+    Known keys live in __slots__ instead of a per-message dict, type and
+    handle strings are interned, and the timestamp is normalized to epoch
+    seconds once on load. The record still behaves like the JSON dict it
+    came from: reads, writes, iteration and equality use the original keys,
+    and to_dict() gives back exactly the dict it was built from. Keys a
+    message did not have stay absent rather than becoming None. from_us and
+    is_from_us are two names for the same flag, so either one can be read.
+    """
+
+    FIELDS = ('type', 'text')  # Keys stored as slots of the same name
+    INTERNED = frozenset(('type',))
+    __slots__ = FIELDS + ('handle', 'timestamp', 'from_us', '_raw_ts', '_from_us_key', '_extra')
+
+    def __init__(self, data: Optional[Dict] = None, handle: Optional[str] = None):
+        """Build a record from a message dict.
+
+        Args:
+            data: Message in its JSON shape
+            handle: Conversation the message belongs to; not part of the JSON shape
+        """
+        self.handle = intern_str(handle)
+        self.timestamp = None
+        self.from_us = None
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict, handle: Optional[str] = None) -> 'MessageRecord':
+        """Build a record from a message dict"""
+        return cls(data, handle)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the message in its JSON shape"""
+        return {key: self[key] for key in self}
+
+    copy = to_dict
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if key == 'timestamp':
+            try:
+                return self._raw_ts
+            except AttributeError:
+                raise KeyError(key) from None
+        if key in FROM_US_KEYS and hasattr(self, '_from_us_key') and key not in (self._extra or ()):
+            return self.from_us
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, intern_str(value) if key in self.INTERNED else value)
+        elif key == 'timestamp':
+            self._raw_ts = value
+            self.timestamp = normalize_timestamp(value)
+        elif key in FROM_US_KEYS and getattr(self, '_from_us_key', key) == key:
+            self._from_us_key = FROM_US_KEYS[FROM_US_KEYS.index(key)]
+            self.from_us = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[intern_str(key)] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS and hasattr(self, key):
+            delattr(self, key)
+        elif key == 'timestamp' and hasattr(self, '_raw_ts'):
+            del self._raw_ts
+            self.timestamp = None
+        elif key in FROM_US_KEYS and getattr(self, '_from_us_key', None) == key:
+            del self._from_us_key
+            self.from_us = None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if hasattr(self, '_raw_ts'):
+            yield 'timestamp'
+        if hasattr(self, '_from_us_key'):
+            yield self._from_us_key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class MentionRecord(MessageRecord):
+    """Compact resident form of a stored mention"""
+
+    FIELDS = MessageRecord.FIELDS + ('tweet_id', 'reply', 'is_reply')
+    __slots__ = ('tweet_id', 'reply', 'is_reply')
+
+
+RECORD_TYPES = {'dms': MessageRecord, 'mentions': MentionRecord}
+
+def to_records(kind: str, messages, handle: Optional[str] = None) -> list:
+    """Convert a conversation's "dms" or "mentions" list to records"""
+    cls = RECORD_TYPES[kind]
+    return [message if isinstance(message, cls) else cls(message, handle) for message in messages]
+
+def encode_record(value):
+    """json.dumps default hook that writes records in their JSON shape"""
+    if isinstance(value, MessageRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
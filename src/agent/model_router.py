@@ -0,0 +1,163 @@
+import re
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model tiers per use, fastest first
+REPLY_TIERS = ("gpt-3.5-turbo", "gpt-4o")
+TWEET_TIERS = ("gpt-4o-mini", "gpt-4o")
+SPACE_TIERS = ("gpt-3.5-turbo", "gpt-4")
+
+# Words that mark a request as needing real building or technical expertise
+DOMAIN_KEYWORDS = frozenset({
+    "technical", "engineering", "structural", "load", "beam", "beams", "joist", "joists",
+    "foundation", "footing", "framing", "concrete", "rebar", "truss", "span", "wiring",
+    "electrical", "circuit", "voltage", "plumbing", "drainage", "permit", "code", "codes",
+    "insulation", "ventilation", "hvac", "architecture", "design", "calculate", "calculation",
+    "tolerance", "algorithm", "model", "modeling", "simulation", "dataset", "data", "training",
+    "neural", "api", "database", "python", "optimize", "optimization", "security", "privacy",
+    "deploy", "scale", "latency", "integration", "analytics", "predictive",
+})
+
+# Feature weights of the complexity score; they sum to 1
+FEATURE_WEIGHTS = {'length': 0.3, 'questions': 0.2, 'keywords': 0.35, 'depth': 0.15}
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+def complexity_features(text: str, depth: int = 0) -> Dict[str, float]:
+    """Score the features of a request between 0 and 1.
+
+    Args:
+        text: The message or prompt
+        depth: Messages already exchanged in the conversation
+
+    Returns:
+        Dict[str, float]: length, questions, keywords and depth scores
+    """
+    words = WORD_RE.findall(text.lower())
+    keywords = sum(1 for word in words if word in DOMAIN_KEYWORDS)
+    return {
+        'length': min(len(words) / 60, 1.0),
+        'questions': min(text.count('?') / 3, 1.0),
+        # One domain word in ten already counts as dense
+        'keywords': min(keywords / len(words) * 10, 1.0) if words else 0.0,
+        'depth': min(depth / 10, 1.0),
+    }
+
+def complexity(text: str, depth: int = 0) -> float:
+    """Weighted complexity score of a request between 0 and 1"""
+    features = complexity_features(text, depth)
+    return sum(FEATURE_WEIGHTS[name] * value for name, value in features.items())
+
+
+class ModelRouter:
+    """Picks a model tier per request and steps down when a tier is unhealthy.
+
+    The complexity score of a request splits evenly across the tiers given
+    for a use (fastest first), so with two tiers a score of 0.5 or more
+    goes to the stronger model. The gateway reports every call's latency
+    and outcome; a tier whose recent p95 latency is over the SLO, or whose
+    recent error rate is too high, is skipped for the next faster one.
+    Samples older than horizon seconds are forgotten, so a skipped tier
+    gets tried again once its bad spell has aged out.
+    """
+
+    def __init__(self, slo: float = 10.0, max_error_rate: float = 0.2, window: int = 50,
+                 min_samples: int = 5, horizon: float = 300.0):
+        """Initialize the router with no samples.
+
+        Args:
+            slo: p95 latency in seconds a tier must stay under
+            max_error_rate: Share of failed calls a tier may have
+            window: Recent calls kept per model
+            min_samples: Calls needed before a model's health is judged
+            horizon: Seconds after which a call no longer counts
+        """
+        self.slo = slo
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.min_samples = min_samples
+        self.horizon = horizon
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {}
+        self.routes: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    def record(self, model: str, seconds: float, ok: bool = True):
+        """Record the latency and outcome of a call"""
+        samples = self._samples.setdefault(model, deque(maxlen=self.window))
+        samples.append((time.monotonic(), seconds, ok))
+
+    def _recent(self, model: str):
+        samples = self._samples.get(model)
+        if not samples:
+            return []
+        cutoff = time.monotonic() - self.horizon
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return list(samples)
+
+    def health(self, model: str) -> Dict:
+        """Get the recent call count, p95 latency and error rate of a model"""
+        samples = self._recent(model)
+        latencies = sorted(seconds for _, seconds, ok in samples if ok)
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            'calls': len(samples),
+            'p95': p95,
+            'error_rate': errors / len(samples) if samples else 0.0,
+        }
+
+    def at_risk(self, model: str, slo: Optional[float] = None) -> bool:
+        """Whether a model's recent calls miss the SLO or fail too often"""
+        health = self.health(model)
+        if health['calls'] < self.min_samples:
+            return False
+        slo = self.slo if slo is None else slo
+        return health['error_rate'] > self.max_error_rate or \
+            (health['p95'] is not None and health['p95'] > slo)
+
+    def choose(self, text: str, tiers: Sequence[str] = REPLY_TIERS, depth: int = 0,
+               slo: Optional[float] = None) -> str:
+        """Pick the model for a request.
+
+        Args:
+            text: The message or prompt
+            tiers: Candidate models, fastest first
+            depth: Messages already exchanged in the conversation
+            slo: Latency SLO for this request, defaults to the router's
+
+        Returns:
+            str: Model name
+        """
+        score = complexity(text, depth)
+        index = min(int(score * len(tiers)), len(tiers) - 1)
+        wanted = index
+        while index > 0 and self.at_risk(tiers[index], slo):
+            index -= 1
+        model = tiers[index]
+        if index != wanted:
+            self.fallbacks += 1
+            logger.info(f"{tiers[wanted]} is missing its SLO, routing to {model}")
+        self.routes[model] = self.routes.get(model, 0) + 1
+        return model
+
+    def stats(self) -> Dict:
+        """Get routing counts, fallbacks and per-model health"""
+        return {
+            'routes': dict(self.routes),
+            'fallbacks': self.fallbacks,
+            'models': {model: self.health(model) for model in self._samples},
+        }
+
+    def log_summary(self):
+        """Log how requests were routed and how each model is doing"""
+        stats = self.stats()
+        logger.info(f"Model routes: {stats['routes']}, SLO fallbacks: {stats['fallbacks']}")
+        for model, health in stats['models'].items():
+            p95 = f"{health['p95']:.2f}s" if health['p95'] is not None else "n/a"
+            logger.info(f"{model}: {health['calls']} recent calls, p95 {p95}, "
+                        f"{health['error_rate']:.0%} errors")
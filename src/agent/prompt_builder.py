@@ -0,0 +1,140 @@
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Prompt token budgets per model, well inside their context windows
+PROMPT_BUDGETS = {
+    'gpt-3.5-turbo': 1500,
+    'gpt-4': 2000,
+    'gpt-4o': 3000,
+    'gpt-4o-mini': 3000,
+}
+DEFAULT_BUDGET = 1500
+MESSAGE_OVERHEAD = 4  # Tokens the chat format adds per message
+REPLY_PRIMING = 3  # Tokens that prime the assistant's reply
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """Get a model's tokenizer, or None when prompt sizes have to be estimated"""
+    if tiktoken is None:
+        logger.error("tiktoken is not installed, estimating prompt sizes at ~4 characters per token")
+        return None
+    try:
+        name = tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        name = "cl100k_base"
+    try:
+        # The BPE ranks are downloaded on first use and cached by tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.error(f"Could not load the {name} tokenizer for {model}, estimating prompt sizes: {e}")
+        return None
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count the tokens of a text, estimating ~4 characters per token without tiktoken"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+def truncate_tokens(text: str, tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """Cut a text down to at most the given number of tokens"""
+    if tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:tokens * 4]
+    encoded = encoding.encode(text)
+    return text if len(encoded) <= tokens else encoding.decode(encoded[:tokens])
+
+
+class PromptBuilder:
+    """Assembles chat messages that fit a model's prompt token budget.
+
+    System prompts and templates are module constants, so their token
+    counts are computed once and served from the count cache afterwards.
+    Fixed values are formatted into the template as they are; list values
+    (history, context, previous tweets) are filled newest first, in the
+    order given, with whatever budget is left. A final exact count drops
+    the oldest kept items if joining them cost more than estimated.
+    """
+
+    def __init__(self, model: str = "gpt-3.5-turbo", budget: Optional[int] = None):
+        """Initialize a builder for one model.
+
+        Args:
+            model: Model the prompt is for; picks the tokenizer and default budget
+            budget: Prompt token budget, defaults to PROMPT_BUDGETS for the model
+        """
+        self.model = model
+        self.budget = budget if budget is not None else PROMPT_BUDGETS.get(model, DEFAULT_BUDGET)
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def fit(self, items: Sequence[str], tokens: int, separator: str = "\n") -> List[str]:
+        """Keep the newest items (the end of the list) that fit in tokens, in their original order"""
+        kept = []
+        step = self.count(separator)
+        for item in reversed(items):
+            cost = self.count(item) + (step if kept else 0)
+            if cost > tokens:
+                break
+            tokens -= cost
+            kept.append(item)
+        kept.reverse()
+        return kept
+
+    def format(self, template: str, lists: Optional[Dict[str, Sequence[str]]] = None,
+               separator: str = "\n", reserve: int = 0, **values) -> str:
+        """Fill a template as a single message within the budget.
+
+        Args:
+            template: Message with str.format fields for values and lists
+            lists: Field name -> items, filled newest first in this order
+            separator: Joins the kept items of a list
+            reserve: Tokens already spent on other messages of the prompt
+            **values: Fixed field values
+
+        Returns:
+            str: The filled template
+        """
+        budget = self.budget - reserve
+        lists = dict(lists or {})
+        fixed = template.format(**values, **{name: "" for name in lists})
+        remaining = budget - self.total(fixed)
+        if remaining < 0:
+            logger.error(f"Fixed prompt for {self.model} is {-remaining} tokens over its budget")
+        kept = {}
+        for name, items in lists.items():
+            kept[name] = self.fit(list(items), max(remaining, 0), separator)
+            remaining -= self.count(separator.join(kept[name]))
+
+        while True:
+            text = template.format(**values, **{name: separator.join(items) for name, items in kept.items()})
+            if self.total(text) <= budget or not any(kept.values()):
+                return text
+            # Joining changed the count; give up the oldest item of the last list that has any
+            last = [name for name, items in kept.items() if items][-1]
+            kept[last] = kept[last][1:]
+
+    def messages(self, system: str, template: str, lists: Optional[Dict[str, Sequence[str]]] = None,
+                 separator: str = "\n", **values) -> List[Dict]:
+        """Build a system message and a user message filled to the budget"""
+        user = self.format(template, lists, separator, reserve=MESSAGE_OVERHEAD + self.count(system), **values)
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ]
+
+    def total(self, *contents: str) -> int:
+        """Exact prompt size of messages with these contents"""
+        return REPLY_PRIMING + sum(MESSAGE_OVERHEAD + self.count(content) for content in contents)
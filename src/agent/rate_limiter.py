@@ -0,0 +1,187 @@
+import time
+import heapq
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from .latency_stats import DDSketch
+
+logger = logging.getLogger(__name__)
+
+# Share of capacity each channel gets when all of them are waiting
+CHANNEL_WEIGHTS = {'dm': 8, 'mention': 4, 'space': 2, 'tweet': 1}
+
+def estimate_tokens(messages: List[Dict], max_tokens: Optional[int] = None) -> int:
+    """Rough token cost of a chat call: prompt at ~4 characters per token plus the reply budget"""
+    prompt = sum(len(str(message.get('content', ''))) // 4 + 4 for message in messages)
+    return prompt + (max_tokens if max_tokens is not None else 256)
+
+
+class TokenBucket:
+    """Refills at rate units per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available"""
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        """Adjust the level by a correction; a negative amount can leave it in debt"""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Client-side request and token limits shared by every LLM caller.
+
+    Each call needs one unit from the request bucket and its estimated
+    token cost from the token bucket. Waiting calls are served by weighted
+    fair queuing: a call's finish tag is its channel's previous tag (or the
+    current virtual time, if later) plus its cost divided by the channel's
+    weight, and the smallest tag goes next. DMs therefore jump ahead of
+    mentions, space analysis and auto-tweets, while lower channels still
+    get a share instead of starving. Once a call finishes, settle() swaps
+    the estimate for the real token usage.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 90000,
+                 weights: Optional[Dict[str, float]] = None):
+        """Initialize the limiter with full buckets.
+
+        Args:
+            requests_per_minute: Request budget
+            tokens_per_minute: Token budget
+            weights: Relative share per channel, defaults to CHANNEL_WEIGHTS
+        """
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+        self.weights = dict(weights or CHANNEL_WEIGHTS)
+        self._queue = []  # (finish tag, sequence, future, channel, tokens)
+        self._sequence = 0
+        self._virtual_time = 0.0
+        self._last_tag: Dict[str, float] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop = None
+        self._waits: Dict[str, DDSketch] = {}
+
+    def _weight(self, channel: str) -> float:
+        return self.weights.get(channel, min(self.weights.values()))
+
+    async def acquire(self, channel: str, tokens: int = 0) -> float:
+        """Wait for a request slot and tokens.
+
+        Args:
+            channel: "dm", "mention", "space" or "tweet"
+            tokens: Estimated token cost
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        start = time.monotonic()
+        if not self._queue and self._available(tokens, start):
+            self._grant(tokens)
+        else:
+            tag = max(self._virtual_time, self._last_tag.get(channel, 0.0)) + (1 + tokens) / self._weight(channel)
+            self._last_tag[channel] = tag
+            future = asyncio.get_running_loop().create_future()
+            self._sequence += 1
+            heapq.heappush(self._queue, (tag, self._sequence, future, channel, tokens))
+            self._wake()
+            await future
+        waited = time.monotonic() - start
+        self._waits.setdefault(channel, DDSketch()).add(waited)
+        return waited
+
+    def try_acquire(self, channel: str, tokens: int = 0) -> bool:
+        """Take a request slot and tokens only if nobody is waiting and they are free now"""
+        if self._queue or not self._available(tokens, time.monotonic()):
+            return False
+        self._grant(tokens)
+        return True
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once a call's real usage is known"""
+        if actual is not None:
+            self.tokens.give(estimated - actual)
+
+    def _available(self, tokens: int, now: float) -> bool:
+        return self.requests.wait_time(1, now) == 0 and self.tokens.wait_time(tokens, now) == 0
+
+    def _grant(self, tokens: int):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def _wake(self):
+        loop = asyncio.get_running_loop()
+        # The event and dispatcher belong to the event loop they were created on
+        if self._changed is None or self._loop is not loop:
+            self._changed = asyncio.Event()
+            self._dispatcher = None
+            self._loop = loop
+            self._queue = [entry for entry in self._queue if entry[2].get_loop() is loop]
+            heapq.heapify(self._queue)
+        self._changed.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        """Hand out capacity to waiting calls in finish-tag order"""
+        while self._queue:
+            tag, _, future, channel, tokens = self._queue[0]
+            if future.done():  # The caller gave up
+                heapq.heappop(self._queue)
+                continue
+            now = time.monotonic()
+            delay = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if delay > 0:
+                # Sleep until the head can go, or until a new call may have a smaller tag
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            self._virtual_time = max(self._virtual_time, tag)
+            self._grant(tokens)
+            future.set_result(None)
+        # Tags only matter within a busy period; start the next one even
+        self._last_tag.clear()
+        self._virtual_time = 0.0
+
+    def queued(self, channel: Optional[str] = None) -> int:
+        """Number of calls waiting, optionally for one channel"""
+        return sum(1 for entry in self._queue
+                   if not entry[2].done() and (channel is None or entry[3] == channel))
+
+    def stats(self) -> Dict[str, Dict]:
+        """Get queue-wait count, mean, p50, p95 and max per channel"""
+        stats = {}
+        for channel, sketch in self._waits.items():
+            stats[channel] = {
+                'count': sketch.count,
+                'mean': sketch.sum / sketch.count if sketch.count else 0.0,
+                'p50': sketch.quantile(0.5) or 0.0,
+                'p95': sketch.quantile(0.95) or 0.0,
+                'max': max(sketch.max, 0.0),
+                'queued': self.queued(channel),
+            }
+        return stats
+
+    def log_summary(self):
+        """Log queue waits per channel"""
+        for channel, stats in self.stats().items():
+            logger.info(f"{channel} LLM queue wait over {stats['count']}: p50 {stats['p50']:.2f}s, "
+                        f"p95 {stats['p95']:.2f}s, max {stats['max']:.2f}s")
@@ -0,0 +1,276 @@
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+from .conversation_log import write_atomic
+from ..utils.file_lock import FileLock, file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Tweet IDs are snowflakes: milliseconds since this epoch live in the high bits
+TWITTER_EPOCH_MS = 1288834974657
+
+def tweet_id_timestamp(tweet_id: str) -> Optional[float]:
+    """Get the creation time (epoch seconds) encoded in a tweet ID, if any"""
+    try:
+        value = int(tweet_id)
+    except (TypeError, ValueError):
+        return None
+    if value < (1 << 22):  # Pre-snowflake IDs carry no timestamp
+        return None
+    return ((value >> 22) + TWITTER_EPOCH_MS) / 1000.0
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """Size the filter for the given capacity and false positive rate"""
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        """Get bit positions for an item using double hashing"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: str):
+        """Add an item to the filter"""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the filter"""
+        header = json.dumps({'capacity': self.capacity, 'error_rate': self.error_rate}).encode('utf-8')
+        return len(header).to_bytes(4, 'little') + header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        """Deserialize a filter written by to_bytes"""
+        header_len = int.from_bytes(data[:4], 'little')
+        header = json.loads(data[4:4 + header_len])
+        bloom = cls(header['capacity'], header['error_rate'])
+        bloom.bits = bytearray(data[4 + header_len:])
+        return bloom
+
+
+class RepliedTweetStore:
+    """Persistent set of tweet IDs we have already replied to.
+
+    Membership is a dict lookup. Each new ID is appended as one JSONL line,
+    so recording a reply never rewrites the file. IDs older than max_age_days
+    (by the time encoded in the tweet ID, or when we replied for non-snowflake
+    IDs) can be pruned; with a Bloom filter enabled, pruned IDs stay in a
+    compact cold set so they are still reported as replied.
+
+    Several processes may share the log: writes hold an inter-process lock,
+    and a lookup that misses first reads whatever other processes appended
+    since this one last looked.
+    """
+
+    def __init__(self, path: str = "data/replied_mentions.jsonl",
+                 legacy_path: Optional[str] = "data/replied_mentions.json",
+                 max_age_days: Optional[float] = None, bloom_capacity: Optional[int] = None,
+                 bloom_error_rate: float = 0.001, snapshot: Optional[Dict] = None):
+        """Load the store.
+
+        Args:
+            path: Append-only JSONL file of replied tweet IDs
+            legacy_path: Old JSON list of replied IDs, merged in on load
+            max_age_days: Prune IDs older than this on load and in prune()
+            bloom_capacity: Size of the cold-set Bloom filter, or None to
+                drop pruned IDs entirely
+            bloom_error_rate: False positive rate of the Bloom filter
+            snapshot: State from export_state(); only log records appended
+                after it was taken are replayed
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.max_age_days = max_age_days
+        self.bloom_path = self.path.with_suffix('.bloom')
+        self.bloom = None
+        if bloom_capacity:
+            self.bloom = self._load_bloom() or BloomFilter(bloom_capacity, bloom_error_rate)
+        self._replied: Dict[str, float] = {}  # tweet_id -> replied_at
+        self._log_ino = None  # Inode of the log as last read; prune() elsewhere replaces it
+        self._log_offset = 0  # End of the last complete line read
+        self._load(snapshot)
+        if self.max_age_days is not None:
+            self.prune()
+
+    def _load_bloom(self) -> Optional[BloomFilter]:
+        """Load the persisted cold-set filter"""
+        try:
+            if self.bloom_path.exists():
+                return BloomFilter.from_bytes(self.bloom_path.read_bytes())
+        except Exception as e:
+            logger.error(f"Error loading replied tweet filter: {e}")
+        return None
+
+    def _restore(self, snapshot: Dict) -> int:
+        """Restore the set from a snapshot and return the log offset it covers"""
+        taken = snapshot.get('log')
+        current = file_fingerprint(self.path)
+        # The log is only ever appended to, except by prune() which replaces the file
+        if not taken or not current or taken[0] != current[0] or current[1] < taken[1]:
+            logger.info("Replied tweet snapshot is stale; replaying the full log")
+            return 0
+        blob = bytes(snapshot['ids']).decode('utf-8')
+        ids = blob.split("\n") if blob else []
+        self._replied = dict(zip(ids, snapshot['times'].tolist()))
+        return taken[1]
+
+    def export_state(self) -> Dict:
+        """Get the set as compact arrays for a state snapshot"""
+        blob = "\n".join(str(tweet_id) for tweet_id in self._replied).encode('utf-8')
+        return {
+            'log': file_fingerprint(self.path),
+            'ids': np.frombuffer(blob, dtype=np.uint8),
+            'times': np.fromiter(self._replied.values(), dtype=np.float64, count=len(self._replied)),
+        }
+
+    def _load(self, snapshot: Optional[Dict] = None):
+        """Replay the log and merge the legacy JSON list"""
+        offset = self._restore(snapshot) if snapshot else 0
+        if self.path.exists():
+            self._read_log(offset)
+
+        if self.legacy_path and self.legacy_path.exists():
+            try:
+                with open(self.legacy_path, 'r') as f:
+                    legacy = json.load(f)
+                new_ids = [tweet_id for tweet_id in legacy if tweet_id not in self._replied]
+                if new_ids:
+                    logger.info(f"Importing {len(new_ids)} replied tweet IDs from {self.legacy_path}")
+                    self._append(new_ids, time.time())
+            except Exception as e:
+                logger.error(f"Error importing legacy replied mentions: {e}")
+
+    def _read_log(self, offset: int):
+        """Read complete log lines from an offset and remember where they end"""
+        with open(self.path, 'rb') as f:
+            self._log_ino = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Torn by a crash; skipped by the next append
+                offset += len(raw)
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    logger.warning("Skipping torn line in replied tweet log")
+                    continue
+                self._replied[entry['id']] = entry.get('t', 0.0)
+        self._log_offset = offset
+
+    def refresh(self) -> bool:
+        """Read IDs other processes recorded since this one last looked.
+
+        Returns:
+            bool: Whether anything was read
+        """
+        current = file_fingerprint(self.path)
+        if current is None:
+            return False
+        if current[0] != self._log_ino or current[1] < self._log_offset:
+            # Pruned by another process: the log and filter were replaced
+            self._replied = {}
+            if self.bloom is not None:
+                self.bloom = self._load_bloom() or self.bloom
+            self._read_log(0)
+            return True
+        if current[1] > self._log_offset:
+            self._read_log(self._log_offset)
+            return True
+        return False
+
+    def _append(self, tweet_ids, replied_at: float):
+        """Record IDs in memory and append them to the log"""
+        with FileLock(self.path):
+            self.refresh()
+            lines = []
+            for tweet_id in tweet_ids:
+                if tweet_id in self._replied:
+                    continue
+                self._replied[tweet_id] = replied_at
+                lines.append(json.dumps({'id': tweet_id, 't': replied_at}) + "\n")
+            if not lines:
+                return
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if f.tell() > self._log_offset:
+                    lines.insert(0, "\n")  # Terminate a line torn by a crash
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                self._log_offset = f.tell()
+                self._log_ino = os.fstat(f.fileno()).st_ino
+
+    def __contains__(self, tweet_id) -> bool:
+        if tweet_id in self._replied:
+            return True
+        if self.refresh() and tweet_id in self._replied:
+            return True
+        return self.bloom is not None and str(tweet_id) in self.bloom
+
+    def __len__(self) -> int:
+        return len(self._replied)
+
+    def __iter__(self):
+        return iter(self._replied)
+
+    def add(self, tweet_id: str):
+        """Mark a tweet as replied to"""
+        if tweet_id in self._replied:
+            return
+        self._append([tweet_id], time.time())
+
+    def prune(self, max_age_days: Optional[float] = None) -> int:
+        """Drop IDs older than the mentions timeline can show.
+
+        Returns:
+            int: Number of IDs pruned
+        """
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        if max_age_days is None:
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        with FileLock(self.path):
+            self.refresh()
+            expired = [
+                tweet_id for tweet_id, replied_at in self._replied.items()
+                if (tweet_id_timestamp(tweet_id) or replied_at) < cutoff
+            ]
+            if not expired:
+                return 0
+
+            for tweet_id in expired:
+                del self._replied[tweet_id]
+                if self.bloom is not None:
+                    self.bloom.add(tweet_id)
+            if self.bloom is not None:
+                write_atomic(self.bloom_path, self.bloom.to_bytes())
+            # Pruning is the only time the log is rewritten
+            write_atomic(self.path, "".join(
+                json.dumps({'id': tweet_id, 't': replied_at}) + "\n"
+                for tweet_id, replied_at in self._replied.items()
+            ).encode('utf-8'))
+            self._log_ino, self._log_offset = file_fingerprint(self.path)[:2]
+            if self.legacy_path and self.legacy_path.exists():
+                # Otherwise the next load would re-import what was just pruned
+                self.legacy_path.rename(self.legacy_path.with_suffix('.json.migrated'))
+        logger.info(f"Pruned {len(expired)} replied tweet IDs older than {max_age_days} days")
+        return len(expired)
@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .reply_stream import StreamedReply
+
+logger = logging.getLogger(__name__)
+
+class ReplyJob:
+    """An unreplied DM or mention waiting for its reply"""
+
+    __slots__ = ('channel', 'handle', 'key', 'text', 'target', 'browser_seconds', 'reply', 'llm_seconds')
+
+    def __init__(self, channel: str, handle: str, key: str, text: str, target: Any = None,
+                 browser_seconds: float = 0.0):
+        """Create a job.
+
+        Args:
+            channel: "dm" or "mention"
+            handle: Handle to reply to
+            key: Identifies the message (tweet ID or DM text) for latency tracking
+            text: Message text to reply to
+            target: Browser element the reply is sent through
+            browser_seconds: Browser time already spent extracting the message
+        """
+        self.channel = channel
+        self.handle = handle
+        self.key = key
+        self.text = text
+        self.target = target
+        self.browser_seconds = browser_seconds
+        self.reply: Optional[str] = None
+        self.llm_seconds = 0.0
+
+
+class ReplyPipeline:
+    """Two-stage reply pipeline: concurrent generation, one browser.
+
+    Jobs start generating as soon as they are submitted, at most
+    concurrency at a time, so LLM round trips overlap each other and the
+    browser work of extracting the remaining messages. drain() is the
+    browser stage: it sends replies one at a time in the order they become
+    ready, so typing one reply overlaps generating the next. A streamed
+    reply is ready at its first text but keeps its generation slot until
+    the stream ends.
+    """
+
+    def __init__(self, generate: Callable[[ReplyJob], Awaitable[Optional[str]]], concurrency: int = 4):
+        """Initialize the pipeline.
+
+        Args:
+            generate: Returns the reply for a job, or None
+            concurrency: Maximum replies generated at once
+        """
+        self.generate = generate
+        self.concurrency = max(1, concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._started: Optional[float] = None
+
+    def submit(self, job: ReplyJob):
+        """Start generating the reply for a job"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._tasks.append(asyncio.ensure_future(self._generate(job)))
+
+    async def _generate(self, job: ReplyJob) -> ReplyJob:
+        await self._semaphore.acquire()
+        start = time.perf_counter()
+
+        def finished():
+            job.llm_seconds = time.perf_counter() - start
+            self._semaphore.release()
+
+        try:
+            job.reply = await self.generate(job)
+        except asyncio.CancelledError:
+            finished()
+            raise
+        except Exception as e:
+            logger.error(f"Error generating reply for {job.handle}: {e}")
+            job.reply = None
+        if isinstance(job.reply, StreamedReply):
+            job.reply.add_done_callback(finished)
+        else:
+            finished()
+        return job
+
+    async def drain(self, send: Callable[[ReplyJob], Awaitable[bool]]) -> Dict:
+        """Send every submitted job's reply as soon as it is ready.
+
+        Args:
+            send: Sends a job's reply through the browser, returns success
+
+        Returns:
+            Dict: jobs, sent, failed, seconds and replies_per_minute
+        """
+        tasks, self._tasks = self._tasks, []
+        started, self._started = self._started, None
+        sent = failed = 0
+        try:
+            for next_ready in asyncio.as_completed(tasks):
+                job = await next_ready
+                if not job.reply:
+                    logger.error(f"No reply generated for {job.handle}")
+                    failed += 1
+                    continue
+                try:
+                    ok = await send(job)
+                except Exception as e:
+                    logger.error(f"Error sending reply to {job.handle}: {e}")
+                    ok = False
+                if ok:
+                    sent += 1
+                else:
+                    failed += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        seconds = time.perf_counter() - started if started is not None else 0.0
+        stats = {
+            'jobs': len(tasks),
+            'sent': sent,
+            'failed': failed,
+            'seconds': seconds,
+            'replies_per_minute': sent * 60 / seconds if seconds > 0 else 0.0,
+        }
+        if tasks:
+            logger.info(f"Sent {sent}/{len(tasks)} replies in {seconds:.1f}s "
+                        f"({stats['replies_per_minute']:.1f} replies/min)")
+        return stats
@@ -0,0 +1,201 @@
+import random
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Union
+try:
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.common.keys import Keys
+except ImportError:
+    ActionChains = Keys = None
+
+logger = logging.getLogger(__name__)
+
+class StreamError(Exception):
+    """A streamed reply broke off part way"""
+
+
+class StreamedReply:
+    """A reply that is typed while it is still being generated.
+
+    A background task pumps text chunks from the LLM stream into a queue so
+    the network is read at its own pace; chars() hands them to the typing
+    loop one character at a time. Leading and trailing whitespace is held
+    back, since a stray newline would submit a DM early. If the stream
+    fails, chars() raises StreamError once the queue is drained; the typist
+    erases what it typed and can ask recover() for a complete reply instead.
+    """
+
+    def __init__(self, chunks: Optional[AsyncIterator[str]] = None,
+                 fallback: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                 on_complete: Optional[Callable[[str], None]] = None):
+        """Start pumping a stream.
+
+        Args:
+            chunks: Text chunks as they arrive
+            fallback: Produces a complete reply after the stream failed
+            on_complete: Called with the full text once the stream finished cleanly
+        """
+        self.fallback = fallback
+        self.on_complete = on_complete
+        self.received = ""
+        self.error: Optional[Exception] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._started = asyncio.Event()
+        self._done_callbacks = []
+        self._task = asyncio.ensure_future(self._pump(chunks)) if chunks is not None else None
+
+    @classmethod
+    def from_text(cls, text: str) -> 'StreamedReply':
+        """Wrap an already complete reply"""
+        reply = cls()
+        reply.received = text
+        reply._queue.put_nowait(text)
+        reply._queue.put_nowait(None)
+        reply._started.set()
+        return reply
+
+    async def _pump(self, chunks: AsyncIterator[str]):
+        try:
+            async for chunk in chunks:
+                self.received += chunk
+                self._queue.put_nowait(chunk)
+                self._started.set()
+            if self.on_complete and self.received.strip():
+                self.on_complete(self.received.strip())
+        except asyncio.CancelledError:
+            self.error = StreamError("Stream cancelled")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            # Before the end is queued, so they have run by the time the typist finishes
+            for callback in self._done_callbacks:
+                callback()
+            self._queue.put_nowait(None)
+            self._started.set()
+
+    @property
+    def finished(self) -> bool:
+        """Whether the stream has ended, cleanly or not"""
+        return self._task is None or self._task.done()
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """Call callback once the stream has ended, or now if it already has"""
+        if self.finished:
+            callback()
+        else:
+            self._done_callbacks.append(callback)
+
+    async def wait_started(self) -> bool:
+        """Wait for the first text; False if the stream ended or failed without producing any"""
+        while not self.received.strip():
+            if self._started.is_set() and (self._task is None or self._task.done()):
+                return False
+            self._started.clear()
+            await self._started.wait()
+        return True
+
+    async def chars(self) -> AsyncIterator[str]:
+        """Yield the reply character by character, trimmed, as it arrives.
+
+        Raises:
+            StreamError: The stream failed; everything yielded so far is partial
+        """
+        held = ""
+        typed_any = False
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                break
+            for char in chunk:
+                if char.isspace():
+                    held += char
+                    continue
+                if typed_any:
+                    for space in held:
+                        yield space
+                held = ""
+                typed_any = True
+                yield char
+        if self.error is not None:
+            raise StreamError(str(self.error))
+
+    @property
+    def text(self) -> str:
+        """Everything received so far (or the recovered reply), trimmed"""
+        return self.received.strip()
+
+    async def recover(self) -> Optional[str]:
+        """Get a complete reply from the fallback after the stream failed.
+
+        The fallback reply replaces the partial text, so text is what was
+        finally sent.
+        """
+        if not self.fallback:
+            return None
+        try:
+            reply = await self.fallback()
+        except Exception as e:
+            logger.error(f"Fallback reply failed: {e}")
+            return None
+        if not reply or not reply.strip():
+            return None
+        self.received = reply.strip()
+        return self.received
+
+    def cancel(self):
+        """Stop reading the stream"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def __bool__(self) -> bool:
+        return self._task is not None or bool(self.received)
+
+    def __str__(self) -> str:
+        return self.text
+
+
+async def iter_chars(reply: Union[str, StreamedReply]) -> AsyncIterator[str]:
+    """Yield the characters of a plain or streamed reply"""
+    if isinstance(reply, StreamedReply):
+        async for char in reply.chars():
+            yield char
+    else:
+        for char in reply:
+            yield char
+
+async def type_stream(driver, reply: Union[str, StreamedReply]) -> Optional[str]:
+    """Type a plain or streamed reply into the focused box character by character.
+
+    A streamed reply is typed as it arrives. If the stream breaks off, the
+    partial text is erased and the stream's fallback reply typed instead.
+
+    Args:
+        driver: Selenium WebDriver with the reply box focused
+        reply: Text or stream to type
+
+    Returns:
+        str: The text typed, or None if nothing could be typed
+    """
+    typed = 0
+    try:
+        async for char in iter_chars(reply):
+            actions = ActionChains(driver)
+            actions.send_keys(char)
+            actions.perform()
+            typed += 1
+            await asyncio.sleep(random.uniform(0.03, 0.1))
+    except StreamError as e:
+        logger.error(f"Reply stream broke off after {typed} characters: {e}")
+        if typed:
+            # Roll back the partial reply
+            actions = ActionChains(driver)
+            actions.send_keys(Keys.BACKSPACE * typed)
+            actions.perform()
+            await asyncio.sleep(0.5)
+        recovered = await reply.recover()
+        if not recovered:
+            return None
+        logger.info("Typing fallback reply")
+        return await type_stream(driver, recovered)
+    return str(reply) if typed else None
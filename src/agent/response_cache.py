@@ -0,0 +1,197 @@
+import re
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r"https?://\S+")
+MENTION_RE = re.compile(r"(?<!\w)@\w+")
+NON_WORD_RE = re.compile(r"[^\w\s']+")
+GREETING_RE = re.compile(r"^(hi|hey|hello|howdy)\b[ ,]*(@\w+|there|friend)?\s*[!,.]*\s*", re.IGNORECASE)
+GREETINGS = ("Hi", "Hey", "Hello", "Howdy")
+HANDLE_SLOT = "\x00handle\x00"  # Stands in for the asker's handle in stored replies
+
+def normalize_message(text: str) -> str:
+    """Reduce a message to the form cache keys are built from.
+
+    Case, punctuation, links, @mentions and whitespace do not change the
+    key, so "Hi @bob!" and "hi bob" can share a reply.
+    """
+    text = MENTION_RE.sub(" ", URL_RE.sub(" ", text.lower()))
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+class ResponseCache:
+    """TTL + LRU cache of generated replies for repeated questions.
+
+    Keys are the normalized message and context type, plus the handle when
+    per_handle is set or the reply was stored as private (generated from
+    the asker's own history); lookups try the asker's private entry before
+    the shared one, so private replies never reach anyone else. Entries expire ttl seconds after they were stored and
+    the least recently used go first once max_entries or max_bytes is
+    exceeded. With vary on, each key keeps up to max_variants replies: a hit
+    serves one at random and, with probability explore, is reported as a
+    miss so the caller generates (and stores) a fresh variant. Mentions of
+    the asker's handle are stored as a placeholder and filled in for whoever
+    asks next, and a leading greeting is re-rolled and addressed to them.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 1_000_000, ttl: float = 3600.0,
+                 per_handle: bool = False, vary: bool = True, max_variants: int = 3,
+                 explore: float = 0.1, max_message_chars: int = 280, enabled: bool = True):
+        """Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of cached keys
+            max_bytes: Approximate cap on the size of cached replies
+            ttl: Seconds a reply may be served after it was stored
+            per_handle: Only serve replies to the handle they were generated for
+            vary: Keep several replies per key and personalize them when served
+            max_variants: Replies kept per key when vary is on
+            explore: Chance a hit is turned into a miss to collect another variant
+            max_message_chars: Longer messages are too specific to be worth caching
+            enabled: Set False to bypass the cache entirely
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.per_handle = per_handle
+        self.vary = vary
+        self.max_variants = max_variants if vary else 1
+        self.explore = explore if vary else 0.0
+        self.max_message_chars = max_message_chars
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()  # key -> [expires_at, replies], least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _key(self, message: str, context_type: str, handle: Optional[str], private: bool = False):
+        if not self.enabled or not message or len(message) > self.max_message_chars:
+            return None
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        return (context_type, handle if self.per_handle or private else None, normalized)
+
+    def _live(self, key) -> Optional[list]:
+        """Get an entry that has not expired, dropping it if it has"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self._remove(key)
+            self.expired += 1
+            entry = None
+        return entry
+
+    def get(self, message: str, context_type: str = "dm", handle: Optional[str] = None) -> Optional[str]:
+        """Get a cached reply for a message, or None on a miss"""
+        shared = self._key(message, context_type, handle)
+        if shared is None:
+            return None
+        keys = [shared]
+        if handle and shared[1] is None:
+            keys.insert(0, self._key(message, context_type, handle, private=True))
+        with self._lock:
+            for key in keys:
+                entry = self._live(key)
+                if entry is not None:
+                    break
+            if entry is None or (len(entry[1]) < self.max_variants and self._random.random() < self.explore):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            reply = self._random.choice(entry[1])
+        return self._personalize(reply, handle)
+
+    def put(self, message: str, context_type: str, reply: str, handle: Optional[str] = None,
+            private: bool = False):
+        """Store a generated reply for a message.
+
+        Args:
+            message: The message the reply answers
+            context_type: "dm", "mention" or "space"
+            reply: The generated reply
+            handle: Who asked
+            private: The reply was shaped by the asker's own history, so only serve it back to them
+        """
+        key = self._key(message, context_type, handle, private and handle is not None)
+        if key is None or not reply:
+            return
+        stored = reply if key[1] is not None else self._generalize(reply, handle)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [time.monotonic() + self.ttl, []]
+            else:
+                self._entries.move_to_end(key)
+            if stored in entry[1]:
+                return
+            entry[1].append(stored)
+            self._bytes += len(stored)
+            while len(entry[1]) > self.max_variants:
+                self._bytes -= len(entry[1].pop(0))
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, replies = self._entries.pop(key)
+        self._bytes -= sum(len(reply) for reply in replies)
+
+    def _generalize(self, reply: str, handle: Optional[str]) -> str:
+        """Replace mentions of the asker's @handle with a placeholder before storing.
+
+        Only the literal @handle is replaced, so a bare word that happens to
+        match the handle (@wood asking about "wood") is kept.
+        """
+        if not handle:
+            return reply
+        name = handle.lstrip('@')
+        return re.sub(rf"@{re.escape(name)}(?!\w)", HANDLE_SLOT, reply, flags=re.IGNORECASE) if name else reply
+
+    def _personalize(self, reply: str, handle: Optional[str]) -> str:
+        """Fill in the asker's handle and vary the greeting of a cached reply"""
+        reply = reply.replace(HANDLE_SLOT, handle or "there")
+        if not self.vary:
+            return reply
+        match = GREETING_RE.match(reply)
+        if match:
+            greeting = self._random.choice(GREETINGS)
+            rest = reply[match.end():]
+            reply = f"{greeting} {handle}! {rest}" if handle else f"{greeting}! {rest}"
+        return reply
+
+    def clear(self):
+        """Drop every cached reply"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and current size"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hit_rate': self.hit_rate,
+        }
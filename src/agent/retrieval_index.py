@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import math
+import zlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .conversation_log import write_atomic
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+")
+
+class HashedNgramVectorizer:
+    """Network-free text vectors from hashed word and character n-grams.
+
+    Word unigrams and bigrams plus character trigrams of each word are hashed
+    (CRC32, so vectors are stable across processes) into a fixed number of
+    signed buckets with sublinear term frequency, then L2 normalized.
+    """
+
+    def __init__(self, dim: int = 512):
+        """Initialize the vectorizer with the number of hash buckets"""
+        self.dim = dim
+
+    @staticmethod
+    def features(text: str) -> List[str]:
+        """Get the n-gram features of a text"""
+        words = WORD_RE.findall(text.lower())
+        features = [f"w:{word}" for word in words]
+        features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def transform(self, text: str) -> np.ndarray:
+        """Get the normalized vector of a text"""
+        counts: Dict[int, float] = {}
+        for feature in self.features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, count in counts.items():
+            if count:
+                vector[bucket] = math.copysign(1.0 + math.log(abs(count)), count)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class RetrievalIndex:
+    """Persistent, memory-mappable similarity index over conversation messages.
+
+    Vectors are appended as float16 rows to a raw file that searches map
+    with np.memmap, alongside a fixed-width row table (handle id, offset of
+    the message in messages.jsonl, timestamp). The row table is written last
+    and acts as the commit point, so a crash mid-append only leaves a tail
+    that is truncated on open. Queries are weighted by inverse document
+    frequency over the hash buckets and scored in chunks, so memory stays
+    bounded however large the index grows.
+    """
+
+    ROW_DTYPE = np.dtype([('handle', '<i4'), ('offset', '<i8'), ('timestamp', '<f8')])
+    VECTOR_DTYPE = np.dtype('<f2')
+    CHUNK_ROWS = 8192
+
+    def __init__(self, index_dir: str = "data/retrieval", dim: int = 512):
+        """Open (or create) the index.
+
+        Args:
+            index_dir: Directory holding the index files
+            dim: Number of hash buckets for a new index; an existing index
+                keeps the dimension it was built with
+        """
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.index_dir / "meta.json"
+        self.vectors_path = self.index_dir / "vectors.f16"
+        self.rows_path = self.index_dir / "rows.bin"
+        self.messages_path = self.index_dir / "messages.jsonl"
+        self.df_path = self.index_dir / "df.npy"
+        self._lock = threading.RLock()
+
+        self.meta = {'dim': dim, 'handles': {}, 'next_id': 0}
+        if self.meta_path.exists():
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+        self.vectorizer = HashedNgramVectorizer(self.meta['dim'])
+        self._mapped = None  # (count, vectors memmap, rows memmap)
+        self._count = self._recover()
+        self._df = self._load_df()
+
+    @property
+    def dim(self) -> int:
+        return self.meta['dim']
+
+    def _recover(self) -> int:
+        """Truncate a torn tail left by a crash and return the row count"""
+        rows = self.rows_path.stat().st_size // self.ROW_DTYPE.itemsize if self.rows_path.exists() else 0
+        row_bytes = self.dim * self.VECTOR_DTYPE.itemsize
+        vectors = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        count = min(rows, vectors)
+        for path, size in ((self.rows_path, count * self.ROW_DTYPE.itemsize),
+                           (self.vectors_path, count * row_bytes)):
+            if path.exists() and path.stat().st_size != size:
+                logger.warning(f"Truncating torn tail of {path}")
+                os.truncate(path, size)
+        return count
+
+    def _load_df(self) -> np.ndarray:
+        """Load bucket document frequencies, catching up on rows added since they were saved"""
+        df = np.zeros(self.dim + 1, dtype=np.int64)  # Last slot: rows counted
+        if self.df_path.exists():
+            try:
+                saved = np.load(self.df_path)
+                if saved.shape == df.shape and saved[-1] <= self._count:
+                    df = saved
+            except Exception as e:
+                logger.error(f"Error loading retrieval document frequencies: {e}")
+        counted = int(df[-1])
+        if counted < self._count:
+            vectors, _ = self._map()
+            for start in range(counted, self._count, self.CHUNK_ROWS):
+                chunk = vectors[start:min(start + self.CHUNK_ROWS, self._count)]
+                df[:-1] += np.count_nonzero(chunk, axis=0)
+            df[-1] = self._count
+        return df
+
+    def _map(self):
+        """Memory-map the committed vectors and rows"""
+        if self._mapped is None or self._mapped[0] != self._count:
+            if self._count == 0:
+                vectors = np.zeros((0, self.dim), dtype=self.VECTOR_DTYPE)
+                rows = np.zeros(0, dtype=self.ROW_DTYPE)
+            else:
+                vectors = np.memmap(self.vectors_path, dtype=self.VECTOR_DTYPE, mode='r',
+                                    shape=(self._count, self.dim))
+                rows = np.memmap(self.rows_path, dtype=self.ROW_DTYPE, mode='r', shape=(self._count,))
+            self._mapped = (self._count, vectors, rows)
+        return self._mapped[1], self._mapped[2]
+
+    def _save_meta(self):
+        write_atomic(self.meta_path, json.dumps(self.meta).encode('utf-8'), fsync=False)
+
+    def _handle_id(self, handle: str) -> int:
+        """Get (or assign) the id rows of a handle are stored under"""
+        handle_id = self.meta['handles'].get(handle)
+        if handle_id is None:
+            handle_id = self.meta['next_id']
+            self.meta['handles'][handle] = handle_id
+            self.meta['next_id'] += 1
+            self._save_meta()
+        return handle_id
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, handle: str, message: Dict, timestamp: Optional[float] = None) -> bool:
+        """Index a message.
+
+        Returns:
+            bool: Whether the message had text to index
+        """
+        text = message.get('text')
+        if not text or not isinstance(text, str):
+            return False
+        vector = self.vectorizer.transform(text)
+        with self._lock:
+            handle_id = self._handle_id(handle)
+            with open(self.messages_path, 'ab') as f:
+                offset = f.tell()
+                f.write(json.dumps({'handle': handle, 'message': dict(message)}).encode('utf-8') + b"\n")
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vector.astype(self.VECTOR_DTYPE).tobytes())
+            row = np.array([(handle_id, offset, timestamp if timestamp is not None else np.nan)],
+                           dtype=self.ROW_DTYPE)
+            with open(self.rows_path, 'ab') as f:
+                f.write(row.tobytes())
+            self._count += 1
+            self._df[:-1] += vector != 0
+            self._df[-1] = self._count
+        return True
+
+    def remove(self, handle: str):
+        """Drop a handle's messages from future results.
+
+        Rows are not rewritten; the handle's id is retired so its old rows
+        no longer match any live handle, and later messages get a new id.
+        """
+        with self._lock:
+            if self.meta['handles'].pop(handle, None) is not None:
+                self._save_meta()
+
+    def _read_message(self, offset: int) -> Optional[Dict]:
+        """Read an indexed message by its offset in messages.jsonl"""
+        with open(self.messages_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def search(self, query: str, handle: Optional[str] = None, k: int = 5,
+               min_score: float = 0.1) -> List[Tuple[float, Dict]]:
+        """Find the messages most similar to a query.
+
+        Args:
+            query: Text to match
+            handle: Only search this handle's messages, or None for all handles
+            k: Maximum number of results
+            min_score: Minimum cosine similarity of a result
+
+        Returns:
+            List of (score, {'handle', 'message'}) pairs, best first
+        """
+        with self._lock:
+            if k <= 0 or not self._count:
+                return []
+            if handle is not None and handle not in self.meta['handles']:
+                return []
+            vectors, rows = self._map()
+            count = float(self._df[-1])
+            idf = np.log((1.0 + count) / (1.0 + self._df[:-1])) + 1.0
+            live_ids = np.array(
+                [self.meta['handles'][handle]] if handle is not None else list(self.meta['handles'].values()),
+                dtype=np.int32
+            )
+
+        query_vector = self.vectorizer.transform(query) * idf.astype(np.float32)
+        norm = np.linalg.norm(query_vector)
+        if not norm:
+            return []
+        query_vector /= norm
+
+        best_scores = np.zeros(0, dtype=np.float32)
+        best_rows = np.zeros(0, dtype=np.int64)
+        for start in range(0, len(rows), self.CHUNK_ROWS):
+            stop = min(start + self.CHUNK_ROWS, len(rows))
+            candidates = start + np.flatnonzero(np.isin(rows['handle'][start:stop], live_ids))
+            if not len(candidates):
+                continue
+            scores = vectors[candidates].astype(np.float32) @ query_vector
+            best_scores = np.concatenate([best_scores, scores])
+            best_rows = np.concatenate([best_rows, candidates])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        results = []
+        for i in np.argsort(-best_scores):
+            if best_scores[i] < min_score:
+                break
+            try:
+                results.append((float(best_scores[i]), self._read_message(int(rows['offset'][best_rows[i]]))))
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading indexed message: {e}")
+        return results
+
+    def flush(self):
+        """Persist document frequencies so the next open does not recount them"""
+        with self._lock:
+            tmp_path = self.df_path.with_name(f".{self.df_path.name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, self._df)
+            os.replace(tmp_path, self.df_path)
@@ -6,6 +6,7 @@ from datetime import datetime
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from ..utils.file_lock import FileLock, locked_json_update, read_json, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
@@ -19,22 +20,31 @@ class SpaceQueueManager:
     def _initialize_queue_file(self):
         """Initialize the queue file if it doesn't exist"""
         if not os.path.exists(self.queue_file):
-            self._save_queue([])
+            # Another process may create it concurrently; never overwrite theirs
+            self._update_queue(lambda spaces: spaces)
     
     def _save_queue(self, spaces: List[Dict]):
         """Save spaces to queue file"""
-        with open(self.queue_file, 'w') as f:
-            json.dump({
+        with FileLock(self.queue_file):
+            write_json_atomic(self.queue_file, {
                 "updated_at": datetime.now().isoformat(),
                 "spaces": spaces
-            }, f, indent=2)
+            }, indent=2)
+
+    def _update_queue(self, update) -> List[Dict]:
+        """Read-modify-write the queue under an inter-process lock"""
+        def apply(data):
+            return {
+                "updated_at": datetime.now().isoformat(),
+                "spaces": update((data or {}).get("spaces", []))
+            }
+        return locked_json_update(self.queue_file, apply, indent=2)["spaces"]
     
     def _load_queue(self) -> List[Dict]:
         """Load spaces from queue file"""
         try:
-            with open(self.queue_file, 'r') as f:
-                data = json.load(f)
-                return data.get("spaces", [])
+            # Writes are atomic renames, so reads never see a partial file
+            return read_json(self.queue_file, {}).get("spaces", [])
         except Exception as e:
             logger.error(f"Error loading queue: {e}")
             return []
@@ -42,22 +52,24 @@ class SpaceQueueManager:
     def add_space(self, space_url: str, metadata: Dict = None) -> bool:
         """Add a space to the queue"""
         try:
-            spaces = self._load_queue()
-            
-            # Check if space already exists
-            if any(space["url"] == space_url for space in spaces):
-                return False
-            
-            # Add new space
-            spaces.append({
-                "url": space_url,
-                "added_at": datetime.now().isoformat(),
-                "status": "pending",
-                "metadata": metadata or {}
-            })
-            
-            self._save_queue(spaces)
-            return True
+            added = False
+
+            def update(spaces):
+                nonlocal added
+                # Check if space already exists
+                if any(space["url"] == space_url for space in spaces):
+                    return spaces
+                # Add new space
+                added = True
+                return spaces + [{
+                    "url": space_url,
+                    "added_at": datetime.now().isoformat(),
+                    "status": "pending",
+                    "metadata": metadata or {}
+                }]
+
+            self._update_queue(update)
+            return added
             
         except Exception as e:
             logger.error(f"Error adding space to queue: {e}")
@@ -71,18 +83,17 @@ class SpaceQueueManager:
     
     def mark_space_joined(self, space_url: str):
         """Mark a space as joined"""
-        spaces = self._load_queue()
-        for space in spaces:
-            if space["url"] == space_url:
-                space["status"] = "joined"
-                space["joined_at"] = datetime.now().isoformat()
-        self._save_queue(spaces)
+        def update(spaces):
+            for space in spaces:
+                if space["url"] == space_url:
+                    space["status"] = "joined"
+                    space["joined_at"] = datetime.now().isoformat()
+            return spaces
+        self._update_queue(update)
     
     def mark_space_completed(self, space_url: str):
         """Mark a space as completed"""
-        spaces = self._load_queue()
-        spaces = [s for s in spaces if s["url"] != space_url]
-        self._save_queue(spaces)
+        self._update_queue(lambda spaces: [s for s in spaces if s["url"] != space_url])
 
 class SpaceFileWatcher(FileSystemEventHandler):
     def __init__(self, queue_manager: SpaceQueueManager):
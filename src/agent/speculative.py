@@ -0,0 +1,181 @@
+import re
+import asyncio
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional
+from .model_router import complexity
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset({
+    "about", "above", "after", "again", "also", "because", "before", "being", "below", "between",
+    "could", "conversation", "response", "should", "their", "there", "these", "thing", "things",
+    "those", "through", "under", "until", "where", "which", "while", "would", "other",
+    "points", "address", "provide", "approach", "potential", "areas", "might", "maybe", "really",
+})
+REFUSAL_RE = re.compile(r"\b(as an ai|i can't help|i cannot help|i'm sorry, but|i am sorry, but)\b", re.I)
+WORD_RE = re.compile(r"[a-z']{5,}")
+
+def key_terms(text: str, limit: int = 12) -> List[str]:
+    """The most frequent content words of a text"""
+    counts = Counter(word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS)
+    return [word for word, _ in counts.most_common(limit)]
+
+def draft_is_sound(draft: Optional[str]) -> bool:
+    """Whether a draft is a usable reply on its own: not empty, a refusal or cut off mid-sentence"""
+    if not draft or len(draft.split()) < 3 or REFUSAL_RE.search(draft):
+        return False
+    return not draft.rstrip().endswith((",", ":", ";", "-"))
+
+def draft_coverage(draft: str, analysis: str) -> float:
+    """Share of the analysis's key terms the draft already mentions"""
+    terms = key_terms(analysis)
+    if not terms:
+        return 1.0
+    words = set(WORD_RE.findall(draft.lower()))
+    # Match on a shared stem so "framing" covers "frame" and "footings" covers "footing"
+    stems = {word[:5] for word in words}
+    return sum(1 for term in terms if term in words or term[:5] in stems) / len(terms)
+
+
+class SpeculativeChain:
+    """Runs an analysis -> response chain speculatively.
+
+    The sequential chain waits for a large-model analysis before the small
+    model writes the reply, so its latency is the sum of both calls. Here
+    the small model drafts a reply straight away while the analysis runs.
+    A draft for a simple request ships as soon as it is ready and the
+    analysis is dropped; otherwise the draft ships once the analysis
+    arrives if it already covers enough of the analysis's key terms. Only
+    drafts that fail those checks pay for a revision pass, which is the
+    same analysis-guided call the sequential chain would have made.
+    """
+
+    def __init__(self, enabled: bool = True, min_coverage: float = 0.3, ship_early_below: float = 0.2):
+        """Initialize the chain.
+
+        Args:
+            enabled: Speculate; when False the chain runs sequentially
+            min_coverage: Share of the analysis's key terms a draft must cover to ship
+            ship_early_below: Complexity under which a sound draft ships without waiting for the analysis
+        """
+        self.enabled = enabled
+        self.min_coverage = min_coverage
+        self.ship_early_below = ship_early_below
+        self.requests = 0
+        self.shipped_early = 0
+        self.shipped = 0
+        self.revised = 0
+        self.saved_seconds = 0.0
+        self._analysis_seconds = 0.0
+        self._analyses = 0
+        self._step_seconds = 0.0
+        self._steps = 0
+
+    def _mean_analysis(self) -> float:
+        return self._analysis_seconds / self._analyses if self._analyses else 0.0
+
+    async def run(self, draft: Callable[[], Awaitable[str]], analyze: Callable[[], Awaitable[str]],
+                  revise: Callable[[str], Awaitable[str]], text: str = "") -> str:
+        """Produce a reply.
+
+        Args:
+            draft: Writes a reply without the analysis
+            analyze: Produces the analysis
+            revise: Writes the reply from the analysis
+            text: The request, used to judge its complexity
+
+        Returns:
+            str: The reply
+
+        Raises:
+            Exception: Whatever the calls raised if no reply could be produced
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.requests += 1
+        if not self.enabled:
+            analysis = await self._timed(analyze)
+            return await revise(analysis)
+
+        draft_task = asyncio.ensure_future(self._timed(draft, step=True))
+        analysis_task = asyncio.ensure_future(self._timed(analyze))
+        try:
+            try:
+                reply = await draft_task
+            except Exception as e:
+                logger.error(f"Draft failed, waiting for the analysis: {e}")
+                reply = None
+
+            if draft_is_sound(reply) and complexity(text) < self.ship_early_below:
+                analysis_task.cancel()
+                self.shipped_early += 1
+                return self._ship(reply, start)
+
+            try:
+                analysis = await analysis_task
+            except Exception as e:
+                if draft_is_sound(reply):
+                    logger.error(f"Analysis failed, shipping the draft: {e}")
+                    return self._ship(reply, start)
+                raise
+
+            if draft_is_sound(reply) and draft_coverage(reply, analysis) >= self.min_coverage:
+                return self._ship(reply, start)
+
+            self.revised += 1
+            reply = await revise(analysis)
+            self._record_saving(start)
+            return reply
+        finally:
+            for task in (draft_task, analysis_task):
+                task.cancel()
+
+    async def _timed(self, call: Callable[[], Awaitable[str]], step: bool = False) -> str:
+        """Run a call, keeping running means of analysis and reply-step durations"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await call()
+        if step:
+            self._step_seconds += loop.time() - start
+            self._steps += 1
+        else:
+            self._analysis_seconds += loop.time() - start
+            self._analyses += 1
+        return result
+
+    def _ship(self, reply: str, start: float) -> str:
+        self.shipped += 1
+        self._record_saving(start)
+        return reply
+
+    def _record_saving(self, start: float):
+        """Credit the time saved against the sequential chain, estimated from the running means"""
+        elapsed = asyncio.get_running_loop().time() - start
+        sequential = self._mean_analysis() + (self._step_seconds / self._steps if self._steps else 0.0)
+        self.saved_seconds += sequential - elapsed
+
+    @property
+    def revision_rate(self) -> float:
+        speculated = self.shipped + self.revised
+        return self.revised / speculated if speculated else 0.0
+
+    def stats(self) -> Dict:
+        """Get request, ship and revision counts, the revision rate and the latency saved"""
+        speculated = self.shipped + self.revised
+        return {
+            'requests': self.requests,
+            'shipped': self.shipped,
+            'shipped_early': self.shipped_early,
+            'revised': self.revised,
+            'revision_rate': self.revision_rate,
+            'saved_seconds': self.saved_seconds,
+            'mean_saved': self.saved_seconds / speculated if speculated else 0.0,
+        }
+
+    def log_summary(self):
+        """Log how often drafts shipped and how much latency speculation saved"""
+        stats = self.stats()
+        logger.info(f"Speculative replies: {stats['shipped']} drafts shipped ({stats['shipped_early']} early), "
+                    f"{stats['revised']} revised ({stats['revision_rate']:.0%}), "
+                    f"saved {stats['saved_seconds']:.1f}s total, {stats['mean_saved']:.2f}s per reply")
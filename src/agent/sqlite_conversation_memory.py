@@ -0,0 +1,557 @@
+import json
+import sqlite3
+import itertools
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+from .conversation_memory import ConversationMemory, normalize_timestamp
+from .conversation_log import ConversationLog
+from .conversation_archive import ConversationArchive
+from .conversation_manifest import handle_from_name
+from .conversation_export import ExportedMessage
+from .message_records import RECORD_TYPES
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    handle TEXT PRIMARY KEY,
+    last_interaction TEXT,
+    total_interactions INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    handle TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    timestamp REAL,
+    tweet_id TEXT,
+    is_reply INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_handle_timestamp ON messages (handle, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_handle_kind ON messages (handle, kind);
+CREATE INDEX IF NOT EXISTS idx_messages_tweet_id ON messages (tweet_id);
+CREATE TABLE IF NOT EXISTS replied_tweets (
+    tweet_id TEXT PRIMARY KEY,
+    replied_at REAL NOT NULL
+);
+"""
+
+# Message kinds as stored in the messages table, by ConversationMemory list name
+KINDS = {'dms': 'dm', 'mentions': 'mention'}
+
+
+class SqliteRepliedTweets:
+    """Set-like view of the replied_tweets table, standing in for RepliedTweetStore"""
+
+    def __init__(self, memory: 'SqliteConversationMemory'):
+        self._memory = memory
+
+    def __contains__(self, tweet_id) -> bool:
+        return bool(self._memory._query("SELECT 1 FROM replied_tweets WHERE tweet_id = ?", (tweet_id,)))
+
+    def __len__(self) -> int:
+        return self._memory._query("SELECT COUNT(*) AS n FROM replied_tweets")[0]['n']
+
+    def __iter__(self):
+        return iter([row['tweet_id'] for row in self._memory._query("SELECT tweet_id FROM replied_tweets")])
+
+    def add(self, tweet_id: str):
+        """Mark a tweet as replied to"""
+        self._memory._execute(
+            "INSERT OR IGNORE INTO replied_tweets (tweet_id, replied_at) VALUES (?, ?)",
+            (tweet_id, time.time())
+        )
+
+    def prune(self, max_age_days: Optional[float] = None) -> int:
+        """Replied tweets are kept in the database indefinitely"""
+        return 0
+
+
+class SqliteConversationMemory(ConversationMemory):
+    """Drop-in ConversationMemory backed by a single SQLite database.
+
+    Messages live in one table indexed on (handle, timestamp) and tweet_id,
+    so context and reply lookups are indexed queries rather than list scans.
+    Dicts returned by get_conversation are snapshots; use the add_*/update_*
+    methods to change stored data. There is no compressed archive (every
+    message stays in the table) and no retrieval index.
+    """
+
+    def __init__(self, db_path: str = "data/conversations.db"):
+        """Open (or create) the database in WAL mode.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        # State the inherited background machinery looks at; none of it runs here
+        self.storage_mode = "sqlite"
+        self.snapshot_path = None
+        self._flusher = None
+        self._workers = []
+        self.replied_mentions = self.load_replied_mentions()
+        self.tweet_ledger = self.load_tweets()
+
+    def _execute(self, sql: str, params=()):
+        """Run a statement under the connection lock and commit"""
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+            self.conn.commit()
+            return cursor
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        """Run a read query under the connection lock"""
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _ensure_conversation(self, handle: str):
+        """Create the conversation row for a handle if it does not exist"""
+        metadata = {'first_seen': datetime.now().isoformat()}
+        self.conn.execute(
+            "INSERT OR IGNORE INTO conversations (handle, metadata) VALUES (?, ?)",
+            (handle, json.dumps(metadata))
+        )
+
+    def _messages(self, handle: str, kind: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get stored messages of one kind in insertion order"""
+        if limit:
+            rows = self._query(
+                "SELECT data FROM messages WHERE handle = ? AND kind = ? ORDER BY id DESC LIMIT ?",
+                (handle, kind, limit)
+            )[::-1]
+        else:
+            rows = self._query(
+                "SELECT data FROM messages WHERE handle = ? AND kind = ? ORDER BY id",
+                (handle, kind)
+            )
+        return [json.loads(row['data']) for row in rows]
+
+    def _has_conversation(self, handle: str) -> bool:
+        """Check whether a handle has a conversation row"""
+        return bool(self._query("SELECT 1 FROM conversations WHERE handle = ?", (handle,)))
+
+    def load_all_conversations(self):
+        """Nothing to preload; conversations are queried on demand"""
+
+    def save_conversation(self, handle: str):
+        """Writes are committed as they happen"""
+
+    def save_all_conversations(self):
+        """Checkpoint the WAL into the main database file"""
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def compact(self, threshold: Optional[int] = None):
+        """Checkpoint the WAL into the main database file"""
+        self.save_all_conversations()
+
+    def close(self):
+        """Checkpoint and close the database"""
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.conn.close()
+
+    def get_conversation(self, handle: str):
+        """Get or create conversation memory for a handle"""
+        with self._lock:
+            self._ensure_conversation(handle)
+            self.conn.commit()
+        return {
+            'dms': self._messages(handle, 'dm'),
+            'mentions': self._messages(handle, 'mention'),
+            'last_interaction': self._query(
+                "SELECT last_interaction FROM conversations WHERE handle = ?", (handle,)
+            )[0]['last_interaction'],
+            'metadata': self.get_metadata(handle)
+        }
+
+    def _add(self, handle: str, kind: str, message: Dict):
+        """Insert a message and bump the conversation's interaction counters"""
+        with self._lock:
+            self._ensure_conversation(handle)
+            self.conn.execute(
+                "INSERT INTO messages (handle, kind, timestamp, tweet_id, is_reply, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    handle, kind, normalize_timestamp(message.get('timestamp')),
+                    message.get('tweet_id'), int(bool(message.get('is_reply', False))),
+                    json.dumps(message)
+                )
+            )
+            self.conn.execute(
+                "UPDATE conversations SET last_interaction = ?, "
+                "total_interactions = total_interactions + 1 WHERE handle = ?",
+                (datetime.now().isoformat(), handle)
+            )
+            self.conn.commit()
+
+    def add_dm(self, handle: str, message: dict):
+        """Add a DM to memory"""
+        message['type'] = 'dm'
+        self._add(handle, 'dm', message)
+
+    def add_mention(self, handle: str, mention_data: dict):
+        """Add a mention to the conversation memory"""
+        try:
+            self._add(handle, 'mention', mention_data)
+            if mention_data.get('is_reply') and mention_data.get('tweet_id'):
+                self.add_tweet_reply(mention_data['tweet_id'])
+        except Exception as e:
+            logger.error(f"Error adding mention: {e}")
+
+    def get_recent_context(self, handle: str, limit: int = 5) -> List[Dict]:
+        """Get recent DMs and mentions for a handle in timestamp order."""
+        if handle == 'tweets':
+            return super().get_recent_context(handle, limit)
+        try:
+            rows = self._query(
+                "SELECT data FROM messages WHERE handle = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (handle, limit)
+            )
+            return [json.loads(row['data']) for row in reversed(rows)]
+        except Exception as e:
+            logger.error(f"Error getting context for {handle}: {e}")
+            return []
+
+    def get_dm_history(self, handle: str, limit: int = None):
+        """Get DM history for a handle"""
+        return self._messages(handle, 'dm', limit)
+
+    def get_mention_history(self, handle: str, limit: int = None):
+        """Get mention history for a handle"""
+        return self._messages(handle, 'mention', limit)
+
+    def get_all_handles(self):
+        """Get list of all handles in memory"""
+        return [row['handle'] for row in self._query("SELECT handle FROM conversations ORDER BY handle")]
+
+    def get_metadata(self, handle: str):
+        """Get metadata for a handle"""
+        with self._lock:
+            self._ensure_conversation(handle)
+            self.conn.commit()
+        row = self._query(
+            "SELECT metadata, total_interactions FROM conversations WHERE handle = ?", (handle,)
+        )[0]
+        metadata = json.loads(row['metadata'])
+        metadata['total_interactions'] = row['total_interactions']
+        return metadata
+
+    def update_metadata(self, handle: str, key: str, value):
+        """Update metadata for a handle"""
+        with self._lock:
+            if key == 'total_interactions':
+                self._ensure_conversation(handle)
+                self.conn.execute(
+                    "UPDATE conversations SET total_interactions = ? WHERE handle = ?", (value, handle)
+                )
+                self.conn.commit()
+                return
+            metadata = self.get_metadata(handle)
+            metadata.pop('total_interactions')
+            metadata[key] = value
+            self._execute(
+                "UPDATE conversations SET metadata = ? WHERE handle = ?", (json.dumps(metadata), handle)
+            )
+
+    def get_dms(self, handle: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get DMs for a handle, optionally limited to the most recent n messages"""
+        return self._messages(handle, 'dm', limit)
+
+    def get_mentions(self, handle: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get mentions for a handle, optionally limited to the most recent n messages"""
+        return self._messages(handle, 'mention', limit)
+
+    def get_all_conversations(self, handle: str) -> Dict[str, List[Dict]]:
+        """Get all conversations (DMs and mentions) for a handle"""
+        if not self._has_conversation(handle):
+            return {"dms": [], "mentions": []}
+        return self.get_conversation(handle)
+
+    def clear_memory(self, handle: str = None):
+        """Clear memory for a specific handle or all handles"""
+        with self._lock:
+            if handle:
+                if self._has_conversation(handle):
+                    self.conn.execute("DELETE FROM messages WHERE handle = ?", (handle,))
+                    self.conn.execute("DELETE FROM conversations WHERE handle = ?", (handle,))
+                    self._ensure_conversation(handle)
+            else:
+                self.conn.execute("DELETE FROM messages")
+                self.conn.execute("DELETE FROM conversations")
+            self.conn.commit()
+
+    def has_replied_to_mention(self, handle: str, tweet_id: str) -> bool:
+        """Check if we've already replied to a specific mention"""
+        return self.has_replied_to_tweet(tweet_id)
+
+    def has_replied_to_tweet(self, tweet_id):
+        """Check if we've already replied to a tweet"""
+        try:
+            return tweet_id in self.replied_mentions
+        except Exception as e:
+            logger.error(f"Error checking replied tweets: {e}")
+            return False
+
+    def add_tweet_reply(self, tweet_id):
+        """Mark a tweet as replied to"""
+        self.replied_mentions.add(tweet_id)
+
+    def load_replied_mentions(self, snapshot: Optional[Dict] = None):
+        """Get the replied tweets table as a set"""
+        return SqliteRepliedTweets(self)
+
+    def save_replied_mentions(self):
+        """Replied tweets are committed as they are added"""
+
+    def archive_conversation(self, handle: str, max_age_days: Optional[float] = None,
+                             max_messages: Optional[int] = None) -> int:
+        """Messages stay in the database; nothing is archived"""
+        return 0
+
+    def archive_old_messages(self, max_age_days: Optional[float] = None,
+                             max_messages: Optional[int] = None) -> int:
+        """Messages stay in the database; nothing is archived"""
+        return 0
+
+    def iter_archived(self, handle: str, kind: Optional[str] = None) -> Iterator[Dict]:
+        """There is no archive, so there is nothing to stream"""
+        return iter(())
+
+    def iter_messages(self, kind: Optional[str] = None, since=None, until=None,
+                      from_us: Optional[bool] = None, handles: Optional[List[str]] = None,
+                      include_archived: bool = True) -> Iterator[ExportedMessage]:
+        """Stream stored messages across handles in timestamp order.
+
+        Takes the same filters as ConversationMemory.iter_messages;
+        include_archived has no effect since nothing is archived.
+        """
+        if kind is not None and kind not in RECORD_TYPES:
+            raise ValueError(f"Unknown message kind: {kind}")
+        since = normalize_timestamp(since.timestamp() if isinstance(since, datetime) else since)
+        until = normalize_timestamp(until.timestamp() if isinstance(until, datetime) else until)
+        kinds = (kind,) if kind else tuple(RECORD_TYPES)
+
+        clauses = [f"kind IN ({', '.join('?' * len(kinds))})"]
+        params = [KINDS[name] for name in kinds]
+        if since is not None or until is not None:
+            clauses.append("timestamp IS NOT NULL")
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if handles is not None:
+            clauses.append(f"handle IN ({', '.join('?' * len(handles))})")
+            params.extend(handles)
+        # NULL timestamps sort first, like undated messages in the JSON store
+        rows = self._query(
+            f"SELECT handle, kind, data FROM messages WHERE {' AND '.join(clauses)} "
+            "ORDER BY timestamp, id", params
+        )
+        names = {stored: name for name, stored in KINDS.items()}
+        for row in rows:
+            name = names[row['kind']]
+            record = RECORD_TYPES[name](json.loads(row['data']), row['handle'])
+            if from_us is not None and bool(record.from_us) != from_us:
+                continue
+            yield ExportedMessage(record.timestamp, row['handle'], name, record)
+
+    def recent_handles(self, since=None, limit: Optional[int] = None) -> List[str]:
+        """Get stored handles by last interaction, most recent first.
+
+        Args:
+            since: Only handles active at or after this time (epoch, ISO string or datetime)
+            limit: Maximum number of handles
+        """
+        since = normalize_timestamp(since.timestamp() if isinstance(since, datetime) else since)
+        handles = []
+        for row in self._query(
+            "SELECT handle, last_interaction FROM conversations "
+            "WHERE last_interaction IS NOT NULL ORDER BY last_interaction DESC"
+        ):
+            if since is not None and (normalize_timestamp(row['last_interaction']) or 0) < since:
+                continue
+            handles.append(row['handle'])
+            if limit is not None and len(handles) >= limit:
+                break
+        return handles
+
+class _FlatArchive(ConversationArchive):
+    """Reads a pre-sharding archive, which keeps one segment directory per raw handle"""
+
+    def handle_dir(self, handle: str) -> Path:
+        return self.archive_dir / handle
+
+def _apply_record(conv: Dict, record: Dict) -> Dict:
+    """Apply a logged update to a plain conversation dict, as ConversationMemory replay does"""
+    op = record['op']
+    if op == 'clear':
+        return {'dms': [], 'mentions': [], 'last_interaction': None,
+                'metadata': {'first_seen': record.get('time'), 'total_interactions': 0}}
+    if op in ('dm', 'mention'):
+        conv[op + 's'].append(record['data'])
+        conv['last_interaction'] = record['time']
+        conv['metadata']['total_interactions'] = conv['metadata'].get('total_interactions', 0) + 1
+    elif op == 'metadata':
+        conv['metadata'][record['key']] = record['value']
+    elif op == 'archive':
+        del conv['dms'][:record['dms']]
+        del conv['mentions'][:record['mentions']]
+        conv['archive'] = record['summary']
+    return conv
+
+def read_json_conversations(json_dir: str) -> Iterator[tuple]:
+    """Read every conversation of a JSON tree without changing anything on disk.
+
+    Works on both the sharded layout and a flat pre-sharding directory.
+    Snapshots are read as they are and complete log records newer than
+    each snapshot are replayed on top; torn log tails are skipped rather
+    than truncated.
+
+    Yields:
+        (handle, conversation dict) in handle order
+    """
+    root = Path(json_dir)
+    suffixes = ('.json', ConversationLog.SUFFIX)
+    files = {}  # handle -> {suffix: path}
+    if root.exists():
+        for path in root.iterdir():
+            if path.name.startswith('.') or path.name == "archive":
+                continue
+            candidates = path.iterdir() if path.is_dir() else [path]
+            for file in candidates:
+                suffix = next((suffix for suffix in suffixes if file.name.endswith(suffix)), None)
+                if not suffix or file.name.startswith('.') or not file.is_file():
+                    continue
+                stem = file.name[:-len(suffix)]
+                # Flat files are named by the raw handle, sharded ones by shard_name
+                handle = handle_from_name(stem) if path.is_dir() else stem
+                files.setdefault(handle, {})[suffix] = file
+
+    for handle in sorted(files):
+        paths = files[handle]
+        conv = None
+        snapshot_seq = 0
+        if '.json' in paths:
+            with open(paths['.json'], 'r', encoding='utf-8') as f:
+                conv = json.load(f)
+            snapshot_seq = conv.pop('_wal_seq', 0)
+        if ConversationLog.SUFFIX in paths:
+            if conv is None:
+                conv = _apply_record({}, {'op': 'clear'})
+            with open(paths[ConversationLog.SUFFIX], 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        break
+                    if record.pop('seq', 0) > snapshot_seq:
+                        conv = _apply_record(conv, record)
+        if conv is not None:
+            yield handle, conv
+
+def read_replied_ids(replied_log: Optional[str], replied_file: Optional[str]) -> Dict[str, float]:
+    """Read replied tweet IDs from the JSONL log and the legacy JSON list without changing either.
+
+    Returns:
+        Dict mapping tweet ID to when we replied (0 if unknown)
+    """
+    replied = {}
+    if replied_log and Path(replied_log).exists():
+        with open(replied_log, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    continue
+                replied[entry['id']] = entry.get('t', 0.0)
+    if replied_file and Path(replied_file).exists():
+        try:
+            with open(replied_file, 'r') as f:
+                for tweet_id in json.load(f):
+                    replied.setdefault(tweet_id, 0.0)
+        except Exception as e:
+            logger.error(f"Error reading legacy replied mentions: {e}")
+    return replied
+
+def migrate_json_to_sqlite(json_dir: str = "data/conversations", db_path: str = "data/conversations.db",
+                           replied_file: str = "data/replied_mentions.json",
+                           replied_log: str = "data/replied_mentions.jsonl") -> Dict[str, int]:
+    """Copy an existing JSON conversation tree into a SQLite database.
+
+    Handles that already exist in the database are skipped, so running the
+    migration twice does not duplicate messages. The source is only read:
+    nothing is resharded, compacted, pruned or renamed. Archived messages
+    are copied ahead of each handle's hot DMs and mentions. Replied tweet IDs
+    come from the replied tweet log plus the legacy JSON list.
+
+    Returns:
+        Counts of migrated handles, messages and replied tweet IDs
+    """
+    target = SqliteConversationMemory(db_path)
+    archives = (ConversationArchive(Path(json_dir) / "archive"), _FlatArchive(Path(json_dir) / "archive"))
+    counts = {'handles': 0, 'messages': 0, 'replied_tweets': 0}
+    try:
+        existing = set(target.get_all_handles())
+        with target._lock:
+            for handle, conv in read_json_conversations(json_dir):
+                if handle in existing:
+                    logger.info(f"Skipping {handle}, already migrated")
+                    continue
+                metadata = dict(conv.get('metadata', {}))
+                total = metadata.pop('total_interactions', 0)
+                target.conn.execute(
+                    "INSERT INTO conversations (handle, last_interaction, total_interactions, metadata) "
+                    "VALUES (?, ?, ?, ?)",
+                    (handle, conv.get('last_interaction'), total, json.dumps(metadata))
+                )
+                # Archived history is older than the hot lists; the summary says how much is committed
+                summary = conv.get('archive') or {}
+                archive = next((archive for archive in archives if archive.handle_dir(handle).exists()), archives[0])
+                for key, kind in KINDS.items():
+                    archived = archive.iter_messages(handle, {key: summary.get(key, 0)}, key)
+                    for message in itertools.chain(archived, conv.get(key, [])):
+                        target.conn.execute(
+                            "INSERT INTO messages (handle, kind, timestamp, tweet_id, is_reply, data) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (
+                                handle, kind, normalize_timestamp(message.get('timestamp')),
+                                message.get('tweet_id'), int(bool(message.get('is_reply', False))),
+                                json.dumps(message)
+                            )
+                        )
+                        counts['messages'] += 1
+                counts['handles'] += 1
+
+            now = time.time()
+            for tweet_id, replied_at in read_replied_ids(replied_log, replied_file).items():
+                cursor = target.conn.execute(
+                    "INSERT OR IGNORE INTO replied_tweets (tweet_id, replied_at) VALUES (?, ?)",
+                    (tweet_id, replied_at or now)
+                )
+                counts['replied_tweets'] += cursor.rowcount
+            target.conn.commit()
+        logger.info(f"Migrated {counts['handles']} handles and {counts['messages']} messages to {db_path}")
+        return counts
+    finally:
+        target.close()
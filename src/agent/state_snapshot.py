@@ -0,0 +1,86 @@
+import os
+import mmap
+import pickle
+import struct
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from ..utils.file_lock import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BOBSNAP\0"
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64
+# magic, version, pickle length, buffer count
+HEADER = struct.Struct("<8sIQI")
+BUFFER_ENTRY = struct.Struct("<QQ")  # offset, length
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+def write_snapshot(path: Path, state: Dict[str, Any]):
+    """Write agent state as a versioned binary snapshot.
+
+    The state is pickled with protocol 5; large buffers such as NumPy
+    arrays go out of band and are written after the pickle, each aligned
+    to 64 bytes, so loading can hand them out as views of a memory map
+    instead of copying them. The file is replaced atomically.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buffers = []
+    body = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    position = HEADER.size + BUFFER_ENTRY.size * len(raws) + len(body)
+    entries = []
+    for raw in raws:
+        position += _padding(position)
+        entries.append((position, raw.nbytes))
+        position += raw.nbytes
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(body), len(raws)))
+        for offset, length in entries:
+            f.write(BUFFER_ENTRY.pack(offset, length))
+        f.write(body)
+        for (offset, _), raw in zip(entries, raws):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    """Memory-map and load a snapshot written by write_snapshot.
+
+    Returns:
+        The state, or None if there is no usable snapshot of this version
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size < HEADER.size:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        magic, version, body_length, count = HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            logger.warning(f"{path} is not an agent state snapshot")
+            return None
+        if version != SNAPSHOT_VERSION:
+            logger.info(f"Ignoring snapshot version {version} (expected {SNAPSHOT_VERSION})")
+            return None
+        position = HEADER.size
+        buffers = []
+        for _ in range(count):
+            offset, length = BUFFER_ENTRY.unpack_from(view, position)
+            buffers.append(view[offset:offset + length])
+            position += BUFFER_ENTRY.size
+        # Buffer views keep the mapping alive for as long as the state uses them
+        return pickle.loads(view[position:position + body_length], buffers=buffers)
+    except Exception as e:
+        logger.error(f"Error reading snapshot {path}: {e}")
+        return None
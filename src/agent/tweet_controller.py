@@ -10,11 +10,15 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from datetime import datetime
+from .tweet_ledger import TweetLedger
+from .tweet_dedup import NearDuplicateIndex
 
 logger = logging.getLogger(__name__)
 
 class TweetController:
     """Controller for managing tweet operations."""
+
+    MAX_REGENERATIONS = 2  # Extra attempts when an auto-tweet repeats an earlier one
     
     def __init__(self, action_handler, bob=None, tweet_interval_minutes=20):
         """Initialize the tweet controller.
@@ -27,49 +31,32 @@ class TweetController:
         self.handler = action_handler
         self.bob = bob
         self.tweet_queue = []
-        self.posted_tweets = set()
-        self.tweet_history = []  # To store the last 5 tweets
-        self.tweet_history_file = Path("data/tweet_history.json")
-        self.last_tweet_time = None
         self.tweet_interval_minutes = tweet_interval_minutes
-        self._load_tweet_history()
-        
-    def _load_tweet_history(self):
-        """Load tweet history from file."""
-        try:
-            if self.tweet_history_file.exists():
-                with open(self.tweet_history_file, 'r') as f:
-                    history = json.load(f)
-                    self.posted_tweets = set(history.get('posted_tweets', []))
-                    self.tweet_history = history.get('tweet_history', [])
-                    # Convert the timestamp string back to datetime object
-                    last_tweet_time = history.get('last_tweet_time')
-                    if last_tweet_time:
-                        self.last_tweet_time = datetime.fromisoformat(last_tweet_time)
-                    else:
-                        self.last_tweet_time = None
-            else:
-                self.posted_tweets = set()
-                self.tweet_history = []
-                self.last_tweet_time = None
-        except Exception as e:
-            logger.error(f"Error loading tweet history: {e}")
-            self.posted_tweets = set()
-            self.tweet_history = []
-            self.last_tweet_time = None
-            
-    def _save_tweet_history(self):
-        """Save tweet history to file."""
-        try:
-            self.tweet_history_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.tweet_history_file, 'w') as f:
-                json.dump({
-                    'posted_tweets': list(self.posted_tweets),
-                    'tweet_history': self.tweet_history,
-                    'last_tweet_time': self.last_tweet_time.isoformat() if self.last_tweet_time else None  # Save last tweet time
-                }, f)
-        except Exception as e:
-            logger.error(f"Error saving tweet history: {e}")
+        # Share Bob's ledger so both read the same in-memory index
+        memory = getattr(bob, 'memory', None)
+        self.ledger = getattr(memory, 'tweet_ledger', None)
+        if self.ledger is None:
+            self.ledger = TweetLedger()
+        # Every posted tweet, kept in sync as the ledger indexes new entries
+        self.duplicates = NearDuplicateIndex()
+        self.ledger.add_listener(lambda entry: self.duplicates.add(entry['id'], entry['text']))
+
+    @property
+    def tweet_history(self) -> List[str]:
+        """Get the text of the last 5 tweets, oldest first"""
+        return [tweet['text'] for tweet in self.ledger.last(5)]
+
+    @property
+    def last_tweet_time(self) -> Optional[datetime]:
+        """Get when the last tweet was posted"""
+        last = self.ledger.last_tweet_time()
+        return datetime.fromtimestamp(last) if last is not None else None
+
+    def find_duplicate(self, content: str) -> Optional[Dict]:
+        """Get a posted tweet that says nearly the same thing as content, if any"""
+        self.ledger.refresh()
+        match = self.duplicates.find(content)
+        return self.ledger.get(match[1]) if match else None
             
     def add_to_queue(self, content: str, metadata: Optional[Dict] = None):
         """Add a tweet to the queue.
@@ -85,19 +72,21 @@ class TweetController:
         })
         logger.info(f"Added tweet to queue: {content[:50]}...")
         
-    async def post_tweet(self, content: str) -> bool:
+    async def post_tweet(self, content: str, source: str = "manual") -> bool:
         """Post a new tweet.
         
         Args:
             content: The tweet content
+            source: What is posting it, recorded in the tweet ledger
         
         Returns:
             bool: Whether the tweet was posted successfully
         """
         try:
-            # Check if the tweet is in the last 5 tweets
-            if content in self.tweet_history:
-                logger.info("Skipping tweet as it is similar to recent tweets.")
+            # Check the tweet against everything posted before
+            duplicate = self.find_duplicate(content)
+            if duplicate:
+                logger.info(f"Skipping tweet as it is similar to an earlier tweet: {duplicate['text'][:50]}...")
                 return False
             
             # Navigate to home
@@ -204,21 +193,8 @@ class TweetController:
                 logger.error("Could not find or click the Post button")
                 return False
             
-            # Add to posted tweets
-            self.posted_tweets.add(content)
-            self.tweet_history.append(content)
-            if len(self.tweet_history) > 5:
-                self.tweet_history.pop(0)
-            self.last_tweet_time = datetime.now()
-            self._save_tweet_history()
-            
-            # Update Bob's memory with the new tweet
-            if self.bob and hasattr(self.bob, 'memory'):
-                self.bob.memory.add_message('tweets', {
-                    'text': content,
-                    'timestamp': datetime.now().isoformat(),
-                    'is_from_us': True
-                })
+            # Record it in the ledger Bob's memory reads as well
+            self.ledger.record(content, source=source)
             
             logger.info(f"Successfully posted tweet: {content[:50]}...")
             return True
@@ -238,11 +214,11 @@ class TweetController:
             tweet = self.tweet_queue.pop(0)
             
             # Check if we've already posted this
-            if tweet['content'] in self.posted_tweets:
+            if tweet['content'] in self.ledger:
                 logger.info(f"Skipping already posted tweet: {tweet['content'][:50]}...")
                 continue
                 
-            success = await self.post_tweet(tweet['content'])
+            success = await self.post_tweet(tweet['content'], source="queue")
             if success:
                 processed += 1
                 await asyncio.sleep(60)  # Rate limiting
@@ -316,15 +292,16 @@ class TweetController:
             
     def cleanup(self):
         """Clean up resources."""
-        self._save_tweet_history()
+        # Posted tweets are persisted to the ledger as they are recorded
 
     async def should_tweet(self):
         """Check if it's time to tweet based on the interval"""
-        if not self.last_tweet_time:
+        last_tweet_time = self.ledger.last_tweet_time()
+        if last_tweet_time is None:
             return True
             
         try:
-            elapsed = (datetime.now() - self.last_tweet_time).total_seconds()
+            elapsed = time.time() - last_tweet_time
             should_tweet = elapsed >= (self.tweet_interval_minutes * 60)
             if not should_tweet:
                 logger.info(f"Not time to tweet yet. {int((self.tweet_interval_minutes * 60 - elapsed) / 60)} minutes remaining.")
@@ -338,10 +315,15 @@ class TweetController:
         try:
             if await self.should_tweet():
                 tweet_content = await self.bob.generate_tweet()
+                for _ in range(self.MAX_REGENERATIONS):
+                    duplicate = tweet_content and self.find_duplicate(tweet_content)
+                    if not duplicate:
+                        break
+                    logger.info(f"Regenerating auto-tweet that repeats: {duplicate['text'][:50]}...")
+                    tweet_content = await self.bob.generate_tweet(avoid=[duplicate['text']])
                 if tweet_content:
-                    success = await self.post_tweet(tweet_content)
+                    success = await self.post_tweet(tweet_content, source="auto")
                     if success:
-                        self.last_tweet_time = datetime.now()
                         logger.info(f"Posted auto-tweet: {tweet_content[:50]}...")
                     else:
                         logger.error("Failed to post auto-tweet")
@@ -0,0 +1,123 @@
+import re
+import zlib
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r"https?://\S+")
+WORD_RE = re.compile(r"\w+")
+# Smallest prime above 2**32, so (a * x + b) with 32-bit a, b and x never overflows uint64
+MINHASH_PRIME = np.uint64(4294967311)
+
+def shingles(text: str, k: int = 5) -> Set[int]:
+    """Get the hashed character k-shingles of a tweet's normalized words.
+
+    URLs, case and punctuation are ignored, so the same tweet with a new
+    link or different emphasis produces (nearly) the same shingles.
+    """
+    normalized = " ".join(WORD_RE.findall(URL_RE.sub(" ", text.lower())))
+    if len(normalized) <= k:
+        return {zlib.crc32(normalized.encode('utf-8'))} if normalized else set()
+    return {zlib.crc32(normalized[i:i + k].encode('utf-8')) for i in range(len(normalized) - k + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index for finding tweets that say nearly the same thing.
+
+    Each text is reduced to a set of character shingles and a MinHash
+    signature. Signatures are split into bands; texts sharing any band
+    bucket become candidates, and candidates are confirmed by exact Jaccard
+    similarity of their shingle sets. With the default 16 bands of 4 rows,
+    pairs above about 0.5 similarity are almost always found, while a query
+    only looks at a handful of candidates however many texts are indexed.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        """Initialize the index.
+
+        Args:
+            threshold: Minimum Jaccard similarity to count as a near-duplicate
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands; must divide num_perm
+            seed: Seed for the permutations, fixed so signatures are reproducible
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        self._entries: Dict[str, Tuple[Set[int], List[bytes]]] = {}  # key -> (shingles, band keys)
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        """Get the MinHash signature of a shingle set"""
+        if not shingle_set:
+            return np.full(len(self._a), MINHASH_PRIME, dtype=np.uint64)
+        x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))[:, None]
+        return ((x * self._a + self._b) % MINHASH_PRIME).min(axis=0)
+
+    def _band_keys(self, shingle_set: Set[int]) -> List[bytes]:
+        signature = self.signature(shingle_set)
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: str, text: str):
+        """Index a text under a key, replacing whatever the key held before"""
+        if key in self._entries:
+            self.remove(key)
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return
+        band_keys = self._band_keys(shingle_set)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, set()).add(key)
+        self._entries[key] = (shingle_set, band_keys)
+
+    def remove(self, key: str):
+        """Drop a key from the index"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for bucket, band_key in zip(self._buckets, entry[1]):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band_key]
+
+    def query(self, text: str, threshold: Optional[float] = None) -> List[Tuple[float, str]]:
+        """Find indexed texts similar to a text.
+
+        Returns:
+            List of (Jaccard similarity, key) pairs at or above the threshold, most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return []
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(shingle_set)):
+            candidates |= bucket.get(band_key, set())
+
+        matches = []
+        for key in candidates:
+            other = self._entries[key][0]
+            score = len(shingle_set & other) / len(shingle_set | other)
+            if score >= threshold:
+                matches.append((score, key))
+        return sorted(matches, reverse=True)
+
+    def find(self, text: str, threshold: Optional[float] = None) -> Optional[Tuple[float, str]]:
+        """Get the closest near-duplicate of a text as (similarity, key), or None"""
+        matches = self.query(text, threshold)
+        return matches[0] if matches else None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
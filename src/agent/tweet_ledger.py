@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from ..utils.file_lock import FileLock, file_fingerprint
+from .message_records import normalize_timestamp
+
+logger = logging.getLogger(__name__)
+
+class TweetLedger:
+    """Append-only record of every tweet we have posted.
+
+    Each tweet is one JSONL line with its own ID, the time it was posted and
+    who posted it. The whole ledger stays in memory, ordered by time for
+    "last N" and "posted since T" queries and keyed by text for duplicate
+    checks. Several processes may share the file: appends hold an
+    inter-process lock, and queries first read only the lines other
+    processes appended since this one last looked.
+    """
+
+    def __init__(self, path: str = "data/tweet_ledger.jsonl",
+                 legacy_path: Optional[str] = "data/tweet_history.json",
+                 snapshot: Optional[Dict] = None):
+        """Load the ledger.
+
+        Args:
+            path: Append-only JSONL ledger file
+            legacy_path: Old tweet_history.json, imported once when the
+                ledger is first created
+            snapshot: State from export_state(); only lines appended after
+                it was taken are read
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._entries: List[Dict] = []  # Oldest first; undated legacy tweets sort first
+        self._times: List[float] = []  # Sort keys of _entries, for bisect
+        self._by_id: Dict[str, Dict] = {}
+        self._by_text: Dict[str, Dict] = {}  # text -> latest entry with that text
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._log_ino = None
+        self._log_offset = 0  # End of the last complete line read
+        self._load(snapshot)
+
+    @staticmethod
+    def _key(entry: Dict) -> float:
+        timestamp = entry.get('timestamp')
+        return float('-inf') if timestamp is None else timestamp
+
+    def _index(self, entry: Dict):
+        """Add an entry to the in-memory indexes"""
+        if entry['id'] in self._by_id:
+            return
+        key = self._key(entry)
+        position = bisect.bisect_right(self._times, key)
+        self._times.insert(position, key)
+        self._entries.insert(position, entry)
+        self._by_id[entry['id']] = entry
+        latest = self._by_text.get(entry['text'])
+        if latest is None or self._key(latest) <= key:
+            self._by_text[entry['text']] = entry
+        for listener in self._listeners:
+            listener(entry)
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """Call listener with every entry in the ledger now and every entry indexed later"""
+        for entry in self._entries:
+            listener(entry)
+        self._listeners.append(listener)
+
+    def _reset(self):
+        self._entries, self._times, self._by_id, self._by_text = [], [], {}, {}
+
+    def _restore(self, snapshot: Dict) -> int:
+        """Restore the ledger from a snapshot and return the file offset it covers"""
+        taken = snapshot.get('log')
+        current = file_fingerprint(self.path)
+        if not taken or not current or taken[0] != current[0] or current[1] < taken[1]:
+            logger.info("Tweet ledger snapshot is stale; reading the full ledger")
+            return 0
+        for entry in snapshot['entries']:
+            self._index(entry)
+        return taken[1]
+
+    def export_state(self) -> Dict:
+        """Get the ledger for a state snapshot"""
+        return {'log': file_fingerprint(self.path), 'entries': list(self._entries)}
+
+    def _load(self, snapshot: Optional[Dict] = None):
+        """Read the ledger, importing the legacy history the first time"""
+        offset = self._restore(snapshot) if snapshot else 0
+        if self.path.exists():
+            self._read_log(offset)
+        elif self.legacy_path and self.legacy_path.exists():
+            self._import_legacy()
+
+    def _import_legacy(self):
+        """Convert tweet_history.json into ledger entries"""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                legacy = json.load(f)
+            recent = legacy.get('tweet_history', [])
+            if recent and isinstance(recent[0], dict):
+                recent = [tweet.get('text') for tweet in recent]
+            recent = [text for text in recent if text]
+            # Order and posting times were never recorded, except for the newest tweet
+            entries = [
+                {'text': text, 'timestamp': None, 'source': 'legacy'}
+                for text in legacy.get('posted_tweets', []) if text not in recent
+            ]
+            entries.extend({'text': text, 'timestamp': None, 'source': 'legacy'} for text in recent)
+            if entries:
+                entries[-1]['timestamp'] = normalize_timestamp(legacy.get('last_tweet_time'))
+            with FileLock(self.path):
+                if self.path.exists():
+                    self._read_log(0)  # Another process imported it first
+                    return
+                logger.info(f"Importing {len(entries)} tweets from {self.legacy_path}")
+                self._write(entries)
+            self.legacy_path.rename(self.legacy_path.with_suffix('.json.migrated'))
+        except Exception as e:
+            logger.error(f"Error importing legacy tweet history: {e}")
+
+    def _read_log(self, offset: int):
+        """Read complete ledger lines from an offset and remember where they end"""
+        with open(self.path, 'rb') as f:
+            self._log_ino = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Torn by a crash; skipped by the next append
+                offset += len(raw)
+                try:
+                    self._index(json.loads(raw))
+                except (ValueError, KeyError):
+                    logger.warning("Skipping torn line in tweet ledger")
+        self._log_offset = offset
+
+    def refresh(self) -> bool:
+        """Read tweets other processes recorded since this one last looked.
+
+        Returns:
+            bool: Whether anything was read
+        """
+        current = file_fingerprint(self.path)
+        if current is None:
+            return False
+        if current[0] != self._log_ino or current[1] < self._log_offset:
+            self._reset()
+            self._read_log(0)
+            return True
+        if current[1] > self._log_offset:
+            self._read_log(self._log_offset)
+            return True
+        return False
+
+    def _write(self, entries: List[Dict]):
+        """Assign IDs, append entries to the file and index them; the caller holds the lock"""
+        lines = []
+        for entry in entries:
+            entry.setdefault('id', uuid.uuid4().hex)
+            lines.append(json.dumps(entry) + "\n")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if f.tell() > self._log_offset:
+                lines.insert(0, "\n")  # Terminate a line torn by a crash
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+            self._log_offset = f.tell()
+            self._log_ino = os.fstat(f.fileno()).st_ino
+        for entry in entries:
+            self._index(entry)
+
+    def record(self, text: str, timestamp=None, source: Optional[str] = None,
+               tweet_id: Optional[str] = None) -> Dict:
+        """Append a posted tweet to the ledger.
+
+        Args:
+            text: Tweet text
+            timestamp: When it was posted (epoch seconds, ISO string or
+                datetime); defaults to now
+            source: What posted it, e.g. "auto" or "queue"
+            tweet_id: ID to store the tweet under; a new one is generated if omitted
+
+        Returns:
+            The ledger entry
+        """
+        timestamp = normalize_timestamp(timestamp)
+        entry = {
+            'text': text,
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'source': source,
+        }
+        if tweet_id:
+            entry['id'] = str(tweet_id)
+        with FileLock(self.path):
+            self.refresh()
+            if entry.get('id') in self._by_id:
+                return self._by_id[entry['id']]
+            self._write([entry])
+        return entry
+
+    def last(self, n: int = 5) -> List[Dict]:
+        """Get the n most recent tweets, oldest first"""
+        self.refresh()
+        return self._entries[-n:] if n > 0 else []
+
+    def since(self, timestamp) -> List[Dict]:
+        """Get tweets posted at or after a time, oldest first"""
+        self.refresh()
+        return self._entries[bisect.bisect_left(self._times, normalize_timestamp(timestamp)):]
+
+    def search(self, fragment: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get tweets whose text contains a fragment (case-insensitive), newest first"""
+        self.refresh()
+        fragment = fragment.lower()
+        matches = []
+        for entry in reversed(self._entries):
+            if fragment in entry['text'].lower():
+                matches.append(entry)
+                if limit and len(matches) >= limit:
+                    break
+        return matches
+
+    def get(self, tweet_id: str) -> Optional[Dict]:
+        """Get a tweet by its ledger ID"""
+        if tweet_id not in self._by_id:
+            self.refresh()
+        return self._by_id.get(tweet_id)
+
+    def last_tweet_time(self) -> Optional[float]:
+        """Get when the most recent dated tweet was posted"""
+        self.refresh()
+        if not self._times or self._times[-1] == float('-inf'):
+            return None
+        return self._times[-1]
+
+    def __contains__(self, text) -> bool:
+        """Check whether a tweet with exactly this text was ever posted"""
+        if text in self._by_text:
+            return True
+        return self.refresh() and text in self._by_text
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
@@ -6,15 +6,27 @@ from datetime import datetime
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from .tweet_dedup import NearDuplicateIndex
+from .tweet_ledger import TweetLedger
+from ..utils.file_lock import FileLock, locked_json_update, read_json, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
 class TweetQueueManager:
-    def __init__(self, queue_file: str = "tweets_queue.json", tweets_dir: str = "pending_tweets"):
+    QUEUED_PREFIX = "queued:"  # Index keys of queued tweets; posted tweets use their ledger ID
+
+    def __init__(self, queue_file: str = "tweets_queue.json", tweets_dir: str = "pending_tweets",
+                 ledger: Optional[TweetLedger] = None, duplicate_threshold: float = 0.6):
         self.queue_file = queue_file
         self.tweets_dir = tweets_dir
         self.observer = None
+        self.ledger = ledger if ledger is not None else TweetLedger()
+        # Posted and queued tweets, so new tweets can be checked against both
+        self.duplicates = NearDuplicateIndex(threshold=duplicate_threshold)
+        self.ledger.add_listener(lambda entry: self.duplicates.add(entry['id'], entry['text']))
+        self._queued = set()
         self._initialize_directories()
+        self._sync_queued(self._load_queue())
         self._setup_file_watcher()
         
     def _initialize_directories(self):
@@ -22,7 +34,8 @@ class TweetQueueManager:
         if not os.path.exists(self.tweets_dir):
             os.makedirs(self.tweets_dir)
         if not os.path.exists(self.queue_file):
-            self._save_queue([])
+            # Another process may create it concurrently; never overwrite theirs
+            self._update_queue(lambda tweets: tweets)
     
     def _setup_file_watcher(self):
         """Setup watchdog observer for the tweets directory"""
@@ -36,22 +49,50 @@ class TweetQueueManager:
     
     def _save_queue(self, tweets: List[Dict]):
         """Save tweets to queue file"""
-        with open(self.queue_file, 'w') as f:
-            json.dump({
+        with FileLock(self.queue_file):
+            write_json_atomic(self.queue_file, {
                 "updated_at": datetime.now().isoformat(),
                 "tweets": tweets
-            }, f, indent=2)
+            }, indent=2)
+
+    def _update_queue(self, update) -> List[Dict]:
+        """Read-modify-write the queue under an inter-process lock"""
+        def apply(data):
+            return {
+                "updated_at": datetime.now().isoformat(),
+                "tweets": update((data or {}).get("tweets", []))
+            }
+        return locked_json_update(self.queue_file, apply, indent=2)["tweets"]
     
     def _load_queue(self) -> List[Dict]:
         """Load tweets from queue file"""
         try:
-            with open(self.queue_file, 'r') as f:
-                data = json.load(f)
-                return data.get("tweets", [])
+            # Writes are atomic renames, so reads never see a partial file
+            return read_json(self.queue_file, {}).get("tweets", [])
         except Exception as e:
             logger.error(f"Error loading tweet queue: {e}")
             return []
     
+    def _sync_queued(self, tweets: List[Dict]):
+        """Make the index's queued tweets match the queue file's"""
+        current = {tweet["content"] for tweet in tweets}
+        for content in self._queued - current:
+            self.duplicates.remove(self.QUEUED_PREFIX + content)
+        for content in current - self._queued:
+            self.duplicates.add(self.QUEUED_PREFIX + content, content)
+        self._queued = current
+
+    def find_duplicate(self, content: str) -> Optional[str]:
+        """Get the text of a posted or queued tweet nearly the same as content, if any"""
+        self.ledger.refresh()
+        match = self.duplicates.find(content)
+        if not match:
+            return None
+        key = match[1]
+        if key.startswith(self.QUEUED_PREFIX):
+            return key[len(self.QUEUED_PREFIX):]
+        return self.ledger.get(key)['text']
+
     def process_new_tweet_file(self, file_path: str) -> bool:
         """Process a new tweet file and add it to the queue"""
         try:
@@ -92,17 +133,25 @@ class TweetQueueManager:
     def add_tweet(self, content: str, metadata: Dict = None) -> bool:
         """Add a tweet to the queue"""
         try:
-            tweets = self._load_queue()
-            
-            # Add new tweet
-            tweets.append({
-                "content": content,
-                "added_at": datetime.now().isoformat(),
-                "status": "pending",
-                "metadata": metadata or {}
-            })
-            
-            self._save_queue(tweets)
+            duplicates = []
+
+            def update(tweets):
+                self._sync_queued(tweets)
+                duplicate = self.find_duplicate(content)
+                if duplicate:
+                    duplicates.append(duplicate)
+                    return tweets
+                return tweets + [{
+                    "content": content,
+                    "added_at": datetime.now().isoformat(),
+                    "status": "pending",
+                    "metadata": metadata or {}
+                }]
+
+            self._sync_queued(self._update_queue(update))
+            if duplicates:
+                logger.info(f"Rejected tweet similar to an earlier one: {duplicates[0][:50]}...")
+                return False
             return True
             
         except Exception as e:
@@ -117,9 +166,9 @@ class TweetQueueManager:
     
     def mark_tweet_posted(self, tweet_content: str):
         """Mark a tweet as posted and remove it from queue"""
-        tweets = self._load_queue()
-        tweets = [t for t in tweets if t["content"] != tweet_content]
-        self._save_queue(tweets)
+        self._sync_queued(self._update_queue(
+            lambda tweets: [t for t in tweets if t["content"] != tweet_content]
+        ))
     
     def cleanup(self):
         """Clean up resources"""
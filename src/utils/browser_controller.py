@@ -10,6 +10,7 @@ import json
 import pickle
 import logging
 from pathlib import Path
+from .file_lock import FileLock, write_json_atomic
 
 logger = logging.getLogger(__name__)
 
@@ -184,9 +185,9 @@ class BrowserController:
         """
         try:
             cookies = self.driver.get_cookies()
-            self.cookies_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.cookies_file, 'w') as f:
-                json.dump(cookies, f)
+            # The API server writes this file too
+            with FileLock(self.cookies_file):
+                write_json_atomic(self.cookies_file, cookies)
             logger.info("Cookies saved successfully")
             return True
         except Exception as e:
@@ -0,0 +1,209 @@
+import os
+import json
+import fcntl
+import zlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def file_fingerprint(path) -> Optional[Tuple[int, int, int]]:
+    """Get (inode, size, mtime_ns) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class FileLock:
+    """Advisory inter-process lock on a sidecar ``<path>.lock`` file.
+
+    Uses fcntl.flock, so it also excludes other threads that open their own
+    FileLock on the same path. The sidecar is never replaced, which lets the
+    protected file itself be swapped with os.replace while the lock is held.
+    """
+
+    def __init__(self, path, shared: bool = False):
+        """Initialize the lock.
+
+        Args:
+            path: File to protect
+            shared: Take a shared (reader) lock instead of an exclusive one
+        """
+        self.lock_path = Path(f"{path}.lock")
+        self.shared = shared
+        self._fd = None
+
+    def __enter__(self):
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        except BaseException:
+            os.close(self._fd)
+            self._fd = None
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class StripedFileLock:
+    """Per-key locks striped over byte ranges of one lock file.
+
+    Keys hash to one of `stripes` bytes of the lock file and are locked with
+    fcntl.lockf range locks, so processes working on different handles do
+    not block each other. POSIX range locks belong to the process and do
+    not exclude its own threads, so each stripe also has a thread lock that
+    is taken first. The holding thread may enter its stripe again; a depth
+    count keeps the inner release from dropping the outer lock.
+    """
+
+    def __init__(self, lock_path, stripes: int = 1024):
+        """Open the lock file.
+
+        Args:
+            lock_path: Lock file shared by every cooperating process
+            stripes: Number of independent byte ranges
+        """
+        self.lock_path = Path(lock_path)
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self.stripes = stripes
+        self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._depth = {}  # stripe -> nesting depth of the thread holding it
+        self._threads = {}  # stripe -> RLock excluding the other threads of this process
+        self._guard = threading.Lock()
+
+    def stripe(self, key: str) -> int:
+        """Get the stripe a key maps to"""
+        return zlib.crc32(key.encode('utf-8')) % self.stripes
+
+    def _thread_lock(self, stripe: int) -> threading.RLock:
+        with self._guard:
+            lock = self._threads.get(stripe)
+            if lock is None:
+                lock = self._threads[stripe] = threading.RLock()
+            return lock
+
+    def acquire(self, key: str):
+        """Lock the key's stripe, blocking until other threads and processes release it"""
+        stripe = self.stripe(key)
+        thread_lock = self._thread_lock(stripe)
+        thread_lock.acquire()
+        with self._guard:
+            depth = self._depth.get(stripe, 0)
+            self._depth[stripe] = depth + 1
+        if depth == 0:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            except BaseException:
+                with self._guard:
+                    self._depth.pop(stripe, None)
+                thread_lock.release()
+                raise
+
+    def release(self, key: str):
+        """Release one level of the key's stripe lock"""
+        stripe = self.stripe(key)
+        try:
+            with self._guard:
+                depth = self._depth.get(stripe, 0) - 1
+                if depth > 0:
+                    self._depth[stripe] = depth
+                    return
+                self._depth.pop(stripe, None)
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+        finally:
+            self._thread_lock(stripe).release()
+
+    def hold(self, key: str) -> 'StripeGuard':
+        """Get a context manager holding the key's stripe"""
+        return StripeGuard(self, key)
+
+    def close(self):
+        """Close the lock file, releasing every stripe"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class StripeGuard:
+    """Context manager for one key of a StripedFileLock"""
+
+    def __init__(self, lock: StripedFileLock, key: str):
+        self.lock = lock
+        self.key = key
+
+    def __enter__(self):
+        self.lock.acquire(self.key)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.lock.release(self.key)
+
+
+class FileWatch:
+    """Cheap change detection for a file another process may rewrite.
+
+    Compares the file's inode, size and mtime against the last time this
+    process read or wrote it, so callers only re-read when something
+    actually changed.
+    """
+
+    def __init__(self, path):
+        """Initialize the watch; the file counts as changed until marked seen"""
+        self.path = Path(path)
+        self._seen = ()
+
+    def changed(self) -> bool:
+        """Check whether the file changed since it was last marked seen"""
+        return file_fingerprint(self.path) != self._seen
+
+    def mark_seen(self):
+        """Record the file's current state as known to this process"""
+        self._seen = file_fingerprint(self.path)
+
+
+def write_json_atomic(path, data: Any, **dump_kwargs):
+    """Write JSON to a temp file and rename it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_json(path, default: Any = None) -> Any:
+    """Read a JSON file written by write_json_atomic, or the default if it is missing"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def locked_json_update(path, update: Callable[[Any], Any], default: Any = None, **dump_kwargs) -> Any:
+    """Read-modify-write a JSON file under an exclusive inter-process lock.
+
+    Args:
+        path: JSON file to update
+        update: Receives the current contents (or default) and returns the new contents
+        default: Contents to start from when the file does not exist
+        dump_kwargs: Passed through to json.dump
+
+    Returns:
+        The new contents
+    """
+    with FileLock(path):
+        data = update(read_json(path, default))
+        write_json_atomic(path, data, **dump_kwargs)
+        return data
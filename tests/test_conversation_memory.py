@@ -0,0 +1,605 @@
+import pytest
+import os
+import json
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+from src.agent.conversation_manifest import shard_path
+from src.agent.sqlite_conversation_memory import SqliteConversationMemory, migrate_json_to_sqlite
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run each test in an empty working directory"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    return tmp_path / "data" / "conversations"
+
+class TestWriteAheadLog:
+    def test_updates_survive_restart_without_compaction(self, data_dir):
+        """Test that logged updates are replayed on startup"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        memory.add_dm("@alice", {'text': 'hi bob', 'is_from_us': False})
+        memory.add_mention("@alice", {'tweet_id': '1', 'text': '@bob help'})
+        memory.update_metadata("@alice", "topic", "decking")
+
+        assert (shard_path(data_dir, "@alice", ".jsonl")).exists()
+        assert not (shard_path(data_dir, "@alice", ".json")).exists()
+
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        assert [m['text'] for m in reloaded.get_dms("@alice")] == ['hi bob']
+        assert [m['tweet_id'] for m in reloaded.get_mentions("@alice")] == ['1']
+        assert reloaded.get_metadata("@alice")['topic'] == "decking"
+        assert reloaded.get_metadata("@alice")['total_interactions'] == 2
+
+    def test_compaction_folds_log_into_snapshot(self, data_dir):
+        """Test that compaction writes a JSON snapshot and drops the log"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        for i in range(3):
+            memory.add_dm("@bob", {'text': f'msg {i}'})
+        memory.compact(threshold=1)
+
+        assert not (shard_path(data_dir, "@bob", ".jsonl")).exists()
+        with open(shard_path(data_dir, "@bob", ".json")) as f:
+            assert len(json.load(f)['dms']) == 3
+
+        memory.add_dm("@bob", {'text': 'msg 3'})
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        assert [m['text'] for m in reloaded.get_dms("@bob")] == ['msg 0', 'msg 1', 'msg 2', 'msg 3']
+        assert '_wal_seq' not in reloaded.get_all_conversations("@bob")
+
+    def test_replay_skips_records_already_in_snapshot(self, data_dir):
+        """Test a crash between snapshot rename and log truncation"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        memory.add_dm("@carol", {'text': 'one'})
+        memory.add_dm("@carol", {'text': 'two'})
+        log_bytes = (shard_path(data_dir, "@carol", ".jsonl")).read_bytes()
+        memory.compact(threshold=1)
+        (shard_path(data_dir, "@carol", ".jsonl")).write_bytes(log_bytes)  # Truncation never happened
+
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        assert [m['text'] for m in reloaded.get_dms("@carol")] == ['one', 'two']
+
+    def test_recovers_from_torn_append(self, data_dir):
+        """Test recovery after a crash mid-append"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        memory.add_dm("@dave", {'text': 'complete'})
+        with open(shard_path(data_dir, "@dave", ".jsonl"), 'a') as f:
+            f.write('{"op": "dm", "data": {"text": "half wri')
+
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        assert [m['text'] for m in reloaded.get_dms("@dave")] == ['complete']
+
+        # New appends must not be glued onto the torn line
+        reloaded.add_dm("@dave", {'text': 'after crash'})
+        again = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=3600)
+        assert [m['text'] for m in again.get_dms("@dave")] == ['complete', 'after crash']
+
+    def test_concurrent_compactions_lose_nothing(self, data_dir):
+        """Test that racing compactions of one handle never leave a stale snapshot"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+
+        def compact_repeatedly():
+            for _ in range(20):
+                memory.compact(threshold=1)
+
+        threads = [threading.Thread(target=compact_repeatedly) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for i in range(60):
+            memory.add_dm("@gina", {'text': f'msg {i}'})
+        for thread in threads:
+            thread.join()
+
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+        assert [m['text'] for m in reloaded.get_dms("@gina")] == [f'msg {i}' for i in range(60)]
+        assert not list(data_dir.glob("*/.*.tmp"))
+
+    def test_close_compacts_everything(self, data_dir):
+        """Test that close leaves only snapshots behind"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=0.01)
+        memory.add_dm("@erin", {'text': 'bye'})
+        memory.close()
+
+        assert not list(data_dir.glob("*/*.jsonl"))
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert [m['text'] for m in reloaded.get_dms("@erin")] == ['bye']
+
+class TestSqliteConversationMemory:
+    def test_matches_json_memory_api(self, data_dir):
+        """Test the SQLite store through the ConversationMemory API"""
+        memory = SqliteConversationMemory(db_path="data/conversations.db")
+        memory.add_dm("@alice", {'text': 'first', 'timestamp': 100.0})
+        memory.add_mention("@alice", {'tweet_id': '42', 'text': 'second', 'is_reply': True,
+                                      'timestamp': '1970-01-01T00:03:20+00:00'})
+        memory.add_dm("@alice", {'text': 'third', 'timestamp': 300.0})
+        memory.update_metadata("@alice", "topic", "sheds")
+        memory.add_tweet_reply('42')
+
+        assert memory.get_all_handles() == ["@alice"]
+        assert [m['text'] for m in memory.get_dms("@alice")] == ['first', 'third']
+        assert [m['text'] for m in memory.get_dms("@alice", limit=1)] == ['third']
+        assert [m['text'] for m in memory.get_recent_context("@alice", limit=2)] == ['second', 'third']
+        # Replies are tracked by tweet, as in the JSON store
+        assert memory.has_replied_to_mention("@alice", '42')
+        assert memory.has_replied_to_mention("@bob", '42')
+        assert memory.has_replied_to_tweet('42')
+        memory.add_mention("@bob", {'tweet_id': '43', 'text': 'reply', 'is_reply': True})
+        assert '43' in memory.replied_mentions and len(memory.replied_mentions) == 2
+        metadata = memory.get_metadata("@alice")
+        assert metadata['topic'] == "sheds"
+        assert metadata['total_interactions'] == 3
+
+        memory.clear_memory("@alice")
+        assert memory.get_dms("@alice") == []
+        memory.close()
+
+    def test_export_and_archive_api(self, data_dir):
+        """Test the inherited export, recency and archive methods against the database"""
+        memory = SqliteConversationMemory(db_path="data/conversations.db")
+        memory.add_dm("@alice", {'text': 'late', 'timestamp': 300.0, 'is_from_us': True})
+        memory.add_mention("@bob", {'tweet_id': '1', 'text': 'early', 'timestamp': 100.0})
+        memory.add_dm("@bob", {'text': 'undated'})
+
+        assert [m.message['text'] for m in memory.iter_messages()] == ['undated', 'early', 'late']
+        assert [m.kind for m in memory.iter_messages(since=200)] == ['dms']
+        assert [m.handle for m in memory.iter_messages(from_us=False, kind="mentions")] == ["@bob"]
+        assert memory.export_columns("data/export") == 3
+        assert memory.recent_handles(limit=1) == ["@bob"]
+        assert memory.archive_old_messages(max_messages=0) == 0
+        assert list(memory.iter_archived("@alice")) == []
+        memory.write_snapshot()
+        memory.flush()
+        memory.close()
+
+    def test_migrates_json_tree(self, data_dir):
+        """Test the one-shot migration from JSON files"""
+        source = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+        source.add_dm("@carol", {'text': 'snapshotted', 'timestamp': 1.0})
+        source.compact(threshold=1)
+        source.add_dm("@carol", {'text': 'still in log', 'timestamp': 2.0})
+        with open("data/replied_mentions.json", 'w') as f:
+            json.dump(['7', '8'], f)
+
+        counts = migrate_json_to_sqlite(str(data_dir), "data/conversations.db")
+        assert counts == {'handles': 1, 'messages': 2, 'replied_tweets': 2}
+        # Running again must not duplicate anything
+        assert migrate_json_to_sqlite(str(data_dir), "data/conversations.db")['messages'] == 0
+
+        memory = SqliteConversationMemory(db_path="data/conversations.db")
+        assert [m['text'] for m in memory.get_dms("@carol")] == ['snapshotted', 'still in log']
+        assert memory.get_metadata("@carol")['total_interactions'] == 2
+        assert memory.has_replied_to_tweet('8')
+        memory.close()
+
+    def test_migrates_archived_history(self, data_dir):
+        """Test that archived messages are migrated ahead of the hot ones"""
+        source = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None,
+                                    archive_keep_messages=2)
+        for i in range(60):
+            source.add_dm("@erin", {'text': f'dm {i}', 'timestamp': 1000.0 + i})
+        source.archive_conversation("@erin")
+        source.add_mention("@erin", {'tweet_id': '9', 'text': 'mention', 'timestamp': 2000.0})
+        assert len(source.get_dms("@erin")) == 2
+        source.close()
+
+        counts = migrate_json_to_sqlite(str(data_dir), "data/conversations.db")
+        assert counts['messages'] == 61
+
+        memory = SqliteConversationMemory(db_path="data/conversations.db")
+        assert [m['text'] for m in memory.get_dms("@erin")] == [f'dm {i}' for i in range(60)]
+        assert [m['text'] for m in memory.get_mentions("@erin")] == ['mention']
+        assert memory.get_metadata("@erin")['total_interactions'] == 61
+        memory.close()
+
+    def test_migration_leaves_source_untouched(self, data_dir, tmp_path):
+        """Test that a flat directory, its logs and the replied files are only read"""
+        data_dir.mkdir()
+        (data_dir / "@dave.json").write_text(json.dumps({
+            'dms': [{'text': 'flat', 'timestamp': 1.0}], 'mentions': [], 'last_interaction': None,
+            'metadata': {'total_interactions': 1}, '_wal_seq': 1}))
+        (data_dir / "@dave.jsonl").write_text(
+            json.dumps({'op': 'dm', 'data': {'text': 'old'}, 'time': 'x', 'seq': 1}) + "\n" +
+            json.dumps({'op': 'dm', 'data': {'text': 'new'}, 'time': 'y', 'seq': 2}) + "\n" +
+            '{"op": "dm", "da')
+        replied_log = tmp_path / "elsewhere" / "replied.jsonl"
+        replied_log.parent.mkdir()
+        replied_log.write_text(json.dumps({'id': '1', 't': 5.0}) + "\n")  # Old enough to be pruned
+        legacy = tmp_path / "elsewhere" / "replied.json"
+        legacy.write_text(json.dumps(['2']))
+        before = {path: path.read_bytes() for path in (data_dir / "@dave.json", data_dir / "@dave.jsonl",
+                                                        replied_log, legacy)}
+
+        counts = migrate_json_to_sqlite(str(data_dir), "data/conversations.db",
+                                        replied_file=str(legacy), replied_log=str(replied_log))
+        assert counts == {'handles': 1, 'messages': 2, 'replied_tweets': 2}
+        assert sorted(path.name for path in data_dir.iterdir()) == ["@dave.json", "@dave.jsonl"]
+        assert all(path.read_bytes() == data for path, data in before.items())
+
+        memory = SqliteConversationMemory(db_path="data/conversations.db")
+        assert [m['text'] for m in memory.get_dms("@dave")] == ['flat', 'new']
+        assert memory.has_replied_to_tweet('1') and memory.has_replied_to_tweet('2')
+        memory.close()
+
+class TestLazyLoading:
+    def test_nothing_is_loaded_at_startup(self, data_dir):
+        """Test that conversations are parsed on first access"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@alice", {'text': 'hello'})
+        memory.add_dm("@bob", {'text': 'hey'})
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert len(reloaded.memory) == 0
+        assert reloaded.get_all_handles() == ["@alice", "@bob"]
+        assert reloaded.get_dms("@nobody") == []
+        assert len(reloaded.memory) == 0
+        assert [m['text'] for m in reloaded.get_dms("@bob")] == ['hey']
+        assert list(reloaded.memory) == ["@bob"]
+
+    def test_lru_eviction_flushes_dirty_conversations(self, data_dir):
+        """Test that evicted handles are compacted before being dropped"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal",
+                                    compact_interval=None, max_resident=2)
+        memory.add_dm("@a", {'text': 'a1'})
+        memory.add_dm("@b", {'text': 'b1'})
+        memory.get_conversation("@a")  # @b is now least recently used
+        memory.add_dm("@c", {'text': 'c1'})
+
+        assert list(memory.memory) == ["@a", "@c"]
+        assert (shard_path(data_dir, "@b", ".json")).exists()
+        assert not (shard_path(data_dir, "@b", ".jsonl")).exists()
+        assert [m['text'] for m in memory.get_dms("@b")] == ['b1']
+        assert "@b" in memory.memory and len(memory.memory) == 2
+
+    def test_byte_cap_bounds_resident_set(self, data_dir):
+        """Test eviction by approximate serialized size"""
+        memory = ConversationMemory(data_dir=data_dir, max_resident=None, max_resident_bytes=2000)
+        for i in range(20):
+            memory.add_dm(f"@user{i}", {'text': 'x' * 200})
+
+        assert memory._resident_bytes <= 2000
+        assert len(memory.memory) < 20
+        assert [m['text'] for m in memory.get_dms("@user0")] == ['x' * 200]
+
+class TestRepliedMentions:
+    def test_reply_flags_share_one_store(self, data_dir):
+        """Test that mention replies and tweet replies use the same set"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_mention("@alice", {'tweet_id': '11', 'text': 'hey', 'is_reply': True})
+        memory.add_tweet_reply('12')
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert reloaded.has_replied_to_mention("@alice", '11')
+        assert reloaded.has_replied_to_tweet('11')
+        assert reloaded.has_replied_to_tweet('12')
+        assert not reloaded.has_replied_to_tweet('13')
+        assert len(reloaded.memory) == 0
+
+class TestRecentContext:
+    def test_merges_dms_and_mentions_by_normalized_time(self, data_dir):
+        """Test ordering across epoch floats and ISO strings"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@alice", {'text': 'second', 'timestamp': 200.0})
+        memory.add_mention("@alice", {'tweet_id': '1', 'text': 'first',
+                                      'timestamp': '1970-01-01T00:01:40+00:00'})
+        memory.add_dm("@alice", {'text': 'third', 'timestamp': '300'})
+        memory.add_dm("@alice", {'text': 'undated'})
+
+        assert [m['text'] for m in memory.get_recent_context("@alice", limit=10)] == \
+            ['undated', 'first', 'second', 'third']
+        assert [m['text'] for m in memory.get_recent_context("@alice", limit=2)] == ['second', 'third']
+        # The stored lists keep their insertion order
+        assert [m['text'] for m in memory.get_dms("@alice")] == ['second', 'third', 'undated']
+
+    def test_index_is_maintained_on_insert(self, data_dir):
+        """Test that later messages land in the right place without a rebuild"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@bob", {'text': 'b', 'timestamp': 20.0})
+        assert [m['text'] for m in memory.get_recent_context("@bob")] == ['b']
+
+        memory.add_dm("@bob", {'text': 'c', 'timestamp': 30.0})
+        memory.add_mention("@bob", {'tweet_id': '2', 'text': 'a', 'timestamp': 10.0})
+        assert [m['text'] for m in memory.get_recent_context("@bob")] == ['a', 'b', 'c']
+
+        memory.clear_memory("@bob")
+        assert memory.get_recent_context("@bob") == []
+
+    def test_loads_handle_from_disk(self, data_dir):
+        """Test context lookups for handles that are not resident yet"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@carol", {'text': 'hello', 'timestamp': 1.0})
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert [m['text'] for m in reloaded.get_recent_context("@carol")] == ['hello']
+        assert reloaded.get_recent_context("@nobody") == []
+
+class TestBackgroundFlush:
+    def test_updates_are_coalesced_into_one_write(self, data_dir):
+        """Test that a burst of updates to one handle costs one file write"""
+        memory = ConversationMemory(data_dir=data_dir, flush_interval=0.2)
+        for i in range(20):
+            memory.add_dm("@alice", {'text': f'message {i}'})
+        assert not (shard_path(data_dir, "@alice", ".json")).exists()
+
+        memory.flush()
+        assert memory._flusher.files_written == 1
+        with open(shard_path(data_dir, "@alice", ".json")) as f:
+            assert len(json.load(f)['dms']) == 20
+        memory.close()
+
+    def test_close_drains_pending_writes(self, data_dir):
+        """Test that close persists updates still waiting in the window"""
+        memory = ConversationMemory(data_dir=data_dir, flush_interval=60)
+        memory.add_dm("@alice", {'text': 'hi'})
+        memory.add_dm("@bob", {'text': 'hey'})
+        memory.close()
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert [m['text'] for m in reloaded.get_dms("@alice")] == ['hi']
+        assert [m['text'] for m in reloaded.get_dms("@bob")] == ['hey']
+
+    def test_evicted_handle_reloads_from_queued_payload(self, data_dir):
+        """Test that evicting before the write lands does not lose updates"""
+        memory = ConversationMemory(data_dir=data_dir, max_resident=1, flush_interval=60)
+        memory.add_dm("@alice", {'text': 'first'})
+        memory.add_dm("@bob", {'text': 'evicts alice'})
+        assert "@alice" not in memory.memory
+        assert not (shard_path(data_dir, "@alice", ".json")).exists()
+
+        assert "@alice" in memory.get_all_handles()
+        memory.add_dm("@alice", {'text': 'second'})
+        assert [m['text'] for m in memory.get_dms("@alice")] == ['first', 'second']
+        memory.close()
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert [m['text'] for m in reloaded.get_dms("@alice")] == ['first', 'second']
+        assert [m['text'] for m in reloaded.get_dms("@bob")] == ['evicts alice']
+
+    def test_failed_write_is_retried(self, data_dir, monkeypatch):
+        """Test that a failed batch leaves no temp files and its payloads reach the disk later"""
+        memory = ConversationMemory(data_dir=data_dir, max_resident=1, flush_interval=60)
+        real_fsync = os.fsync
+        failures = []
+
+        def failing_fsync(fd):
+            if not failures:
+                failures.append(fd)
+                raise OSError("No space left on device")
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, "fsync", failing_fsync)
+        memory.add_dm("@alice", {'text': 'only in the queued payload'})
+        memory.add_dm("@bob", {'text': 'evicts alice'})
+        memory.flush()
+        assert memory._flusher.write_errors == 1
+        assert list(data_dir.rglob("*.tmp")) == []
+
+        memory.flush()
+        assert list(data_dir.rglob("*.tmp")) == []
+        memory.close()
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert [m['text'] for m in reloaded.get_dms("@alice")] == ['only in the queued payload']
+        assert [m['text'] for m in reloaded.get_dms("@bob")] == ['evicts alice']
+
+class TestArchive:
+    def test_count_limit_bounds_resident_history(self, data_dir):
+        """Test that messages beyond the keep limit move to the archive"""
+        memory = ConversationMemory(data_dir=data_dir, archive_keep_messages=10)
+        for i in range(10 + ConversationMemory.ARCHIVE_SLACK_MESSAGES + 1):
+            memory.add_dm("@alice", {'text': f'dm {i}', 'timestamp': 1700000000 + i})
+
+        dms = memory.get_dms("@alice")
+        assert len(dms) == 10
+        assert dms[-1]['text'] == 'dm 60'
+        summary = memory.get_conversation("@alice")['archive']
+        assert summary['dms'] == 51
+        assert summary['months'] == {'2023-11': 51}
+        assert list(shard_path(data_dir / "archive", "@alice").glob("*.jsonl.gz"))
+
+        archived = [m['text'] for m in memory.iter_archived("@alice")]
+        assert archived == [f'dm {i}' for i in range(51)]
+        assert memory.get_metadata("@alice")['total_interactions'] == 61
+
+    def test_age_limit_splits_months_and_survives_restart(self, data_dir):
+        """Test age-based archival across segments and through a WAL replay"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+        memory.add_dm("@bob", {'text': 'january', 'timestamp': '2024-01-15T00:00:00+00:00'})
+        memory.add_mention("@bob", {'tweet_id': '1', 'text': 'february', 'timestamp': '2024-02-15T00:00:00+00:00'})
+        memory.add_dm("@bob", {'text': 'undated'})
+        memory.add_dm("@bob", {'text': 'today', 'timestamp': time.time()})
+
+        assert memory.archive_old_messages(max_age_days=30) == 2
+        assert [m['text'] for m in memory.get_dms("@bob")] == ['undated', 'today']
+        assert sorted(p.name for p in shard_path(data_dir / "archive", "@bob").iterdir()) == \
+            ['2024-01.jsonl.gz', '2024-02.jsonl.gz']
+
+        reloaded = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+        assert [m['text'] for m in reloaded.get_mentions("@bob")] == []
+        assert [m['text'] for m in reloaded.iter_archived("@bob")] == ['january', 'february']
+        assert [m['text'] for m in reloaded.iter_archived("@bob", kind="mentions")] == ['february']
+
+    def test_uncommitted_archive_lines_are_ignored(self, data_dir):
+        """Test that segments written before a crash do not duplicate history"""
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@carol", {'text': 'old', 'timestamp': 1.0})
+        memory.add_dm("@carol", {'text': 'new', 'timestamp': time.time()})
+        # Simulate a crash after the segment append but before the conversation changed
+        memory._archive.append("@carol", [('dms', 0, 1.0, {'text': 'old'})])
+        assert list(memory.iter_archived("@carol")) == []
+
+        assert memory.archive_conversation("@carol", max_age_days=1) == 1
+        assert [m['text'] for m in memory.iter_archived("@carol")] == ['old']
+
+        memory.clear_memory("@carol")
+        assert not shard_path(data_dir / "archive", "@carol").exists()
+
+class TestStateSnapshot:
+    def test_warm_start_restores_state_and_replays_deltas(self, data_dir):
+        """Test that a restart uses the snapshot plus anything logged after it"""
+        memory = ConversationMemory(data_dir=data_dir, snapshot_path="data/state.snapshot")
+        memory.add_dm("@alice", {'text': 'hi'})
+        memory.add_mention("@bob", {'tweet_id': '1', 'text': 'hey', 'is_reply': True})
+        memory.close()
+        assert Path("data/state.snapshot").exists()
+
+        # Changes made after the snapshot was written
+        with open("data/replied_mentions.jsonl", 'a') as f:
+            f.write(json.dumps({'id': '2', 't': time.time()}) + "\n")
+        with open(shard_path(data_dir, "@bob", ".json")) as f:
+            bob = json.load(f)
+        bob['metadata']['topic'] = 'sheds'
+        with open(shard_path(data_dir, "@bob", ".json"), 'w') as f:
+            json.dump(bob, f)
+
+        restarted = ConversationMemory(data_dir=data_dir, snapshot_path="data/state.snapshot")
+        assert set(restarted._warm) == {"@alice", "@bob"}
+        assert restarted.has_replied_to_tweet('1') and restarted.has_replied_to_tweet('2')
+        assert [m['text'] for m in restarted.get_dms("@alice")] == ['hi']
+        # Handles whose files changed since the snapshot are read from disk
+        assert restarted.get_metadata("@bob")['topic'] == 'sheds'
+        assert restarted._warm == {}
+
+    def test_wal_sequence_survives_warm_start(self, data_dir):
+        """Test that warm-started WAL handles keep appending after their logged records"""
+        memory = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None,
+                                    snapshot_path="data/state.snapshot")
+        memory.add_dm("@alice", {'text': 'one'})
+        memory.write_snapshot()
+
+        restarted = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None,
+                                       snapshot_path="data/state.snapshot")
+        restarted.add_dm("@alice", {'text': 'two'})
+        assert restarted._log.last_seq("@alice") == 2
+
+        replayed = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None)
+        assert [m['text'] for m in replayed.get_dms("@alice")] == ['one', 'two']
+
+    def test_ignores_snapshot_of_another_version(self, data_dir):
+        """Test that an incompatible snapshot falls back to the regular load path"""
+        memory = ConversationMemory(data_dir=data_dir, snapshot_path="data/state.snapshot")
+        memory.add_dm("@alice", {'text': 'hi'})
+        memory.close()
+        with open("data/state.snapshot", 'r+b') as f:
+            f.seek(8)
+            f.write((99).to_bytes(4, 'little'))
+
+        restarted = ConversationMemory(data_dir=data_dir, snapshot_path="data/state.snapshot")
+        assert restarted._warm == {}
+        assert [m['text'] for m in restarted.get_dms("@alice")] == ['hi']
+
+class TestMessageRecords:
+    def test_stored_messages_round_trip_unchanged(self, data_dir):
+        """Test that records are used in memory while files keep their original shape"""
+        dm = {'text': 'hi', 'timestamp': '2024-03-01T10:00:00', 'from_us': True, 'extra': {'a': 1}}
+        mention = {'tweet_id': '7', 'text': '@bob', 'timestamp': 1700000000.5, 'is_from_us': False}
+        memory = ConversationMemory(data_dir=data_dir)
+        memory.add_dm("@alice", dict(dm))
+        memory.add_mention("@alice", dict(mention))
+
+        stored = memory.get_dms("@alice")[0]
+        assert stored.from_us is True and stored['is_from_us'] is True
+        assert [m['text'] for m in memory.get_recent_context("@alice")] == ['@bob', 'hi']
+        with open(shard_path(data_dir, "@alice", ".json")) as f:
+            on_disk = json.load(f)
+        assert on_disk['dms'] == [{**dm, 'type': 'dm'}]
+        assert on_disk['mentions'] == [mention]
+        assert ConversationMemory(data_dir=data_dir).get_mentions("@alice") == [mention]
+
+class TestExport:
+    def _populate(self, data_dir):
+        memory = ConversationMemory(data_dir=data_dir, max_resident=1, archive_keep_messages=1)
+        memory.add_dm("@alice", {'text': 'a1', 'timestamp': 100.0, 'is_from_us': False})
+        memory.add_dm("@bob", {'text': 'b1', 'timestamp': 150.0, 'from_us': True})
+        memory.add_mention("@alice", {'tweet_id': '1', 'text': 'a2', 'timestamp': 200.0, 'is_from_us': False})
+        memory.add_dm("@alice", {'text': 'a3', 'timestamp': 300.0, 'is_from_us': True})
+        memory.add_dm("@alice", {'text': 'a4', 'timestamp': 400.0, 'is_from_us': False})
+        memory.add_dm("@bob", {'text': 'undated'})
+        memory.archive_conversation("@alice")
+        return memory
+
+    def test_streams_in_timestamp_order_across_handles(self, data_dir):
+        """Test that archived and hot messages of every handle are merged by time"""
+        memory = self._populate(data_dir)
+        assert [m['text'] for m in memory.iter_archived("@alice")] == ['a1', 'a3']
+        exported = list(memory.iter_messages())
+
+        assert [m.message['text'] for m in exported] == ['undated', 'a1', 'b1', 'a2', 'a3', 'a4']
+        assert [m.handle for m in exported[1:3]] == ['@alice', '@bob']
+        assert len(memory.memory) == 1  # Scanning did not grow the resident set
+
+    def test_filters(self, data_dir):
+        """Test kind, date range and direction filters"""
+        memory = self._populate(data_dir)
+
+        assert [m.message['text'] for m in memory.iter_messages(kind="mentions")] == ['a2']
+        assert [m.message['text'] for m in memory.iter_messages(since=150, until=400)] == ['b1', 'a2', 'a3']
+        assert [m.message['text'] for m in memory.iter_messages(from_us=True)] == ['b1', 'a3']
+        assert [m.message['text'] for m in memory.iter_messages(handles=["@bob"], kind="dms")] == ['undated', 'b1']
+
+    def test_columnar_dump(self, data_dir, tmp_path):
+        """Test that the columnar export maps back to the same messages"""
+        from src.agent.conversation_export import ColumnarExport
+        memory = self._populate(data_dir)
+        assert memory.export_columns(tmp_path / "export") == 6
+
+        export = ColumnarExport(tmp_path / "export")
+        assert len(export) == 6
+        assert [export.text(i) for i in range(len(export))] == ['undated', 'a1', 'b1', 'a2', 'a3', 'a4']
+        assert [export.handles[h] for h in export['handle'][1:3]] == ['@alice', '@bob']
+        assert export['from_us'].tolist() == [-1, 0, 1, 0, 1, 0]
+        assert export['timestamp'][1:].tolist() == [100.0, 150.0, 200.0, 300.0, 400.0]
+        assert [export.kinds[k] for k in export['kind'][2:4]] == ['dms', 'mentions']
+
+
+class TestManifest:
+    def test_flat_directory_is_sharded_once(self, data_dir):
+        """Test that pre-sharding files and archives move into shards and are indexed"""
+        (data_dir / "archive" / "@alice").mkdir(parents=True)
+        (data_dir / "archive" / "@alice" / "2020-01.jsonl.gz").write_bytes(b"")
+        with open(data_dir / "@alice.json", 'w') as f:
+            json.dump({'dms': [{'text': 'hi', 'timestamp': 100}], 'mentions': [],
+                       'last_interaction': '2024-01-01T00:00:00+00:00', 'metadata': {}}, f)
+
+        memory = ConversationMemory(data_dir=data_dir)
+        assert not (data_dir / "@alice.json").exists()
+        assert shard_path(data_dir, "@alice", ".json").exists()
+        assert shard_path(data_dir / "archive", "@alice").is_dir()
+        assert memory.get_all_handles() == ["@alice"]
+        assert memory.manifest.get("@alice")['messages'] == 1
+        assert [m['text'] for m in memory.get_dms("@alice")] == ['hi']
+
+    def test_odd_handles_and_recent_activity(self, data_dir):
+        """Test that any handle maps to a safe file and activity is ranked from the manifest"""
+        memory = ConversationMemory(data_dir=data_dir)
+        for handle, ts in (("../etc/passwd", "2024-01-01T00:00:00+00:00"), ("@bob", "2024-03-01T00:00:00+00:00")):
+            memory.add_dm(handle, {'text': 'hello'})
+            memory.memory[handle]['last_interaction'] = ts
+            memory.update_metadata(handle, 'seen', True)
+
+        path = shard_path(data_dir, "../etc/passwd", ".json")
+        assert path.exists() and path.parent.parent == data_dir
+        assert memory.recent_handles() == ["@bob", "../etc/passwd"]
+        assert memory.recent_handles(since="2024-02-01T00:00:00+00:00") == ["@bob"]
+
+        reloaded = ConversationMemory(data_dir=data_dir)
+        assert reloaded.get_all_handles() == ["../etc/passwd", "@bob"]
+        assert [m['text'] for m in reloaded.get_dms("../etc/passwd")] == ['hello']
+
+    def test_processes_see_each_others_handles(self, data_dir):
+        """Test that handles added through another instance show up without a directory scan"""
+        first = ConversationMemory(data_dir=data_dir, shared=True)
+        second = ConversationMemory(data_dir=data_dir, shared=True)
+        first.add_dm("@alice", {'text': 'hi'})
+
+        assert second.get_all_handles() == ["@alice"]
+        assert [m['text'] for m in second.get_dms("@alice")] == ['hi']
+        second.clear_memory()
+        assert first.manifest.handles() == []
+        assert not shard_path(data_dir, "@alice", ".json").exists()
@@ -0,0 +1,148 @@
+import pytest
+import sys
+import threading
+import multiprocessing
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+from src.agent.replied_tweets import RepliedTweetStore
+from src.utils.file_lock import FileWatch, StripedFileLock, locked_json_update, read_json
+
+def increment_counter(path, times):
+    for _ in range(times):
+        locked_json_update(path, lambda data: {'count': data['count'] + 1}, default={'count': 0})
+
+def add_messages(data_dir, storage_mode, worker, times):
+    memory = ConversationMemory(data_dir=data_dir, storage_mode=storage_mode, compact_interval=None,
+                                replied_retention_days=None, shared=True)
+    for i in range(times):
+        memory.add_dm("@alice", {'text': f'{worker}-{i}'})
+        if storage_mode == "wal" and i == times // 2:
+            memory.compact(threshold=1)  # Rewrites the snapshot under the other writer
+    memory.close()
+
+def run_workers(target, args_for_worker, workers=3):
+    processes = [multiprocessing.Process(target=target, args=args_for_worker(i)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+class TestFileLock:
+    def test_concurrent_json_updates_are_not_lost(self, tmp_path):
+        """Test read-modify-write from several processes under the lock"""
+        path = tmp_path / "counter.json"
+        run_workers(increment_counter, lambda i: (path, 50))
+        assert read_json(path) == {'count': 150}
+
+    def test_striped_lock_is_reentrant_within_a_process(self, tmp_path):
+        """Test that an inner release does not drop the outer hold"""
+        locks = StripedFileLock(tmp_path / ".lock")
+        with locks.hold("@alice"):
+            with locks.hold("@alice"):
+                pass
+            assert locks._depth[locks.stripe("@alice")] == 1
+        assert locks._depth == {}
+        locks.close()
+
+    def test_striped_lock_excludes_threads(self, tmp_path):
+        """Test that another thread of the same process waits for the stripe"""
+        locks = StripedFileLock(tmp_path / ".lock")
+        entered = threading.Event()
+
+        def other():
+            with locks.hold("@alice"):
+                entered.set()
+
+        with locks.hold("@alice"):
+            thread = threading.Thread(target=other)
+            thread.start()
+            assert not entered.wait(0.1)
+        assert entered.wait(5)
+        thread.join()
+        locks.close()
+
+    def test_shared_memory_threads_do_not_deadlock(self, tmp_path, monkeypatch):
+        """Test concurrent writers, readers and evictions on a shared store in one process"""
+        monkeypatch.chdir(tmp_path)
+        memory = ConversationMemory(data_dir=tmp_path / "conversations", storage_mode="wal",
+                                    compact_interval=None, max_resident=2, shared=True)
+
+        def work(worker):
+            for i in range(30):
+                handle = f"@user{(worker + i) % 4}"
+                memory.add_dm(handle, {'text': f'{worker}-{i}'})
+                memory.get_recent_context(f"@user{i % 4}")
+                if i % 10 == 0:
+                    memory.compact(threshold=1)
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+            assert not thread.is_alive()
+        assert sum(len(memory.get_dms(f"@user{i}")) for i in range(4)) == 120
+        memory.close()
+
+    def test_file_watch_detects_rewrites(self, tmp_path):
+        """Test change detection without reading the file"""
+        path = tmp_path / "queue.json"
+        watch = FileWatch(path)
+        assert watch.changed()
+        locked_json_update(path, lambda data: [1], default=[])
+        watch.mark_seen()
+        assert not watch.changed()
+        locked_json_update(path, lambda data: data + [2], default=[])
+        assert watch.changed()
+
+class TestSharedConversationMemory:
+    @pytest.mark.parametrize("storage_mode", ["json", "wal"])
+    def test_concurrent_writers_keep_every_update(self, tmp_path, monkeypatch, storage_mode):
+        """Test that processes sharing a data directory do not lose each other's messages"""
+        monkeypatch.chdir(tmp_path)
+        data_dir = tmp_path / "data" / "conversations"
+        run_workers(add_messages, lambda i: (data_dir, storage_mode, i, 20))
+
+        memory = ConversationMemory(data_dir=data_dir, storage_mode=storage_mode, compact_interval=None)
+        texts = [m['text'] for m in memory.get_dms("@alice")]
+        assert sorted(texts) == sorted(f'{w}-{i}' for w in range(3) for i in range(20))
+        assert memory.get_metadata("@alice")['total_interactions'] == 60
+
+    def test_resident_copy_sees_other_writers(self, tmp_path, monkeypatch):
+        """Test that only newly logged records are applied to a resident handle"""
+        monkeypatch.chdir(tmp_path)
+        data_dir = tmp_path / "data" / "conversations"
+        first = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None, shared=True)
+        second = ConversationMemory(data_dir=data_dir, storage_mode="wal", compact_interval=None, shared=True)
+        first.add_dm("@alice", {'text': 'one'})
+        second.add_dm("@alice", {'text': 'two'})
+        first.add_dm("@alice", {'text': 'three'})
+        assert [m['text'] for m in first.get_dms("@alice")] == ['one', 'two', 'three']
+        assert [m['text'] for m in second.get_dms("@alice")] == ['one', 'two', 'three']
+        assert first._log.last_seq("@alice") == 3
+
+class TestSharedRepliedTweets:
+    def test_other_process_replies_are_visible(self, tmp_path):
+        """Test that a miss picks up IDs appended by another store"""
+        first = RepliedTweetStore(tmp_path / "replied.jsonl", legacy_path=None)
+        second = RepliedTweetStore(tmp_path / "replied.jsonl", legacy_path=None)
+        first.add("1")
+        assert "1" in second
+        second.add("2")
+        assert "2" in first
+        assert len(RepliedTweetStore(tmp_path / "replied.jsonl", legacy_path=None)) == 2
+
+    def test_append_after_torn_line_is_kept(self, tmp_path):
+        """Test that a crash remnant does not swallow the next ID"""
+        path = tmp_path / "replied.jsonl"
+        path.write_text('{"id": "1", "t": 1.0}\n{"id": "2"')
+        store = RepliedTweetStore(path, legacy_path=None)
+        store.add("3")
+        assert set(RepliedTweetStore(path, legacy_path=None)) == {"1", "3"}
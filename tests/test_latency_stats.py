@@ -0,0 +1,94 @@
+import pytest
+import sys
+import random
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.latency_stats import DDSketch, LatencyTracker
+
+class TestDDSketch:
+    def test_quantiles_within_relative_accuracy(self):
+        """Test that quantiles of a skewed distribution stay within 1% of exact"""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(1.0, 1.0) for _ in range(20000))
+        sketch = DDSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+        assert len(sketch.bins) < 1000
+
+    def test_merge_and_round_trip(self):
+        """Test that merged and reloaded sketches match one built from all values"""
+        whole, left, right = DDSketch(), DDSketch(), DDSketch()
+        for i in range(1, 1001):
+            whole.add(i / 10)
+            (left if i % 2 else right).add(i / 10)
+        left.merge(right)
+        reloaded = DDSketch.from_dict(left.to_dict())
+
+        for q in (0.5, 0.99):
+            assert reloaded.quantile(q) == whole.quantile(q)
+        assert reloaded.count == 1000 and reloaded.max == 100.0
+
+    def test_bins_are_capped(self):
+        """Test that the bucket cap holds and high quantiles stay accurate"""
+        sketch = DDSketch(max_bins=32)
+        for i in range(1, 10001):
+            sketch.add(i * 0.01)
+        assert len(sketch.bins) <= 32
+        assert sketch.quantile(0.99) == pytest.approx(99.0, rel=0.011)
+
+
+class TestLatencyTracker:
+    def test_reply_latency_per_handle_and_channel(self):
+        """Test that replies are measured from first sight and summarized per series"""
+        tracker = LatencyTracker(path=None)
+        tracker.first_seen('dm', 'alice', 'hi', ts=100.0)
+        tracker.first_seen('dm', 'alice', 'hi', ts=105.0)  # Seen again on a later pass
+        tracker.first_seen('mention', 'bob', '123', ts=100.0)
+
+        assert tracker.replied('dm', 'alice', 'hi', llm_seconds=2.0, browser_seconds=3.0, sent_at=110.0) == 10.0
+        assert tracker.replied('mention', 'bob', '123', llm_seconds=1.0, sent_at=130.0) == 30.0
+        assert tracker.replied('dm', 'alice', 'never seen', llm_seconds=1.0) is None
+
+        assert tracker.summary('response', 'dm', 'alice')['p50'] == pytest.approx(10.0, rel=0.01)
+        assert tracker.summary('response')['count'] == 2
+        assert tracker.summary('llm', 'dm')['count'] == 2
+        assert tracker.summary('browser', 'mention') == {'count': 0}
+        assert tracker.handles() == ['alice', 'bob']
+        assert tracker.handles('mention') == ['bob']
+
+    def test_processes_merge_into_one_file(self, tmp_path):
+        """Test that trackers sharing a file add up rather than overwrite each other"""
+        path = tmp_path / "latency_stats.json"
+        first = LatencyTracker(path=path)
+        second = LatencyTracker(path=path)
+        first.record('llm', 'dm', 'alice', 1.0)
+        second.record('llm', 'dm', 'alice', 2.0)
+        second.first_seen('mention', 'bob', '123', ts=50.0)
+        first.save()
+        second.save()
+        first.save()
+
+        assert first.summary('llm', 'dm', 'alice')['count'] == 2
+        reloaded = LatencyTracker(path=path)
+        assert reloaded.summary('llm')['count'] == 2
+        # Pending messages survive a restart
+        before = path.read_bytes()
+        assert reloaded.replied('mention', 'bob', '123', sent_at=60.0) == 10.0
+        assert path.read_bytes() == before  # Replies are only written by save()
+
+    def test_pending_is_bounded(self):
+        """Test that the oldest unanswered messages are forgotten past the cap"""
+        tracker = LatencyTracker(path=None, max_pending=2)
+        for key in ('a', 'b', 'c'):
+            tracker.first_seen('dm', 'alice', key)
+        assert tracker.replied('dm', 'alice', 'a') is None
+        assert tracker.replied('dm', 'alice', 'c') is not None
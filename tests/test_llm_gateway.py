@@ -0,0 +1,193 @@
+import pytest
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from aiohttp import web
+from src.agent.llm_gateway import LLMGateway, LLMError
+from src.agent.rate_limiter import RateLimiter
+
+def completion(text):
+    return {'choices': [{'message': {'role': 'assistant', 'content': text}}], 'usage': {'total_tokens': 42}}
+
+def sse(delta):
+    return f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n".encode()
+
+class RecordingLimiter(RateLimiter):
+    """Rate limiter that keeps the channel of every grant and the outcome of every settlement"""
+
+    def __init__(self):
+        super().__init__()
+        self.acquired = []
+        self.settled = []
+
+    async def acquire(self, channel, tokens=0):
+        self.acquired.append(channel)
+        return await super().acquire(channel, tokens)
+
+    def try_acquire(self, channel, tokens=0):
+        granted = super().try_acquire(channel, tokens)
+        if granted:
+            self.acquired.append(channel)
+        return granted
+
+    def settle(self, estimated, actual):
+        self.settled.append(actual)
+        super().settle(estimated, actual)
+
+class StandInServer:
+    """Local chat completions endpoint answering from a script of (status, delay) steps.
+
+    Streamed requests get "Hello there friend" in three chunks; status -1
+    breaks the stream off after the first two.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+
+    async def handle(self, request):
+        payload = await request.json()
+        self.requests.append((request.headers.get('Authorization'), payload))
+        status, delay = self.script.pop(0) if self.script else (200, 0)
+        await asyncio.sleep(delay)
+        if status not in (200, -1):
+            return web.json_response({'error': 'nope'}, status=status, headers={'Retry-After': '0'})
+        if not payload.get('stream'):
+            return web.json_response(completion(f"reply {len(self.requests)}"))
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await response.write(sse({'role': 'assistant'}))
+        for word in ("Hello", " there", " friend")[:2 if status == -1 else 3]:
+            await response.write(sse({'content': word}))
+        if status == 200:
+            await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+class TestLLMGateway:
+    @pytest.mark.asyncio
+    async def test_chat_retries_transient_errors(self):
+        """Test that 429/5xx responses are retried and the reply text returned"""
+        async with StandInServer([(429, 0), (503, 0)]) as server:
+            gateway = LLMGateway(api_key="test-key", base_url=server.url, backoff=0.01)
+            reply = await gateway.chat([{'role': 'user', 'content': 'hi'}], model="gpt-3.5-turbo",
+                                       temperature=0.7)
+            await gateway.close()
+
+        assert reply == "reply 3"
+        assert gateway.stats()['retries'] == 2
+        assert gateway.router.health("gpt-3.5-turbo")['calls'] == 1
+        auth, payload = server.requests[0]
+        assert auth == "Bearer test-key"
+        assert payload['model'] == "gpt-3.5-turbo" and payload['temperature'] == 0.7
+
+    @pytest.mark.asyncio
+    async def test_client_errors_and_deadlines(self):
+        """Test that 4xx errors fail at once and slow calls stop at their deadline"""
+        async with StandInServer([(400, 0), (200, 1.0)]) as server:
+            gateway = LLMGateway(base_url=server.url, max_retries=0)
+            with pytest.raises(LLMError, match="HTTP 400"):
+                await gateway.chat([{'role': 'user', 'content': 'hi'}])
+            with pytest.raises(LLMError):
+                await gateway.chat([{'role': 'user', 'content': 'hi'}], deadline=0.1)
+            await gateway.close()
+
+        assert len(server.requests) == 2
+        assert gateway.router.health("gpt-3.5-turbo")['error_rate'] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_hedged_call_takes_faster_duplicate(self):
+        """Test that a slow first request is raced by a duplicate that wins"""
+        async with StandInServer([(200, 1.0), (200, 0)]) as server:
+            gateway = LLMGateway(base_url=server.url, hedge_after=0.05)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            reply = await gateway.chat([{'role': 'user', 'content': 'hi'}], hedge=True)
+            elapsed = loop.time() - start
+            await gateway.close()
+
+        assert reply == "reply 2"
+        assert elapsed < 0.5
+        assert gateway.stats()['hedges'] == 1 and gateway.stats()['hedge_wins'] == 1
+
+    @pytest.mark.asyncio
+    async def test_chat_retries_take_and_settle_capacity(self):
+        """Test that each chat attempt, hedges included, waits for the limiter and settles its estimate"""
+        limiter = RecordingLimiter()
+        async with StandInServer([(429, 0), (200, 0), (200, 1.0), (200, 0)]) as server:
+            gateway = LLMGateway(base_url=server.url, backoff=0.01, hedge_after=0.05, limiter=limiter)
+            await gateway.chat([{'role': 'user', 'content': 'hi'}], channel="dm")
+            assert limiter.acquired == ["dm", "dm"]
+            assert limiter.settled == [0, 42]  # The 429 generated nothing
+
+            reply = await gateway.chat([{'role': 'user', 'content': 'hi'}], channel="mention", hedge=True)
+            await gateway.close()
+
+        assert reply == "reply 4"
+        assert limiter.acquired[2:] == ["mention", "mention"]
+        # The winner settles against its usage; the cancelled first request keeps its estimate
+        assert sorted(limiter.settled[2:], key=str) == [42, None]
+
+    @pytest.mark.asyncio
+    async def test_stream_chat(self):
+        """Test streamed chunks, retry before the first chunk and failure after it"""
+        async with StandInServer([(503, 0), (200, 0), (-1, 0)]) as server:
+            gateway = LLMGateway(base_url=server.url, backoff=0.01)
+            chunks = [chunk async for chunk in gateway.stream_chat([{'role': 'user', 'content': 'hi'}])]
+            assert chunks == ["Hello", " there", " friend"]
+            assert server.requests[1][1]['stream'] is True
+
+            received = []
+            with pytest.raises(LLMError, match="broke off"):
+                async for chunk in gateway.stream_chat([{'role': 'user', 'content': 'hi'}]):
+                    received.append(chunk)
+            await gateway.close()
+
+        assert received == ["Hello", " there"]
+        assert len(server.requests) == 3  # No retry once text was handed out
+
+    @pytest.mark.asyncio
+    async def test_stream_retries_take_and_settle_capacity(self):
+        """Test that each stream attempt waits for the limiter and settles its estimate"""
+        limiter = RecordingLimiter()
+        async with StandInServer([(503, 0), (200, 0)]) as server:
+            gateway = LLMGateway(base_url=server.url, backoff=0.01, limiter=limiter)
+            chunks = [chunk async for chunk in gateway.stream_chat([{'role': 'user', 'content': 'hi'}],
+                                                                   channel="dm")]
+            await gateway.close()
+
+        assert "".join(chunks) == "Hello there friend"
+        assert limiter.acquired == ["dm", "dm"]
+        # The rejected attempt generated nothing; the streamed one is charged for its text
+        assert limiter.settled[0] == 0 and limiter.settled[1] > 0
+        assert server.requests[1][1]['stream_options'] == {'include_usage': True}
+
+    def test_session_from_a_finished_loop_is_closed(self):
+        """Test that moving to a new event loop closes the old loop's session instead of leaking it"""
+        gateway = LLMGateway(api_key="test-key")
+        first = asyncio.run(gateway._get_session())
+        second = asyncio.run(gateway._get_session())
+        assert first.closed and second is not first
+        asyncio.run(gateway.close())
+        assert second.closed
@@ -0,0 +1,69 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.memory import Memory, extract_topic
+
+def interaction(handle, message, timestamp, reply="Happy to help"):
+    return {'handle': handle, 'message': message, 'reply': reply, 'timestamp': timestamp, 'context_type': 'dm'}
+
+class TestMemory:
+    def test_short_term_is_consolidated_into_topic_records(self):
+        """Test that old interactions fold into per-handle, per-topic records in the background"""
+        memory = Memory(path=None, max_short_term=4, batch_size=2)
+        for i in range(6):
+            memory.add_interaction(interaction("@alice", f"my deck deck joists are sagging ({i})", 100 + i))
+        for i in range(4):
+            memory.add_interaction(interaction("@bob", "which chisel chisel should I buy", 200 + i))
+        memory.close()
+
+        assert len(memory.short_term) == 4
+        assert memory.consolidated == 6
+        deck = memory.get_record("@alice", "deck")
+        assert deck['count'] == 6 and deck['first_seen'] == 100 and deck['last_seen'] == 105
+        assert len(deck['samples']) == 3 and deck['keywords']['joists'] == 6
+
+    def test_recall_by_recency(self):
+        """Test that recall returns a handle's topics newest first within a time range"""
+        memory = Memory(path=None, max_short_term=0)
+        for topic, ts in (("framing", 100), ("roofing", 300), ("plumbing", 200)):
+            memory.add_interaction({**interaction("@alice", "question", ts), 'topic': topic})
+        memory.flush()
+
+        assert [r['topic'] for r in memory.recall("@alice")] == ["roofing", "plumbing", "framing"]
+        assert [r['topic'] for r in memory.recall("@alice", since=150)] == ["roofing", "plumbing"]
+        assert [r['topic'] for r in memory.recall("@alice", limit=1)] == ["roofing"]
+        assert memory.recall("@nobody") == []
+
+        # Updating a record moves it in the recency order
+        memory.add_interaction({**interaction("@alice", "question", 400), 'topic': 'framing'})
+        memory.flush()
+        assert [r['topic'] for r in memory.recall("@alice", limit=2)] == ["framing", "roofing"]
+
+    def test_bounded_and_persistent(self, tmp_path):
+        """Test the record cap, recent context and a save/load round trip"""
+        path = tmp_path / "long_term_memory.json"
+        memory = Memory(path=path, max_short_term=1, max_records=2)
+        for i, topic in enumerate(("nails", "screws", "glue")):
+            memory.add_interaction({**interaction("@carol", f"about {topic}", i), 'topic': topic})
+        memory.add_interaction(interaction("@carol", "latest question", 10, reply=""))
+        memory.close()
+
+        assert memory.get_record("@carol", "nails") is None
+        assert [m['text'] for m in memory.get_recent_context("@carol", limit=3)] == \
+            ["about glue", "Happy to help", "latest question"]
+
+        reloaded = Memory(path=path)
+        assert [r['topic'] for r in reloaded.recall("@carol")] == ["glue", "screws"]
+        assert len(reloaded.short_term) == 1
+        reloaded.close()
+
+    def test_topic_extraction(self):
+        """Test that the topic is the most frequent content word"""
+        assert extract_topic("Should I seal the deck? The deck is cedar.") == "deck"
+        assert extract_topic("ok thanks") == "general"
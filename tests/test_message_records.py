@@ -0,0 +1,58 @@
+import pytest
+import json
+import pickle
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.message_records import MessageRecord, MentionRecord, encode_record, to_records
+
+class TestMessageRecord:
+    def test_round_trips_json_shape(self):
+        """Test that a record gives back exactly the dict it was built from"""
+        data = {'text': 'hi', 'timestamp': '2024-03-01T10:00:00', 'is_from_us': False,
+                'ownership_signals': ['right_aligned'], 'display_time': '10:00'}
+        record = MessageRecord(data, "@alice")
+
+        assert record.to_dict() == data
+        assert record == data and data == record
+        assert json.loads(json.dumps(record, default=encode_record)) == data
+        assert 'type' not in record and record.get('type') is None
+
+    def test_normalizes_fields(self):
+        """Test interned handle and type, numeric timestamp and both from_us spellings"""
+        record = MessageRecord({'type': ''.join(['d', 'm']), 'text': 'x', 'timestamp': 5, 'from_us': True},
+                               ''.join(['@', 'bob']))
+
+        assert record['type'] is sys.intern('dm')
+        assert record.handle is sys.intern('@bob')
+        assert record.timestamp == 5.0 and record['timestamp'] == 5
+        assert record.from_us is True
+        assert record['is_from_us'] is True and record['from_us'] is True
+        assert list(record) == ['type', 'text', 'timestamp', 'from_us']
+
+    def test_behaves_like_a_dict(self):
+        """Test that callers can keep updating and reading records as dicts"""
+        record = MentionRecord({'tweet_id': '1', 'text': '@bob hi'})
+        record['reply'] = 'hello'
+        record['score'] = 3
+        record['timestamp'] = 10.0
+        del record['text']
+
+        assert record.to_dict() == {'tweet_id': '1', 'reply': 'hello', 'timestamp': 10.0, 'score': 3}
+        assert record.timestamp == 10.0 and len(record) == 4
+        with pytest.raises(KeyError):
+            record['text']
+
+    def test_records_are_compact_and_picklable(self):
+        """Test that records have no instance dict and survive a state snapshot"""
+        records = to_records('mentions', [{'tweet_id': '1', 'text': 'a', 'timestamp': 1.5}], "@carol")
+
+        assert isinstance(records[0], MentionRecord)
+        assert not hasattr(records[0], '__dict__')
+        restored = pickle.loads(pickle.dumps(records, protocol=5))
+        assert restored == records and restored[0].handle == "@carol"
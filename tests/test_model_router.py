@@ -0,0 +1,54 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.model_router import ModelRouter, complexity, complexity_features
+
+SIMPLE = "thanks Bob, love it!"
+COMPLEX = ("How do I calculate the load on a joist span for a deck with a concrete footing? "
+           "Does the permit code change the beam size? What about the framing?")
+
+class TestModelRouter:
+    def test_complexity_features(self):
+        """Test that length, questions, domain words and depth raise the score"""
+        assert complexity(SIMPLE) < 0.2
+        assert complexity(COMPLEX) > 0.5
+        assert complexity(SIMPLE, depth=10) > complexity(SIMPLE)
+        features = complexity_features(COMPLEX)
+        assert features['questions'] == 1.0 and features['keywords'] == 1.0
+        assert complexity_features("")['keywords'] == 0.0
+
+    def test_routes_by_complexity(self):
+        """Test that simple messages get the fast tier and complex ones the strong tier"""
+        router = ModelRouter()
+        tiers = ("fast", "strong")
+        assert router.choose(SIMPLE, tiers) == "fast"
+        assert router.choose(COMPLEX, tiers) == "strong"
+        assert router.stats()['routes'] == {'fast': 1, 'strong': 1}
+
+    def test_falls_back_when_slo_at_risk(self):
+        """Test that a slow or failing tier is skipped and retried once its samples age out"""
+        router = ModelRouter(slo=5.0, min_samples=3)
+        tiers = ("fast", "strong")
+        for _ in range(3):
+            router.record("strong", 9.0)
+        assert router.at_risk("strong")
+        assert router.choose(COMPLEX, tiers) == "fast"
+        assert router.choose(COMPLEX, tiers, slo=20.0) == "strong"  # A looser SLO tolerates it
+        assert router.stats()['fallbacks'] == 1
+
+        router.horizon = 0
+        assert not router.at_risk("strong")
+        assert router.choose(COMPLEX, tiers) == "strong"
+
+        failing = ModelRouter(min_samples=3, max_error_rate=0.5)
+        for ok in (True, False, False):
+            failing.record("strong", 1.0, ok=ok)
+        health = failing.health("strong")
+        assert health['calls'] == 3 and health['error_rate'] == pytest.approx(2 / 3)
+        assert failing.choose(COMPLEX, tiers) == "fast"
@@ -0,0 +1,85 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent import prompt_builder
+from src.agent.prompt_builder import PromptBuilder, count_tokens, truncate_tokens
+
+class TestPromptBuilder:
+    def test_fit_keeps_newest_in_order(self):
+        """Test that fitting drops the oldest items and keeps the order"""
+        builder = PromptBuilder()
+        items = [f"message number {i}" for i in range(10)]
+        cost = builder.count(items[-1])
+        kept = builder.fit(items, tokens=cost * 3 + builder.count("\n") * 2)
+        assert kept == items[-3:]
+        assert builder.fit(items, tokens=0) == []
+
+    def test_messages_respect_budget(self):
+        """Test that lists are filled up to, and never past, the exact budget"""
+        builder = PromptBuilder("gpt-3.5-turbo", budget=200)
+        history = [f"user{i}: this is a fairly long line of conversation number {i}" for i in range(100)]
+        messages = builder.messages("You are Bob.", "Topic: {topic}\n{history}",
+                                    lists={"history": history}, topic="decks")
+
+        user = messages[1]["content"]
+        assert builder.total(*(m["content"] for m in messages)) <= 200
+        assert user.startswith("Topic: decks\n") and user.endswith(history[-1])
+        assert history[0] not in user
+        # Filled to within a line of the budget
+        assert builder.total("You are Bob.", user + "\n" + history[0] + "\n" + history[0]) > 200
+
+    def test_lists_filled_in_order(self):
+        """Test that the first list gets the budget before the second"""
+        builder = PromptBuilder(budget=60)
+        text = builder.format("{recent}|{older}", lists={"recent": ["a " * 20] * 10, "older": ["b " * 40] * 3})
+        recent, older = text.split("|")
+        assert recent and not older
+
+    def test_fallback_counting(self, monkeypatch):
+        """Test the character estimate used when tiktoken is not installed"""
+        monkeypatch.setattr(prompt_builder, "tiktoken", None)
+        prompt_builder._encoding.cache_clear()
+        prompt_builder.count_tokens.cache_clear()
+        try:
+            assert count_tokens("x" * 40) == 10
+            assert count_tokens("x" * 41) == 11
+            assert truncate_tokens("x" * 100, 5) == "x" * 20
+            assert truncate_tokens("hello", 0) == ""
+        finally:
+            prompt_builder._encoding.cache_clear()
+            prompt_builder.count_tokens.cache_clear()
+
+    def test_tokenizer_counting(self, monkeypatch):
+        """Test that counts, truncation and the budget use the model's tokenizer when it loads"""
+        tiktoken = pytest.importorskip("tiktoken")
+        # A byte-level BPE with no merges: one token per byte, built without downloading anything
+        encoding = tiktoken.Encoding(name="bytes", pat_str=r"\S+|\s+",
+                                     mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={})
+        monkeypatch.setattr(tiktoken, "get_encoding", lambda name: encoding)
+        prompt_builder._encoding.cache_clear()
+        prompt_builder.count_tokens.cache_clear()
+        try:
+            assert count_tokens("x" * 40) == 40
+            assert truncate_tokens("hello world", 5) == "hello"
+            builder = PromptBuilder("gpt-4o", budget=120)
+            messages = builder.messages("You are Bob.", "{history}", lists={"history": ["line"] * 100})
+            contents = [m["content"] for m in messages]
+            assert builder.total(*contents) <= 120
+            # One byte per token, so the characters sent are the exact count, not 4x the budget
+            assert 100 < sum(len(content) for content in contents) <= 120
+
+            def offline(name):
+                raise OSError("offline")
+            monkeypatch.setattr(tiktoken, "get_encoding", offline)
+            prompt_builder._encoding.cache_clear()
+            prompt_builder.count_tokens.cache_clear()
+            assert count_tokens("x" * 40) == 10  # A tokenizer that cannot load falls back to the estimate
+        finally:
+            prompt_builder._encoding.cache_clear()
+            prompt_builder.count_tokens.cache_clear()
@@ -0,0 +1,72 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.rate_limiter import RateLimiter, TokenBucket, estimate_tokens
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_priority_and_fair_share(self):
+        """Test that queued DMs go first and lower channels still get a share"""
+        limiter = RateLimiter(requests_per_minute=6000)  # One request per 10ms once the burst is spent
+        limiter.requests.level = 0
+        order = []
+
+        async def call(channel, i):
+            await limiter.acquire(channel)
+            order.append(f"{channel}{i}")
+
+        tasks = [asyncio.ensure_future(call('tweet', i)) for i in range(2)]
+        tasks += [asyncio.ensure_future(call('mention', i)) for i in range(3)]
+        tasks += [asyncio.ensure_future(call('dm', i)) for i in range(3)]
+        await asyncio.gather(*tasks)
+        assert order == ['dm0', 'mention0', 'dm1', 'dm2', 'mention1', 'mention2', 'tweet0', 'tweet1']
+
+        # A steady stream of DMs does not starve a waiting auto-tweet
+        order.clear()
+        limiter.requests.level = 0
+        tasks = [asyncio.ensure_future(call('tweet', 0))]
+        tasks += [asyncio.ensure_future(call('dm', i)) for i in range(12)]
+        await asyncio.gather(*tasks)
+        assert order.index('tweet0') == 7  # Ties with dm7's tag and was queued first
+
+        stats = limiter.stats()
+        assert stats['dm']['count'] == 15 and stats['tweet']['count'] == 3
+        assert stats['dm']['p50'] < stats['tweet']['p50']
+
+    @pytest.mark.asyncio
+    async def test_token_budget_and_settle(self):
+        """Test that token cost gates calls and real usage is credited back"""
+        limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens/s
+        assert limiter.try_acquire('dm', 5000)
+        assert not limiter.try_acquire('dm', 2000)
+        limiter.settle(5000, 1000)  # The call used far less than estimated
+        assert limiter.try_acquire('dm', 2000)
+
+        limiter.tokens.level = 0
+        waited = await limiter.acquire('dm', 20)
+        assert 0.1 < waited < 0.5
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiters_are_skipped(self):
+        """Test that a caller giving up does not hold up the queue"""
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.requests.level = 0
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire('tweet'), 0.01)
+        await asyncio.wait_for(limiter.acquire('dm'), 0.5)
+        assert limiter.queued() == 0
+
+    def test_bucket_and_estimate(self):
+        """Test bucket refill math and the token estimate"""
+        bucket = TokenBucket(rate=10, capacity=20)
+        bucket.take(20)
+        assert bucket.wait_time(5, bucket.updated) == pytest.approx(0.5)
+        assert bucket.wait_time(50, bucket.updated) == pytest.approx(2.0)  # Capped at capacity
+        assert estimate_tokens([{'role': 'user', 'content': 'x' * 400}], max_tokens=150) == 254
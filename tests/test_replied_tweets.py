@@ -0,0 +1,84 @@
+import pytest
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.replied_tweets import RepliedTweetStore, BloomFilter, tweet_id_timestamp, TWITTER_EPOCH_MS
+
+def snowflake(created_at: float) -> str:
+    """Build a tweet ID created at the given epoch time"""
+    return str((int(created_at * 1000) - TWITTER_EPOCH_MS) << 22)
+
+@pytest.fixture
+def store_paths(tmp_path):
+    return tmp_path / "replied_mentions.jsonl", tmp_path / "replied_mentions.json"
+
+class TestRepliedTweetStore:
+    def test_adds_are_appended_and_reloaded(self, store_paths):
+        """Test that each reply appends one line and survives a restart"""
+        log_path, legacy_path = store_paths
+        store = RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        store.add('101')
+        store.add('102')
+        store.add('101')
+
+        assert len(log_path.read_text().splitlines()) == 2
+        reloaded = RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        assert '101' in reloaded and '102' in reloaded
+        assert '103' not in reloaded
+
+    def test_imports_legacy_json_list(self, store_paths):
+        """Test migration from the old replied_mentions.json set"""
+        log_path, legacy_path = store_paths
+        legacy_path.write_text(json.dumps(['1', '2']))
+        store = RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        assert '1' in store and '2' in store
+        assert len(log_path.read_text().splitlines()) == 2
+
+        # Importing again must not append duplicates
+        RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        assert len(log_path.read_text().splitlines()) == 2
+
+    def test_prunes_by_tweet_age(self, store_paths):
+        """Test that IDs older than the retention window are dropped"""
+        log_path, legacy_path = store_paths
+        old_id = snowflake(time.time() - 100 * 86400)
+        new_id = snowflake(time.time() - 86400)
+        assert abs(tweet_id_timestamp(new_id) - (time.time() - 86400)) < 5
+
+        store = RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        store.add(old_id)
+        store.add(new_id)
+        assert store.prune(max_age_days=30) == 1
+        assert old_id not in store and new_id in store
+
+        reloaded = RepliedTweetStore(path=log_path, legacy_path=legacy_path)
+        assert old_id not in reloaded and new_id in reloaded
+
+    def test_bloom_filter_keeps_pruned_ids(self, store_paths):
+        """Test that the cold set still answers for pruned IDs"""
+        log_path, legacy_path = store_paths
+        old_id = snowflake(time.time() - 100 * 86400)
+        store = RepliedTweetStore(path=log_path, legacy_path=legacy_path, bloom_capacity=1000)
+        store.add(old_id)
+        store.prune(max_age_days=30)
+        assert len(store) == 0
+        assert old_id in store
+
+        reloaded = RepliedTweetStore(path=log_path, legacy_path=legacy_path, bloom_capacity=1000)
+        assert old_id in reloaded
+
+    def test_bloom_filter_false_positive_rate(self):
+        """Test the Bloom filter stays near its configured error rate"""
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f"in-{i}")
+        assert all(f"in-{i}" in bloom for i in range(10000))
+        false_positives = sum(f"out-{i}" in bloom for i in range(10000))
+        assert false_positives < 300
@@ -0,0 +1,95 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.reply_pipeline import ReplyJob, ReplyPipeline
+from src.agent.reply_stream import StreamedReply
+
+class TestReplyPipeline:
+    @pytest.mark.asyncio
+    async def test_replies_sent_in_order_ready(self):
+        """Test that generation is bounded and replies are sent as soon as they are ready"""
+        delays = {'@slow': 0.05, '@fast': 0.0, '@mid': 0.02}
+        running = []
+        peak = []
+
+        async def generate(job):
+            running.append(job.handle)
+            peak.append(len(running))
+            await asyncio.sleep(delays[job.handle])
+            running.remove(job.handle)
+            return f"reply to {job.handle}"
+
+        sent = []
+        async def send(job):
+            sent.append((job.handle, job.reply))
+            return True
+
+        pipeline = ReplyPipeline(generate, concurrency=2)
+        for handle in delays:
+            pipeline.submit(ReplyJob('mention', handle, handle, "hello"))
+        stats = await pipeline.drain(send)
+
+        assert [handle for handle, _ in sent] == ['@fast', '@mid', '@slow']
+        assert sent[0][1] == "reply to @fast"
+        assert max(peak) == 2
+        assert stats['jobs'] == 3 and stats['sent'] == 3 and stats['failed'] == 0
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_not_raised(self):
+        """Test that failed generations and sends do not stop the other replies"""
+        async def generate(job):
+            if job.handle == '@error':
+                raise RuntimeError("LLM down")
+            return None if job.handle == '@empty' else "ok"
+
+        async def send(job):
+            return job.handle != '@unsent'
+
+        pipeline = ReplyPipeline(generate)
+        for handle in ('@error', '@empty', '@unsent', '@sent'):
+            pipeline.submit(ReplyJob('dm', handle, handle, "hello"))
+        stats = await pipeline.drain(send)
+
+        assert stats['sent'] == 1 and stats['failed'] == 3
+        assert await pipeline.drain(send) == {'jobs': 0, 'sent': 0, 'failed': 0,
+                                              'seconds': 0.0, 'replies_per_minute': 0.0}
+
+    @pytest.mark.asyncio
+    async def test_streams_hold_their_slot_until_finished(self):
+        """Test that a streamed reply is sent from its first text but bounds generation until it ends"""
+        started = []
+
+        async def chunks():
+            yield "Hello"
+            await asyncio.sleep(0.05)
+            yield " there"
+
+        async def generate(job):
+            started.append(job.handle)
+            reply = StreamedReply(chunks())
+            await reply.wait_started()
+            return reply
+
+        sent = []
+        async def send(job):
+            sent.append((job.handle, list(started)))
+            text = "".join([char async for char in job.reply.chars()])
+            assert text == "Hello there"
+            assert job.llm_seconds >= 0.05  # The whole stream, not just its first token
+            return True
+
+        pipeline = ReplyPipeline(generate, concurrency=1)
+        for handle in ('@first', '@second'):
+            pipeline.submit(ReplyJob('dm', handle, handle, "hi"))
+        stats = await pipeline.drain(send)
+
+        # Typing the first reply began before the second generation could start
+        assert sent[0] == ('@first', ['@first'])
+        assert stats['sent'] == 2
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent import reply_stream
+from src.agent.reply_stream import StreamError, StreamedReply, iter_chars, type_stream
+
+async def chunks(*parts, fail=False, delay=0.0):
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+    if fail:
+        raise RuntimeError("connection reset")
+
+class TestStreamedReply:
+    @pytest.mark.asyncio
+    async def test_chars_are_trimmed_and_complete(self):
+        """Test that leading/trailing whitespace is held back and the result reported"""
+        completed = []
+        reply = StreamedReply(chunks("\n Hi", " there,\n", "friend!", "\n\n"), on_complete=completed.append)
+        assert await reply.wait_started()
+        typed = "".join([char async for char in iter_chars(reply)])
+
+        assert typed == "Hi there,\nfriend!"
+        assert str(reply) == typed and completed == [typed]
+        assert "".join([char async for char in iter_chars("plain")]) == "plain"
+
+    @pytest.mark.asyncio
+    async def test_broken_stream_rolls_back_to_fallback(self):
+        """Test that a mid-stream failure raises after the partial text and recover() replaces it"""
+        async def fallback():
+            return " A complete reply "
+
+        completed = []
+        reply = StreamedReply(chunks("Half a ", "rep", fail=True), fallback=fallback, on_complete=completed.append)
+        typed = []
+        with pytest.raises(StreamError, match="connection reset"):
+            async for char in reply.chars():
+                typed.append(char)
+
+        assert "".join(typed) == "Half a rep"
+        assert await reply.recover() == "A complete reply"
+        assert str(reply) == "A complete reply" and completed == []
+
+    @pytest.mark.asyncio
+    async def test_wait_started(self):
+        """Test that wait_started waits for real text and reports empty or failed streams"""
+        assert await StreamedReply(chunks(" ", "Hi", delay=0.01)).wait_started()
+        assert not await StreamedReply(chunks(" ", "\n")).wait_started()
+        assert not await StreamedReply(chunks(fail=True)).wait_started()
+        assert await StreamedReply.from_text("cached").wait_started()
+
+    @pytest.mark.asyncio
+    async def test_type_stream_erases_partial_text(self, monkeypatch):
+        """Test that typing a broken stream backspaces over it and types the fallback"""
+        keys = []
+
+        class Actions:
+            def __init__(self, driver):
+                pass
+
+            def send_keys(self, text):
+                keys.append(text)
+
+            def perform(self):
+                pass
+
+        class Keys:
+            BACKSPACE = "\b"
+
+        async def no_sleep(seconds):
+            pass
+
+        monkeypatch.setattr(reply_stream, "ActionChains", Actions)
+        monkeypatch.setattr(reply_stream, "Keys", Keys)
+        monkeypatch.setattr(reply_stream.asyncio, "sleep", no_sleep)
+
+        async def fallback():
+            return "Whole"
+
+        reply = StreamedReply(chunks("Hal", fail=True), fallback=fallback)
+        assert await type_stream(None, reply) == "Whole"
+        assert keys == ["H", "a", "l", "\b\b\b", "W", "h", "o", "l", "e"]
+        assert await type_stream(None, "") is None
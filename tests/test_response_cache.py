@@ -0,0 +1,119 @@
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.response_cache import ResponseCache, normalize_message
+from src.agent.conversation_memory import ConversationMemory
+from src.agent.bob_agent import BobTheBuilder
+from src.agent.model_router import ModelRouter
+
+class HistoryEchoLLM:
+    """Stands in for the gateway and answers with the prompt it was given"""
+
+    def __init__(self):
+        self.router = ModelRouter()
+        self.calls = 0
+
+    async def chat(self, messages, **params):
+        self.calls += 1
+        return messages[-1]['content']
+
+class TestResponseCache:
+    def test_normalized_hits_and_misses(self):
+        """Test that near-identical messages share a reply and are counted"""
+        cache = ResponseCache(vary=False)
+        assert cache.get("What tools do I need to start woodworking?", "dm", "@alice") is None
+        cache.put("What tools do I need to start woodworking?", "dm", "A saw, a square and clamps.", "@alice")
+
+        assert cache.get("what tools do i need to start   woodworking", "dm", "@bob") == "A saw, a square and clamps."
+        assert cache.get("what tools do i need to start woodworking", "mention", "@bob") is None
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+        assert normalize_message("Hi @bob_builder!! https://t.co/x") == "hi"
+
+    def test_ttl_and_lru_eviction(self, monkeypatch):
+        """Test that entries expire after the TTL and the least recently used go first"""
+        now = [1000.0]
+        monkeypatch.setattr(time, "monotonic", lambda: now[0])
+        cache = ResponseCache(max_entries=2, ttl=60, vary=False)
+        cache.put("one", "dm", "1")
+        cache.put("two", "dm", "2")
+        assert cache.get("one") == "1"
+        cache.put("three", "dm", "3")
+
+        assert cache.get("two") is None and cache.get("one") == "1"
+        assert cache.stats()['evictions'] == 1
+
+        now[0] += 61
+        assert cache.get("one") is None
+        assert cache.stats()['expired'] == 1 and len(cache) == 1
+
+    def test_personalized_and_scoped_replies(self):
+        """Test handle substitution, greeting variation and per-handle scoping"""
+        cache = ResponseCache(explore=0.0)
+        cache.put("hi bob", "dm", "Hey @alice! What are you building today?", "@alice")
+        reply = cache.get("hi bob", "dm", "@carol")
+        assert reply.endswith("@carol! What are you building today?")
+        assert "alice" not in reply
+
+        # Only the literal @handle is a placeholder, not a word that matches it
+        cache.put("what should I use", "dm", "Hi @wood! Cedar wood resists rot.", "@wood")
+        reply = cache.get("what should I use", "dm", "@carol")
+        assert reply.endswith("@carol! Cedar wood resists rot.")
+
+        scoped = ResponseCache(per_handle=True, vary=False)
+        scoped.put("hi bob", "dm", "Hey @alice!", "@alice")
+        assert scoped.get("hi bob", "dm", "@alice") == "Hey @alice!"
+        assert scoped.get("hi bob", "dm", "@carol") is None
+
+    def test_variants_and_limits(self):
+        """Test that several replies are kept per key and oversized input is not cached"""
+        cache = ResponseCache(max_variants=2, explore=1.0)
+        cache.put("how do I sand", "dm", "Start at 80 grit.")
+        assert cache.get("how do I sand") is None  # Still collecting variants
+        cache.put("how do I sand", "dm", "Work up through the grits.")
+        cache.put("how do I sand", "dm", "Sand with the grain.")
+        assert cache.get("how do I sand") in ("Work up through the grits.", "Sand with the grain.")
+
+        cache.put("x" * 300, "dm", "too specific")
+        cache.put("blank reply", "dm", "")
+        assert len(cache) == 1
+
+        disabled = ResponseCache(enabled=False)
+        disabled.put("hi", "dm", "Hello!")
+        assert disabled.get("hi") is None and len(disabled) == 0
+
+    def test_private_replies_stay_with_their_handle(self):
+        """Test that replies stored as private are only served back to the asker"""
+        cache = ResponseCache(vary=False)
+        cache.put("what saw should I buy", "dm", "Given your shed plans, a circular saw.", "@alice", private=True)
+        assert cache.get("what saw should I buy", "dm", "@bob") is None
+        assert cache.get("what saw should I buy", "dm", "@alice") == "Given your shed plans, a circular saw."
+
+        cache.put("what saw should I buy", "dm", "A circular saw.", "@carol")
+        assert cache.get("what saw should I buy", "dm", "@bob") == "A circular saw."
+        assert cache.get("what saw should I buy", "dm", "@alice") == "Given your shed plans, a circular saw."
+
+    @pytest.mark.asyncio
+    async def test_history_never_reaches_another_handle(self, tmp_path, monkeypatch):
+        """Test that a reply generated from one handle's DMs is not served to another handle"""
+        monkeypatch.chdir(tmp_path)
+        memory = ConversationMemory(data_dir=tmp_path / "conversations", index_dir=tmp_path / "retrieval")
+        memory.add_dm("@alice", {'text': 'My gate code is 4321 and the shed is out back', 'timestamp': 1.0})
+        llm = HistoryEchoLLM()
+        bob = BobTheBuilder("test-key", memory=memory, response_cache=ResponseCache(vary=False), llm=llm)
+
+        question = "What lock should I put on my shed?"
+        assert "4321" in await bob.generate_response("@alice", question)
+        assert "4321" not in await bob.generate_response("@bob", question)
+        assert llm.calls == 2
+
+        # @bob's reply was built without any history, so it is shared
+        shared = await bob.generate_response("@carol", question)
+        assert llm.calls == 2 and "@carol" in shared and "4321" not in shared
+        memory.close()
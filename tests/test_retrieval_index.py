@@ -0,0 +1,151 @@
+import pytest
+import sys
+from pathlib import Path
+import numpy as np
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.conversation_memory import ConversationMemory
+from src.agent.retrieval_index import RetrievalIndex
+from src.agent.bob_agent import BobTheBuilder
+from src.agent.model_router import ModelRouter
+from src.agent.prompt_builder import PromptBuilder
+from src.agent.response_cache import ResponseCache
+
+@pytest.fixture
+def index_dir(tmp_path):
+    return tmp_path / "retrieval"
+
+class RecordingLLM:
+    """Stands in for the gateway and keeps the messages of every call"""
+
+    def __init__(self):
+        self.router = ModelRouter()
+        self.calls = []
+        self.params = []
+
+    async def chat(self, messages, **params):
+        self.calls.append(messages)
+        self.params.append(params)
+        return "Seal the end grain before you set the post."
+
+def fill(index):
+    index.add("@alice", {'text': 'How do I build a wooden deck with pressure treated lumber?'}, 1.0)
+    index.add("@alice", {'text': 'Thanks, the weather is lovely today'}, 2.0)
+    index.add("@alice", {'text': 'What paint works on a garden shed?'}, 3.0)
+    index.add("@bob", {'text': 'Which lumber should I use for my deck joists?'}, 4.0)
+
+class TestRetrievalIndex:
+    def test_ranks_relevant_messages_first(self, index_dir):
+        """Test that the most similar message for the handle comes first"""
+        index = RetrievalIndex(index_dir)
+        fill(index)
+        results = index.search("deck lumber", handle="@alice", k=2)
+        assert results[0][1]['message']['text'].startswith('How do I build a wooden deck')
+        assert all(hit['handle'] == '@alice' for _, hit in results)
+
+        global_texts = [hit['message']['text'] for _, hit in index.search("deck lumber", k=5)]
+        assert 'Which lumber should I use for my deck joists?' in global_texts[:2]
+        assert index.search("deck", handle="@nobody") == []
+
+    def test_reopens_memory_mapped(self, index_dir):
+        """Test that the index persists and searches through a memmap"""
+        index = RetrievalIndex(index_dir, dim=256)
+        fill(index)
+        index.flush()
+
+        reopened = RetrievalIndex(index_dir)
+        assert len(reopened) == 4
+        assert reopened.dim == 256
+        vectors, _ = reopened._map()
+        assert isinstance(vectors, np.memmap)
+        assert np.array_equal(reopened._df, index._df)
+        assert reopened.search("shed paint", handle="@alice", k=1)[0][1]['message']['text'] == \
+            'What paint works on a garden shed?'
+
+    def test_recovers_torn_append_and_recounts_frequencies(self, index_dir):
+        """Test that a partial row is truncated and unsaved frequencies are rebuilt"""
+        index = RetrievalIndex(index_dir)
+        fill(index)
+        with open(index.vectors_path, 'ab') as f:
+            f.write(b"\0" * 100)  # Crash after part of a vector
+
+        reopened = RetrievalIndex(index_dir)
+        assert len(reopened) == 4
+        assert np.array_equal(reopened._df, index._df)
+        reopened.add("@bob", {'text': 'Deck screws or nails?'})
+        assert len(RetrievalIndex(index_dir)) == 5
+
+    def test_removed_handles_are_not_returned(self, index_dir):
+        """Test that removal hides old rows while new messages are indexed again"""
+        index = RetrievalIndex(index_dir)
+        fill(index)
+        index.remove("@alice")
+        assert index.search("deck", handle="@alice") == []
+        assert {hit['handle'] for _, hit in index.search("deck lumber", k=5)} == {'@bob'}
+
+        index.add("@alice", {'text': 'Starting a new deck project'})
+        assert [hit['message']['text'] for _, hit in index.search("deck", handle="@alice")] == \
+            ['Starting a new deck project']
+
+    def test_conversation_memory_indexes_new_messages(self, tmp_path, monkeypatch):
+        """Test that stored DMs and mentions become searchable"""
+        monkeypatch.chdir(tmp_path)
+        memory = ConversationMemory(data_dir=tmp_path / "conversations", index_dir=tmp_path / "retrieval")
+        memory.add_dm("@alice", {'text': 'My fence post is rotting at the base', 'timestamp': 1.0})
+        memory.add_mention("@alice", {'tweet_id': '1', 'text': 'Nice weather for painting'})
+        assert memory.search_history("@alice", "rotting fence post", k=1)[0]['text'] == \
+            'My fence post is rotting at the base'
+
+        memory.clear_memory("@alice")
+        assert memory.search_history("@alice", "rotting fence post") == []
+        memory.close()
+
+    @pytest.mark.asyncio
+    async def test_replies_include_relevant_history(self, tmp_path, monkeypatch):
+        """Test that the reply prompt carries recent and retrieved messages"""
+        monkeypatch.chdir(tmp_path)
+        memory = ConversationMemory(data_dir=tmp_path / "conversations", index_dir=tmp_path / "retrieval")
+        memory.add_dm("@alice", {'text': 'My fence post is rotting at the base', 'timestamp': 1.0})
+        for i in range(5):
+            memory.add_dm("@alice", {'text': f'Small talk number {i}', 'timestamp': 2.0 + i})
+        llm = RecordingLLM()
+        bob = BobTheBuilder("test-key", memory=memory, response_cache=ResponseCache(enabled=False), llm=llm)
+
+        await bob.generate_response("@alice", "How do I fix a rotting fence post?")
+        prompt = llm.calls[0][-1]['content']
+        assert "@alice: My fence post is rotting at the base" in prompt.split("Recent conversation")[0]
+        assert "Small talk number 4" in prompt
+        assert prompt.count("How do I fix a rotting fence post?") == 1
+        memory.close()
+
+    @pytest.mark.asyncio
+    async def test_reply_prompt_fits_routed_model_budget(self, tmp_path, monkeypatch):
+        """Test that the whole reply request, system prompt included, fits the routed model's budget"""
+        monkeypatch.chdir(tmp_path)
+        memory = ConversationMemory(data_dir=tmp_path / "conversations", index_dir=tmp_path / "retrieval")
+        for i in range(5):
+            memory.add_dm("@alice", {'text': f'Long story {i}: ' + 'the shed roof leaks again ' * 100,
+                                     'timestamp': 1.0 + i})
+        llm = RecordingLLM()
+        bob = BobTheBuilder("test-key", memory=memory, response_cache=ResponseCache(enabled=False), llm=llm)
+
+        await bob.generate_response("@alice", "thanks bob!")
+        builder = PromptBuilder(llm.params[0]['model'])
+        messages = llm.calls[0]
+        assert messages[0]['role'] == "system"
+        assert builder.total(*(message['content'] for message in messages)) <= builder.budget
+        assert "Long story 4" in messages[-1]['content']  # The newest history is kept
+        assert "Long story 1" not in messages[-1]['content']
+
+        # A complex message goes to the strong tier and gets its larger budget
+        await bob.generate_response("@alice", "How do I calculate the joist span and footing load "
+                                              "for a deck? Does the permit code change the beam size?")
+        builder = PromptBuilder(llm.params[1]['model'])
+        assert builder.model == "gpt-4o"
+        assert builder.total(*(message['content'] for message in llm.calls[1])) <= builder.budget
+        assert "Long story 1" in llm.calls[1][-1]['content']
+        memory.close()
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.speculative import SpeculativeChain, draft_coverage, draft_is_sound
+
+ANALYSIS = "Key points: the joist span, the footing depth and the permit for the deck framing."
+COMPLEX = "How far can a joist span on my deck? Do I need a permit for the footing and framing?"
+
+def call(result, delay, log=None, name=None):
+    async def run(*args):
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return run
+
+class TestSpeculativeChain:
+    def test_draft_checks(self):
+        """Test the draft soundness and analysis coverage heuristics"""
+        assert draft_is_sound("Sounds like a great project!")
+        assert not draft_is_sound("")
+        assert not draft_is_sound("I'm sorry, but I can't do that.")
+        assert not draft_is_sound("First you will want to check the joists,")
+        assert draft_coverage("Check your joist span and footings, and get a permit.", ANALYSIS) >= 0.5
+        assert draft_coverage("Have fun building!", ANALYSIS) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_ships_draft_or_revises(self):
+        """Test that covering drafts ship without the response step and others are revised"""
+        chain = SpeculativeChain()
+        loop = asyncio.get_running_loop()
+        log = []
+
+        start = loop.time()
+        reply = await chain.run(call("Keep the joist span short, set deep footings and get a permit.", 0.05),
+                                call(ANALYSIS, 0.1), call("revised", 0.05, log, "revise"), text=COMPLEX)
+        assert loop.time() - start < 0.14  # Draft and analysis overlapped, no response step
+        assert reply.startswith("Keep") and log == []
+
+        reply = await chain.run(call("Have fun building!", 0.05), call(ANALYSIS, 0.1),
+                                call("revised", 0.05, log, "revise"), text=COMPLEX)
+        assert reply == "revised" and log == ["revise"]
+
+        stats = chain.stats()
+        assert stats['shipped'] == 1 and stats['revised'] == 1
+        assert stats['revision_rate'] == 0.5
+        assert stats['saved_seconds'] > 0.03  # ~0.05s on the shipped draft, ~0 on the revision
+
+    @pytest.mark.asyncio
+    async def test_simple_requests_ship_early(self):
+        """Test that a sound draft for a simple message skips waiting for the analysis"""
+        chain = SpeculativeChain()
+        log = []
+        reply = await chain.run(call("Thanks, happy building!", 0.01), call(ANALYSIS, 0.5, log, "analysis"),
+                                call("revised", 0), text="thanks bob!")
+        await asyncio.sleep(0)
+        assert reply == "Thanks, happy building!"
+        assert chain.stats()['shipped_early'] == 1 and log == []
+
+    @pytest.mark.asyncio
+    async def test_failures_and_sequential_mode(self):
+        """Test falling back between draft and analysis, and running without speculation"""
+        chain = SpeculativeChain()
+        reply = await chain.run(call(RuntimeError("draft down"), 0), call(ANALYSIS, 0.01),
+                                call("revised", 0), text=COMPLEX)
+        assert reply == "revised"
+        reply = await chain.run(call("Set deep footings before you frame the deck.", 0),
+                                call(RuntimeError("analysis down"), 0.01), call("revised", 0), text=COMPLEX)
+        assert reply.startswith("Set deep")
+        with pytest.raises(RuntimeError):
+            await chain.run(call("", 0), call(RuntimeError("analysis down"), 0), call("revised", 0), text=COMPLEX)
+
+        sequential = SpeculativeChain(enabled=False)
+        log = []
+        reply = await sequential.run(call("draft", 0, log, "draft"), call(ANALYSIS, 0, log, "analysis"),
+                                     call("revised", 0, log, "revise"), text=COMPLEX)
+        assert reply == "revised" and log == ["analysis", "revise"]
@@ -0,0 +1,52 @@
+import pytest
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.tweet_dedup import NearDuplicateIndex, shingles
+from src.agent.tweet_ledger import TweetLedger
+
+TWEET = "Measure twice, cut once! A good square and a sharp pencil save more wood than any saw. #woodworking"
+
+class TestNearDuplicateIndex:
+    def test_shingles_ignore_case_punctuation_and_links(self):
+        """Test that cosmetic edits do not change a tweet's shingles"""
+        assert shingles(TWEET) == shingles(TWEET.upper().replace("!", ".") + " https://t.co/abc")
+
+    def test_finds_near_duplicates_only(self):
+        """Test that reworded repeats match and unrelated tweets do not"""
+        index = NearDuplicateIndex()
+        index.add("a", TWEET)
+        index.add("b", "Always wear safety glasses when using a table saw, even for quick cuts.")
+
+        reworded = "Measure twice and cut once! A good square and a sharp pencil saves more wood than any saw."
+        score, key = index.find(reworded)
+        assert key == "a" and score >= 0.6
+        assert index.find("Composting kitchen scraps is an easy win for the garden.") is None
+
+    def test_remove_and_replace(self):
+        """Test that removed keys stop matching and re-adding a key replaces its text"""
+        index = NearDuplicateIndex()
+        index.add("a", TWEET)
+        index.remove("a")
+        assert index.find(TWEET) is None and len(index) == 0
+
+        index.add("a", "Check your level before the glue sets.")
+        index.add("a", TWEET)
+        assert index.find(TWEET)[1] == "a"
+        assert index.find("Check your level before the glue sets.") is None
+
+    def test_follows_ledger(self, tmp_path):
+        """Test that an index attached to a ledger sees past and future tweets"""
+        ledger = TweetLedger(path=tmp_path / "tweet_ledger.jsonl", legacy_path=None)
+        old = ledger.record(TWEET)
+        index = NearDuplicateIndex()
+        ledger.add_listener(lambda entry: index.add(entry['id'], entry['text']))
+        new = ledger.record("Pre-drill hardwood so the screw does not split it.")
+
+        assert index.find(TWEET)[1] == old['id']
+        assert index.find("Pre-drill hardwood so the screw does not split it!")[1] == new['id']
@@ -0,0 +1,106 @@
+import pytest
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agent.tweet_ledger import TweetLedger
+
+@pytest.fixture
+def ledger_paths(tmp_path):
+    return tmp_path / "tweet_ledger.jsonl", tmp_path / "tweet_history.json"
+
+class TestTweetLedger:
+    def test_records_are_appended_and_reloaded(self, ledger_paths):
+        """Test that each tweet appends one line with its own ID and survives a restart"""
+        path, legacy_path = ledger_paths
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+        first = ledger.record("Measure twice, cut once", timestamp=1000.0, source="auto")
+        second = ledger.record("Sand with the grain", timestamp=2000.0)
+
+        assert first['id'] != second['id']
+        assert len(path.read_text().splitlines()) == 2
+        reloaded = TweetLedger(path=path, legacy_path=legacy_path)
+        assert [t['text'] for t in reloaded.last(5)] == ["Measure twice, cut once", "Sand with the grain"]
+        assert reloaded.get(first['id'])['source'] == "auto"
+        assert reloaded.last_tweet_time() == 2000.0
+
+    def test_queries(self, ledger_paths):
+        """Test last N, posted since T and text lookups"""
+        path, legacy_path = ledger_paths
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+        for i in range(10):
+            ledger.record(f"Tip {i}: check your level", timestamp=100.0 * i)
+
+        assert [t['text'] for t in ledger.last(2)] == ["Tip 8: check your level", "Tip 9: check your level"]
+        assert [t['timestamp'] for t in ledger.since(750)] == [800.0, 900.0]
+        assert len(ledger.since(datetime.fromtimestamp(750, tz=timezone.utc))) == 2
+        assert len(ledger.since("1970-01-01T00:12:30Z")) == 2
+        assert "Tip 3: check your level" in ledger
+        assert "Tip 3" not in ledger
+        assert [t['text'] for t in ledger.search("TIP 1")] == ["Tip 1: check your level"]
+
+    def test_out_of_order_timestamps_stay_sorted(self, ledger_paths):
+        """Test that a tweet recorded late is placed by when it was posted"""
+        path, legacy_path = ledger_paths
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+        ledger.record("b", timestamp=200.0)
+        ledger.record("a", timestamp=100.0)
+
+        assert [t['text'] for t in ledger.last(2)] == ["a", "b"]
+        assert ledger.last_tweet_time() == 200.0
+
+    def test_imports_legacy_history_once(self, ledger_paths):
+        """Test migration from tweet_history.json, dating only the newest tweet"""
+        path, legacy_path = ledger_paths
+        legacy_path.write_text(json.dumps({
+            'posted_tweets': ["old", "two", "three"],
+            'tweet_history': ["two", "three"],
+            'last_tweet_time': "2024-05-01T12:00:00",
+        }))
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+
+        assert [t['text'] for t in ledger.last(3)] == ["old", "two", "three"]
+        assert [t['timestamp'] is None for t in ledger.last(3)] == [True, True, False]
+        assert ledger.since(0) == ledger.last(1)
+        assert not legacy_path.exists()
+        assert len(TweetLedger(path=path, legacy_path=legacy_path)) == 3
+
+    def test_sees_tweets_from_other_writers(self, ledger_paths):
+        """Test that a second ledger on the same file picks up new lines on query"""
+        path, legacy_path = ledger_paths
+        reader = TweetLedger(path=path, legacy_path=legacy_path)
+        writer = TweetLedger(path=path, legacy_path=legacy_path)
+        writer.record("Shared tweet")
+
+        assert "Shared tweet" in reader
+        assert reader.last_tweet_time() == pytest.approx(time.time(), abs=60)
+
+    def test_snapshot_reads_only_new_lines(self, ledger_paths):
+        """Test that a restored snapshot is topped up from the file tail"""
+        path, legacy_path = ledger_paths
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+        ledger.record("before", timestamp=1.0)
+        state = ledger.export_state()
+        ledger.record("after", timestamp=2.0)
+
+        restored = TweetLedger(path=path, legacy_path=legacy_path, snapshot=state)
+        assert [t['text'] for t in restored.last(5)] == ["before", "after"]
+
+    def test_torn_tail_is_skipped(self, ledger_paths):
+        """Test that a line torn by a crash is ignored and the next append starts clean"""
+        path, legacy_path = ledger_paths
+        TweetLedger(path=path, legacy_path=legacy_path).record("kept", timestamp=1.0)
+        with open(path, 'a') as f:
+            f.write('{"text": "torn')
+
+        ledger = TweetLedger(path=path, legacy_path=legacy_path)
+        ledger.record("next", timestamp=2.0)
+        reloaded = TweetLedger(path=path, legacy_path=legacy_path)
+        assert [t['text'] for t in reloaded.last(5)] == ["kept", "next"]